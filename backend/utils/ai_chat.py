@@ -6,6 +6,10 @@ import base64
 from datetime import datetime, timedelta
 from backend.utils.supabase_client import supabase
 from frontend.guidance_section import get_guidance_results, get_best_practices_results
+from backend.utils.intent_router import route_question
+from backend.utils import response_cache, knowledge_retriever
+from backend.utils.prompt_budget import section, assemble_context
+from backend.utils.turn_pipeline import source, start_sources, collect_source
 
 from .dashboard_generator import (
     generate_daily_dashboard,
@@ -186,7 +190,16 @@ def search_process_maps(query, limit=3):
                 .execute()
                 
             results.extend(cat_query.data)
-            
+
+        # Fill the rest by relevance rather than a substring of the whole query
+        if len(results) < limit:
+            found = {item["id"] for item in results}
+            hits = knowledge_retriever.search(query, top_k=limit, sources=["process_maps"])["results"]
+            ids = [hit["id"] for hit in hits if hit["id"] not in {str(i) for i in found}]
+            if ids:
+                rows = {str(row["id"]): row for row in supabase.table("process_maps").select("*").in_("id", ids).execute().data}
+                results.extend(rows[i] for i in ids[:limit - len(results)] if i in rows)
+
         return results
     except Exception as e:
         print(f"Error searching process maps: {str(e)}")
@@ -203,237 +216,201 @@ def get_process_map_by_id(map_id):
         print(f"Error fetching process map by ID: {e}")
         return None
     
-GUIDANCE_KEYWORDS = ["regulation", "bylaw", "code", "legal requirement"]
-BEST_PRACTICE_KEYWORDS = ["best practice", "oem manual", "manual", "procedure", "recommendation", "standard", "maintenance tip"]
+# ======================= Intent Handlers =======================
+# ask_gpt routes each question with intent_router.route_question and tries the
+# handlers for its intents in order (see run_intent_handlers). A handler returns None to let the next one
+# (and finally the LLM) answer.
 
-def ask_gpt(question, context=""):
-    question_lower = question.lower()
-        # Guidance/Regulation queries
-    if any(kw in question_lower for kw in GUIDANCE_KEYWORDS):
-        results = get_guidance_results(question_lower, limit=3)
-        if results:
-            response = "**Here are relevant regulations/bylaws:**\n\n"
-            for r in results:
-                response += f"- **{r['Equipment']}** ({r['Regulation/Code']}): {r['Reference']}\n"
-            response += "\nFor more, visit the Regulations & Bylaws section."
-            return response
+def answer_guidance(question, question_lower, route):
+    results = get_guidance_results(question_lower, limit=3)
+    if results:
+        response = "**Here are relevant regulations/bylaws:**\n\n"
+        for r in results:
+            response += f"- **{r['Equipment']}** ({r['Regulation/Code']}): {r['Reference']}\n"
+        response += "\nFor more, visit the Regulations & Bylaws section."
+        return response
+    return None
 
-    # Best practices queries
-    if any(kw in question_lower for kw in BEST_PRACTICE_KEYWORDS):
-        results = get_best_practices_results(question_lower, limit=3)
-        if results:
-            response = "**Here are some best practices from trusted sources:**\n\n"
-            for r in results:
-                response += f"- [{r['title']}]({r['link']}) ({r['domain']})\n"
-            response += "\nFor more, visit the Best Practices section."
-            return response
+def answer_best_practices(question, question_lower, route):
+    results = get_best_practices_results(question_lower, limit=3)
+    if results:
+        response = "**Here are some best practices from trusted sources:**\n\n"
+        for r in results:
+            response += f"- [{r['title']}]({r['link']}) ({r['domain']})\n"
+        response += "\nFor more, visit the Best Practices section."
+        return response
+    return None
 
-    
-    # PROCESS MAPS QUERIES - Moved to top priority and enhanced
-    if any(phrase in question_lower for phrase in [
-        "process map", "workflow", "procedure", "flow chart", "diagram",
-        "process diagram", "work order flow", "steps for", "process for",
-        "how do i", "how to", "procedure for", "what's the process",
-        "show me process", "get process", "find process", "display process",
-        "need the process", "want the process"
-    ]):
-        search_terms = question_lower
-        
-        # Extract the specific terms from the request
-        for phrase in ["process map for", "workflow for", "procedure for", "steps for", 
-                       "how do i", "how to", "what's the process for", "show me process for",
-                       "show me the", "display the", "open the", "view the", 
-                       "can you show me", "i want to see", "pull up the", "find the",
-                       "get the", "process for"]:
-            if phrase in question_lower:
-                search_terms = question_lower.split(phrase, 1)[1].strip()
-                break
-        
-        # Clean up search terms
-        for term in ["process map", "workflow", "procedure", "diagram", "please", "thanks", "?"]:
-            search_terms = search_terms.replace(term, "").strip()
-        
-        # Search for relevant process maps
-        results = search_process_maps(search_terms)
-        
-        if results:
-            # Always return the structured response with PDFs for process map queries
-            return {
-                "type": "process_maps",
-                "message": f"Here are the process maps related to your query:",
-                "results": results
-            }
-        else:
-            # If no results, still return a structured response but with empty results
-            return {
-                "type": "process_maps",
-                "message": f"I couldn't find any process maps related to '{search_terms}'. Please try different keywords or check with your administrator.",
-                "results": []
-            }
-    
-    # Handle work order summary requests
-    if any(phrase in question_lower for phrase in [
-        "summary of yesterday", "yesterday's work order", "summary of work orders",
-        "yesterday's summary", "work orders from yesterday", "yesterday work order summary"
-    ]):
-        try:
-            dashboard = generate_daily_dashboard()
-            summary_match = re.search(r"## Summary Metrics\n\n(.*?)(?=##|\Z)", dashboard, re.DOTALL)
-            if summary_match:
-                summary = "# Summary of Yesterday's Work Orders\n\n" + summary_match.group(1)
-                insights_match = re.search(r"## AI Insights\n\n(.*?)(?=##|\Z)", dashboard, re.DOTALL)
-                if insights_match:
-                    summary += "\n\n## Key Insights\n\n" + insights_match.group(1)
-                critical_match = re.search(r"## Recent Critical Work Orders\n\n(.*?)(?=##|\Z)", dashboard, re.DOTALL)
-                if critical_match:
-                    summary += "\n\n## Critical Work Orders\n\n" + critical_match.group(1)
-                return summary
-            return "I generated a dashboard for yesterday's work orders, but couldn't extract the summary. Try asking for the full dashboard."
-        except Exception as e:
-            return f"I encountered an error trying to generate the work order summary: {str(e)}"
-
-    # Dashboard functionality
-    if any(phrase in question_lower for phrase in [
-        "generate dashboard", "create dashboard", "show dashboard", "daily dashboard",
-        "yesterday's dashboard", "work order dashboard"
-    ]):
-        if "latest" in question_lower or "recent" in question_lower:
-            latest_dashboard = get_latest_dashboard()
-            if latest_dashboard:
-                return latest_dashboard
-        return generate_daily_dashboard()
-
-    # Custom dashboard requests
-    if any(phrase in question_lower for phrase in [
-        "custom dashboard", "specific dashboard", "filtered dashboard"
-    ]):
-        start_date = None
-        end_date = None
-        building_id = None
-        trade = None
-        if "last week" in question_lower:
-            start_date = (datetime.now() - timedelta(days=7)).date().isoformat()
-        elif "last month" in question_lower:
-            start_date = (datetime.now() - timedelta(days=30)).date().isoformat()
-        building_match = re.search(r"building\s*(?:id)?\s*[#:]?\s*(\d+)", question_lower)
-        if building_match:
-            building_id = building_match.group(1)
-        trade_patterns = ["electric", "plumbing", "mechanical", "hvac", "carpentry"]
-        for pattern in trade_patterns:
-            if pattern in question_lower:
-                trade = pattern.upper()
-                break
-        return generate_custom_dashboard(start_date, end_date, building_id, trade)
-
-    # Work order queries
-    if re.search(r"work\s*order\s*(?:number)?\s*[#:]?\s*(\d+)", question_lower):
-        wo_match = re.search(r"work\s*order\s*(?:number)?\s*[#:]?\s*(\d+)", question_lower)
-        if wo_match:
-            work_order_number = wo_match.group(1)
-            work_order = get_work_order_info(work_order_number)
-            if work_order:
-                response_text = f"**Work Order #{work_order['work_order']}**\n\n"
-                response_text += f"**Status:** {work_order.get('status', 'Unknown')}\n"
-                response_text += f"**Priority:** {work_order.get('priority', 'Not specified')}\n"
-                response_text += f"**Building:** {work_order.get('building_name', 'Not specified')}\n"
-                response_text += f"**Equipment:** {work_order.get('equipment', 'Not specified')}\n"
-                response_text += f"**Description:** {work_order.get('description', 'No description')}\n"
-                if work_order.get('scheduled_start_date'):
-                    response_text += f"**Scheduled Start:** {work_order['scheduled_start_date']}\n"
-                if work_order.get('date_completed'):
-                    response_text += f"**Completed:** {work_order['date_completed']}\n"
-                response_text += f"**Type:** {work_order.get('wo_type', 'Not specified')}\n"
-                response_text += f"**Trade:** {work_order.get('trade', 'Not specified')}\n"
-                return response_text
-            else:
-                return f"I couldn't find any information for Work Order #{work_order_number}."
-
-    elif any(kw in question_lower for kw in ["building work orders", "work orders for building"]):
-        building_id_match = re.search(r"building\s*(?:id|number)?\s*[#:]?\s*(\d+)", question_lower)
-        building_name_match = re.search(r"building\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
-        building_id = building_id_match.group(1) if building_id_match else None
-        building_name = building_name_match.group(1).strip() if building_name_match else None
-        if building_id or building_name:
-            work_orders = get_building_work_orders(building_id, building_name)
-            if work_orders:
-                if building_name:
-                    response_text = f"**Recent Work Orders for Building: {building_name}**\n\n"
-                else:
-                    response_text = f"**Recent Work Orders for Building ID: {building_id}**\n\n"
-                for i, wo in enumerate(work_orders[:10], 1):
-                    response_text += f"{i}. **WO #{wo['work_order']}** - {wo.get('status', 'Unknown')}\n"
-                    response_text += f"   {wo.get('description', 'No description')[:100]}...\n"
-                    response_text += f"   Priority: {wo.get('priority', 'Not specified')}\n\n"
-                if len(work_orders) > 10:
-                    response_text += f"\n*Showing 10 of {len(work_orders)} work orders.*"
-                return response_text
-            else:
-                if building_name:
-                    return f"I couldn't find any work orders for building named '{building_name}'."
-                else:
-                    return f"I couldn't find any work orders for building ID {building_id}."
-
-    elif "critical work orders" in question_lower or "high priority work orders" in question_lower:
-        critical_wos = get_critical_work_orders()
-        if critical_wos:
-            response_text = "**Critical Priority Work Orders**\n\n"
-            for i, wo in enumerate(critical_wos, 1):
-                response_text += f"{i}. **WO #{wo['work_order']}** - {wo.get('building_name', 'Unknown location')}\n"
-                response_text += f"   {wo.get('description', 'No description')[:100]}...\n"
-                response_text += f"   Status: {wo.get('status', 'Unknown')}\n\n"
-            return response_text
+PROCESS_MAP_LEAD_INS = [
+    "process map for", "workflow for", "procedure for", "steps for",
+    "how do i", "how to", "what's the process for", "show me process for",
+    "show me the", "display the", "open the", "view the",
+    "can you show me", "i want to see", "pull up the", "find the",
+    "get the", "process for"
+]
+PROCESS_MAP_FILLER = ["process map", "workflow", "procedure", "diagram", "please", "thanks", "?"]
+
+def answer_process_maps(question, question_lower, route):
+    search_terms = question_lower
+
+    # Extract the specific terms from the request
+    for phrase in PROCESS_MAP_LEAD_INS:
+        if phrase in question_lower:
+            search_terms = question_lower.split(phrase, 1)[1].strip()
+            break
+
+    # Clean up search terms
+    for term in PROCESS_MAP_FILLER:
+        search_terms = search_terms.replace(term, "").strip()
+
+    results = search_process_maps(search_terms)
+
+    if results:
+        # Always return the structured response with PDFs for process map queries
+        return {
+            "type": "process_maps",
+            "message": f"Here are the process maps related to your query:",
+            "results": results
+        }
+    # If no results, still return a structured response but with empty results
+    return {
+        "type": "process_maps",
+        "message": f"I couldn't find any process maps related to '{search_terms}'. Please try different keywords or check with your administrator.",
+        "results": []
+    }
+
+SUMMARY_SECTION = re.compile(r"## Summary Metrics\n\n(.*?)(?=##|\Z)", re.DOTALL)
+INSIGHTS_SECTION = re.compile(r"## AI Insights\n\n(.*?)(?=##|\Z)", re.DOTALL)
+CRITICAL_SECTION = re.compile(r"## Recent Critical Work Orders\n\n(.*?)(?=##|\Z)", re.DOTALL)
+
+def answer_work_order_summary(question, question_lower, route):
+    try:
+        dashboard = generate_daily_dashboard()
+        summary_match = SUMMARY_SECTION.search(dashboard)
+        if summary_match:
+            summary = "# Summary of Yesterday's Work Orders\n\n" + summary_match.group(1)
+            insights_match = INSIGHTS_SECTION.search(dashboard)
+            if insights_match:
+                summary += "\n\n## Key Insights\n\n" + insights_match.group(1)
+            critical_match = CRITICAL_SECTION.search(dashboard)
+            if critical_match:
+                summary += "\n\n## Critical Work Orders\n\n" + critical_match.group(1)
+            return summary
+        return "I generated a dashboard for yesterday's work orders, but couldn't extract the summary. Try asking for the full dashboard."
+    except Exception as e:
+        return f"I encountered an error trying to generate the work order summary: {str(e)}"
+
+def answer_dashboard(question, question_lower, route):
+    if route["flags"]["latest"]:
+        latest_dashboard = get_latest_dashboard()
+        if latest_dashboard:
+            return latest_dashboard
+    return generate_daily_dashboard()
+
+def answer_custom_dashboard(question, question_lower, route):
+    start_date = None
+    end_date = None
+    if route["flags"]["last_week"]:
+        start_date = (datetime.now() - timedelta(days=7)).date().isoformat()
+    elif route["flags"]["last_month"]:
+        start_date = (datetime.now() - timedelta(days=30)).date().isoformat()
+    slots = route["slots"]
+    return generate_custom_dashboard(start_date, end_date, slots["building_id"], slots["trade"])
+
+def answer_work_order(question, question_lower, route):
+    work_order_number = route["slots"]["work_order"]
+    work_order = get_work_order_info(work_order_number)
+    if work_order:
+        response_text = f"**Work Order #{work_order['work_order']}**\n\n"
+        response_text += f"**Status:** {work_order.get('status', 'Unknown')}\n"
+        response_text += f"**Priority:** {work_order.get('priority', 'Not specified')}\n"
+        response_text += f"**Building:** {work_order.get('building_name', 'Not specified')}\n"
+        response_text += f"**Equipment:** {work_order.get('equipment', 'Not specified')}\n"
+        response_text += f"**Description:** {work_order.get('description', 'No description')}\n"
+        if work_order.get('scheduled_start_date'):
+            response_text += f"**Scheduled Start:** {work_order['scheduled_start_date']}\n"
+        if work_order.get('date_completed'):
+            response_text += f"**Completed:** {work_order['date_completed']}\n"
+        response_text += f"**Type:** {work_order.get('wo_type', 'Not specified')}\n"
+        response_text += f"**Trade:** {work_order.get('trade', 'Not specified')}\n"
+        return response_text
+    return f"I couldn't find any information for Work Order #{work_order_number}."
+
+def answer_building_work_orders(question, question_lower, route):
+    building_id = route["slots"]["building_id"]
+    building_name = route["slots"]["building_name"]
+    building_name = building_name.strip() if building_name else None
+    if not (building_id or building_name):
+        return None
+    work_orders = get_building_work_orders(building_id, building_name)
+    if work_orders:
+        if building_name:
+            response_text = f"**Recent Work Orders for Building: {building_name}**\n\n"
         else:
-            return "I couldn't find any critical priority work orders at this time."
-
-    # PM CODE QUERIES
-    if (("what" in question_lower or "list" in question_lower or "show" in question_lower) and 
-        ("pm code" in question_lower or "pm codes" in question_lower or "task plan" in question_lower)):
-        equipment = None
-        for keyword in ["for ", "of ", "related to "]:
-            if keyword in question_lower:
-                equipment = question_lower.split(keyword, 1)[1].strip().rstrip("?")
-                break
-        if equipment:
-            query = supabase.table("dictionary") \
-                .select("pm_code, pm_name") \
-                .ilike("pm_name", f"%{equipment}%") \
-                .execute()
-            results = {}
-            if query.data:
-                for row in query.data:
-                    if row["pm_code"] not in results:
-                        results[row["pm_code"]] = row["pm_name"]
-            if results:
-                response_text = f"**PM Codes for {equipment.title()}:**\n\n"
-                for code, name in results.items():
-                    response_text += f"- **{code}**: {name}\n"
-                return response_text
-            else:
-                query = supabase.table("dictionary") \
-                    .select("pm_code, pm_name, description") \
-                    .ilike("description", f"%{equipment}%") \
-                    .execute()
-                if query.data:
-                    results = {}
-                    for row in query.data:
-                        if row["pm_code"] not in results:
-                            results[row["pm_code"]] = row["pm_name"]
-                    if results:
-                        response_text = f"**PM Codes for {equipment.title()}:**\n\n"
-                        for code, name in results.items():
-                            response_text += f"- **{code}**: {name}\n"
-                        return response_text
-                return f"No PM codes found for '{equipment}' in the database."
-
-    pm_match = re.search(r"([A-Z]+[-]\w+[-]\d{2})", question)
-    if pm_match:
-        search_term = pm_match.group(1)
-        tasks = get_pm_tasks(search_term, search_pm_code=True, search_pm_name=True)
-        label = "PM Code"
-    else:
-        search_term = question.strip()
-        tasks = get_pm_tasks(search_term, search_pm_code=True, search_pm_name=True)
-        label = "PM Name or Code"
+            response_text = f"**Recent Work Orders for Building ID: {building_id}**\n\n"
+        for i, wo in enumerate(work_orders[:10], 1):
+            response_text += f"{i}. **WO #{wo['work_order']}** - {wo.get('status', 'Unknown')}\n"
+            response_text += f"   {wo.get('description', 'No description')[:100]}...\n"
+            response_text += f"   Priority: {wo.get('priority', 'Not specified')}\n\n"
+        if len(work_orders) > 10:
+            response_text += f"\n*Showing 10 of {len(work_orders)} work orders.*"
+        return response_text
+    if building_name:
+        return f"I couldn't find any work orders for building named '{building_name}'."
+    return f"I couldn't find any work orders for building ID {building_id}."
+
+def answer_critical_work_orders(question, question_lower, route):
+    critical_wos = get_critical_work_orders()
+    if critical_wos:
+        response_text = "**Critical Priority Work Orders**\n\n"
+        for i, wo in enumerate(critical_wos, 1):
+            response_text += f"{i}. **WO #{wo['work_order']}** - {wo.get('building_name', 'Unknown location')}\n"
+            response_text += f"   {wo.get('description', 'No description')[:100]}...\n"
+            response_text += f"   Status: {wo.get('status', 'Unknown')}\n\n"
+        return response_text
+    return "I couldn't find any critical priority work orders at this time."
+
+def format_pm_codes(equipment, results):
+    response_text = f"**PM Codes for {equipment.title()}:**\n\n"
+    for code, name in results.items():
+        response_text += f"- **{code}**: {name}\n"
+    return response_text
+
+def answer_pm_codes(question, question_lower, route):
+    equipment = None
+    for keyword in ["for ", "of ", "related to "]:
+        if keyword in question_lower:
+            equipment = question_lower.split(keyword, 1)[1].strip().rstrip("?")
+            break
+    if not equipment:
+        return None
+    query = supabase.table("dictionary") \
+        .select("pm_code, pm_name") \
+        .ilike("pm_name", f"%{equipment}%") \
+        .execute()
+    results = {}
+    if query.data:
+        for row in query.data:
+            if row["pm_code"] not in results:
+                results[row["pm_code"]] = row["pm_name"]
+    if results:
+        return format_pm_codes(equipment, results)
+    query = supabase.table("dictionary") \
+        .select("pm_code, pm_name, description") \
+        .ilike("description", f"%{equipment}%") \
+        .execute()
+    if query.data:
+        results = {}
+        for row in query.data:
+            if row["pm_code"] not in results:
+                results[row["pm_code"]] = row["pm_name"]
+        if results:
+            return format_pm_codes(equipment, results)
+    return f"No PM codes found for '{equipment}' in the database."
+
+def answer_pm_tasks(question, question_lower, route):
+    search_term = route["slots"]["pm_code"] or question.strip()
+    tasks = get_pm_tasks(search_term, search_pm_code=True, search_pm_name=True)
     if tasks and len(tasks) > 0:
         df = pd.DataFrame(tasks)
         df = df.sort_values("sequence")
@@ -447,165 +424,219 @@ def ask_gpt(question, context=""):
             f"{table_md}"
         )
         return response_text
+    return None
 
-    # PM WORK ORDER QUERIES - NEW SECTION WITH EXPANDED PHRASES
-    if any(phrase in question_lower for phrase in [
-        "preventive maintenance", "pm work order", "pm schedule", 
-        "maintenance schedule", "maintenance plan", "maintenance task", 
-        "scheduled maintenance", "equipment maintenance", "list maintenance",
-        "show maintenance", "maintenance for", "maintenance at"
-    ]):
-        building = None
-        zone = None
-        region = None
-        status = None
-        # Building alias mapping for more accurate results
-        building_aliases = {
-            "municipal building": "Municipal Building",
-            "city hall": "Historic City Hall",
-            # Add more aliases as needed
-        }
-        building_match = re.search(r"building\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
-        if building_match:
-            building = building_match.group(1).strip()
-            if building.lower() in building_aliases:
-                building = building_aliases[building.lower()]
-        zone_match = re.search(r"zone\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
-        if zone_match:
-            zone = zone_match.group(1).strip().upper()
-        region_match = re.search(r"region\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
-        if region_match:
-            region = region_match.group(1).strip()
-        if "overdue" in question_lower or "past due" in question_lower:
-            overdue_pms = get_overdue_pm_work_orders(limit=15)
-            if overdue_pms:
-                response_text = f"**Overdue Preventive Maintenance Work Orders**\n\n"
-                for i, pm in enumerate(overdue_pms, 1):
-                    scheduled_date = pm.get('scheduled_start_date', 'Unknown date')
-                    if isinstance(scheduled_date, str) and len(scheduled_date) > 10:
-                        scheduled_date = scheduled_date[:10]
-                    response_text += f"{i}. **PM #{pm.get('work_order', 'Unknown')}** - {pm.get('building_name', 'Unknown location')}\n"
-                    response_text += f"   Equipment: {pm.get('equipment', 'Unknown')}\n"
-                    response_text += f"   Scheduled: {scheduled_date} (OVERDUE)\n"
-                    response_text += f"   Status: {pm.get('status', 'Unknown')}\n\n"
-                return response_text
-            else:
-                return "I couldn't find any overdue PM work orders at this time."
-        elif "upcoming" in question_lower or "scheduled" in question_lower or "future" in question_lower:
-            today = datetime.now().strftime('%Y-%m-%d')
-            future = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
-            upcoming_pms = get_pm_work_orders(start_date=today, end_date=future, 
-                                              building=building, zone=zone, region=region, limit=15)
-            if upcoming_pms:
-                response_text = f"**Upcoming Preventive Maintenance Work Orders"
-                if building:
-                    response_text += f" for {building}"
-                if zone:
-                    response_text += f" in {zone} Zone"
-                response_text += "**\n\n"
-                for i, pm in enumerate(upcoming_pms, 1):
-                    scheduled_date = pm.get('scheduled_start_date', 'Unknown date')
-                    if isinstance(scheduled_date, str) and len(scheduled_date) > 10:
-                        scheduled_date = scheduled_date[:10]
-                    response_text += f"{i}. **PM #{pm.get('work_order', 'Unknown')}** - {scheduled_date}\n"
-                    response_text += f"   Building: {pm.get('building_name', 'Unknown location')}\n"
-                    response_text += f"   Equipment: {pm.get('equipment', 'Unknown')}\n"
-                    response_text += f"   Trade: {pm.get('trade', 'Unknown')}\n\n"
-                return response_text
-            else:
-                return "I couldn't find any upcoming PM work orders matching your criteria."
-        elif "metrics" in question_lower or "completion rate" in question_lower or "summary" in question_lower:
-            metrics = get_pm_metrics_summary(building=building, zone=zone, region=region)
-            response_text = f"**Preventive Maintenance Metrics"
-            if building:
-                response_text += f" for {building}"
-            if zone:
-                response_text += f" in {zone} Zone"
-            response_text += "**\n\n"
-            response_text += f"• Total PMs: {metrics['total_pms']}\n"
-            response_text += f"• Completed PMs: {metrics['completed_pms']}\n"
-            response_text += f"• Completion Rate: {metrics['completion_rate']}%\n"
+# Building alias mapping for more accurate results
+BUILDING_ALIASES = {
+    "municipal building": "Municipal Building",
+    "city hall": "Historic City Hall",
+    # Add more aliases as needed
+}
+
+def short_date(value):
+    if isinstance(value, str) and len(value) > 10:
+        return value[:10]
+    return value
+
+def pm_list_title(title, building, zone):
+    response_text = f"**{title}"
+    if building:
+        response_text += f" for {building}"
+    if zone:
+        response_text += f" in {zone} Zone"
+    return response_text + "**\n\n"
+
+def answer_pm_work_orders(question, question_lower, route):
+    slots = route["slots"]
+    flags = route["flags"]
+    building = slots["building_name"].strip() if slots["building_name"] else None
+    if building and building.lower() in BUILDING_ALIASES:
+        building = BUILDING_ALIASES[building.lower()]
+    zone = slots["zone"].strip().upper() if slots["zone"] else None
+    region = slots["region"].strip() if slots["region"] else None
+
+    if flags["overdue"]:
+        overdue_pms = get_overdue_pm_work_orders(limit=15)
+        if overdue_pms:
+            response_text = f"**Overdue Preventive Maintenance Work Orders**\n\n"
+            for i, pm in enumerate(overdue_pms, 1):
+                scheduled_date = short_date(pm.get('scheduled_start_date', 'Unknown date'))
+                response_text += f"{i}. **PM #{pm.get('work_order', 'Unknown')}** - {pm.get('building_name', 'Unknown location')}\n"
+                response_text += f"   Equipment: {pm.get('equipment', 'Unknown')}\n"
+                response_text += f"   Scheduled: {scheduled_date} (OVERDUE)\n"
+                response_text += f"   Status: {pm.get('status', 'Unknown')}\n\n"
             return response_text
+        return "I couldn't find any overdue PM work orders at this time."
+
+    if flags["upcoming"]:
+        today = datetime.now().strftime('%Y-%m-%d')
+        future = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+        upcoming_pms = get_pm_work_orders(start_date=today, end_date=future,
+                                          building=building, zone=zone, region=region, limit=15)
+        if upcoming_pms:
+            response_text = pm_list_title("Upcoming Preventive Maintenance Work Orders", building, zone)
+            for i, pm in enumerate(upcoming_pms, 1):
+                scheduled_date = short_date(pm.get('scheduled_start_date', 'Unknown date'))
+                response_text += f"{i}. **PM #{pm.get('work_order', 'Unknown')}** - {scheduled_date}\n"
+                response_text += f"   Building: {pm.get('building_name', 'Unknown location')}\n"
+                response_text += f"   Equipment: {pm.get('equipment', 'Unknown')}\n"
+                response_text += f"   Trade: {pm.get('trade', 'Unknown')}\n\n"
+            return response_text
+        return "I couldn't find any upcoming PM work orders matching your criteria."
+
+    if flags["metrics"]:
+        metrics = get_pm_metrics_summary(building=building, zone=zone, region=region)
+        response_text = pm_list_title("Preventive Maintenance Metrics", building, zone)
+        response_text += f"• Total PMs: {metrics['total_pms']}\n"
+        response_text += f"• Completed PMs: {metrics['completed_pms']}\n"
+        response_text += f"• Completion Rate: {metrics['completion_rate']}%\n"
+        return response_text
+
+    recent_pms = get_pm_work_orders(building=building, zone=zone, region=region, limit=10)
+    if recent_pms:
+        response_text = pm_list_title("Recent Preventive Maintenance Work Orders", building, zone)
+        for i, pm in enumerate(recent_pms, 1):
+            scheduled_date = short_date(pm.get('scheduled_start_date', 'Unknown date'))
+            response_text += f"{i}. **PM #{pm.get('work_order', 'Unknown')}** - {pm.get('status', 'Unknown')}\n"
+            response_text += f"   Building: {pm.get('building_name', 'Unknown location')}\n"
+            response_text += f"   Equipment: {pm.get('equipment', 'Unknown')}\n"
+            response_text += f"   Scheduled: {scheduled_date}\n\n"
+        response_text += (
+            "\nRegular preventive maintenance helps reduce unexpected breakdowns and extends equipment life. "
+            "If you notice repeated maintenance for the same equipment, it may indicate underlying issues such as aging assets, improper usage, or environmental factors. "
+            "Consider reviewing maintenance history, scheduling more frequent inspections, or consulting with specialists to address recurring problems. "
+            "Proactive planning and communication with your maintenance team can help ensure all tasks are completed efficiently and on schedule."
+        )
+        return response_text
+    all_buildings_query = supabase.table("pm_work_orders").select("building_name").execute()
+    building_names = sorted({row["building_name"] for row in all_buildings_query.data if row.get("building_name")})
+    suggestion = ""
+    if building and building_names:
+        suggestion = f"\nAvailable building names include: {', '.join(building_names[:10])}..."
+    return f"I couldn't find any PM work orders matching your criteria.{suggestion} If you have concerns about missing maintenance, consider reviewing your scheduling process or contacting your PM coordinator for further assistance."
+
+INTENT_HANDLERS = {
+    "guidance": answer_guidance,
+    "best_practices": answer_best_practices,
+    "process_maps": answer_process_maps,
+    "work_order_summary": answer_work_order_summary,
+    "dashboard": answer_dashboard,
+    "custom_dashboard": answer_custom_dashboard,
+    "work_order": answer_work_order,
+    "building_work_orders": answer_building_work_orders,
+    "critical_work_orders": answer_critical_work_orders,
+    "pm_codes": answer_pm_codes,
+    "pm_tasks": answer_pm_tasks,
+    "pm_work_orders": answer_pm_work_orders,
+}
+
+# Handlers that only read Supabase or the regulations file are started
+# together so a question routed to several of them waits for the slowest
+# instead of each in turn. Dashboard handlers generate and store dashboards,
+# best_practices calls the paid web search and pm_tasks matches every
+# question that falls through, so those only run when their turn comes.
+PREFETCH_INTENTS = {
+    "guidance", "process_maps", "work_order", "building_work_orders",
+    "critical_work_orders", "pm_codes", "pm_work_orders",
+}
+
+def run_intent_handlers(question, question_lower, route):
+    """Return the first handler answer for the routed intents, in priority order, or None."""
+    prefetch = [intent for intent in route["intents"] if intent in PREFETCH_INTENTS]
+    pending = None
+    if len(prefetch) > 1:
+        pending = start_sources({
+            # A handler's exception propagates as it would from a direct call
+            intent: source(INTENT_HANDLERS[intent], question, question_lower, route, raise_errors=True)
+            for intent in prefetch
+        })
+    for intent in route["intents"]:
+        if pending is not None and intent in pending["futures"]:
+            response = collect_source(pending, intent)
         else:
-            recent_pms = get_pm_work_orders(building=building, zone=zone, region=region, limit=10)
-            if recent_pms:
-                response_text = f"**Recent Preventive Maintenance Work Orders"
-                if building:
-                    response_text += f" for {building}"
-                if zone:
-                    response_text += f" in {zone} Zone"
-                response_text += "**\n\n"
-                for i, pm in enumerate(recent_pms, 1):
-                    scheduled_date = pm.get('scheduled_start_date', 'Unknown date')
-                    if isinstance(scheduled_date, str) and len(scheduled_date) > 10:
-                        scheduled_date = scheduled_date[:10]
-                    response_text += f"{i}. **PM #{pm.get('work_order', 'Unknown')}** - {pm.get('status', 'Unknown')}\n"
-                    response_text += f"   Building: {pm.get('building_name', 'Unknown location')}\n"
-                    response_text += f"   Equipment: {pm.get('equipment', 'Unknown')}\n"
-                    response_text += f"   Scheduled: {scheduled_date}\n\n"
-                response_text += (
-                    "\nRegular preventive maintenance helps reduce unexpected breakdowns and extends equipment life. "
-                    "If you notice repeated maintenance for the same equipment, it may indicate underlying issues such as aging assets, improper usage, or environmental factors. "
-                    "Consider reviewing maintenance history, scheduling more frequent inspections, or consulting with specialists to address recurring problems. "
-                    "Proactive planning and communication with your maintenance team can help ensure all tasks are completed efficiently and on schedule."
-                )
-                return response_text
-            else:
-                all_buildings_query = supabase.table("pm_work_orders").select("building_name").execute()
-                building_names = sorted({row["building_name"] for row in all_buildings_query.data if row.get("building_name")})
-                suggestion = ""
-                if building and building_names:
-                    suggestion = f"\nAvailable building names include: {', '.join(building_names[:10])}..."
-                return f"I couldn't find any PM work orders matching your criteria.{suggestion} If you have concerns about missing maintenance, consider reviewing your scheduling process or contacting your PM coordinator for further assistance."
-
-    needs_code = any(kw in question_lower for kw in [
-        "visualize", "chart", "graph", "plot", "draw", "bar chart", "line chart", "heatmap", "generate code"
-    ])
-
-    work_orders_context = (
-        "The system includes two main data types:\n\n"
-        "1. WORK ORDERS with these fields:\n"
-        "- work_order: unique identifier for the work order\n"
-        "- status: current status (Open, Closed, In Progress, etc.)\n"
-        "- priority: priority level (Critical, High, Medium, Low)\n"
-        "- building_name: name of the building\n"
-        "- building_id: unique identifier for the building\n"
-        "- description: description of the work needed\n"
-        "- equipment: equipment involved\n"
-        "- scheduled_start_date: when work is scheduled to start\n"
-        "- date_completed: when work was completed\n"
-        "- trade: trade responsible for the work\n\n"
-        "2. PREVENTIVE MAINTENANCE (PM) WORK ORDERS with these fields:\n"
-        "- work_order: unique identifier for the PM work order\n"
-        "- status: current status (Open, Closed, Complete, etc.)\n"
-        "- building_name: name of the building\n"
-        "- zone: geographic zone (NORTH, SOUTH, CENTER)\n"
-        "- region: region name\n"
-        "- equipment: equipment being maintained\n"
-        "- description: description of the maintenance task\n"
-        "- scheduled_start_date: when maintenance is scheduled\n"
-        "- date_completed: when maintenance was completed\n"
-        "- trade: trade responsible for the maintenance\n"
-        "- pm_code: code identifying the type of PM\n\n"
-        "3. PROCESS MAPS with these fields:\n"
-        "- title: name of the process map\n"
-        "- category: category the process map belongs to\n"
-        "- description: detailed description of what the process map covers\n"
-        "- file_data: the actual PDF content\n\n"
-    )
-
-    # --- Context Limiting Logic ---
-    # Only add the large context if code/data analysis is needed
+            response = INTENT_HANDLERS[intent](question, question_lower, route)
+        if response is not None:
+            return response
+    return None
+
+# ======================= Prompt Context =======================
+# Token budgets for the context of plain Q&A and code-generation prompts, and
+# the order sources are given room in (lower first), up to their limits.
+# Sections not listed here (e.g. a plain string context) come last.
+QA_CONTEXT_TOKENS = 400
+CODE_CONTEXT_TOKENS = 900
+QA_PRIORITIES = {"memory": 0, "knowledge": 1, "dictionary": 1, "faqs": 2, "data_profile": 3}
+CODE_PRIORITIES = {"data_profile": 0, "knowledge": 1, "dictionary": 1, "schema": 2, "memory": 3, "faqs": 4}
+QA_LIMITS = {"memory": 200, "knowledge": 200, "faqs": 150, "data_profile": 200}
+CODE_LIMITS = {"data_profile": 450, "memory": 150, "faqs": 100}
+
+# Database tables, only described to code-generation prompts
+SCHEMA_ITEMS = [
+    "1. WORK ORDERS with these fields:\n"
+    "- work_order: unique identifier for the work order\n"
+    "- status: current status (Open, Closed, In Progress, etc.)\n"
+    "- priority: priority level (Critical, High, Medium, Low)\n"
+    "- building_name: name of the building\n"
+    "- building_id: unique identifier for the building\n"
+    "- description: description of the work needed\n"
+    "- equipment: equipment involved\n"
+    "- scheduled_start_date: when work is scheduled to start\n"
+    "- date_completed: when work was completed\n"
+    "- trade: trade responsible for the work",
+    "2. PREVENTIVE MAINTENANCE (PM) WORK ORDERS with these fields:\n"
+    "- work_order: unique identifier for the PM work order\n"
+    "- status: current status (Open, Closed, Complete, etc.)\n"
+    "- building_name: name of the building\n"
+    "- zone: geographic zone (NORTH, SOUTH, CENTER)\n"
+    "- region: region name\n"
+    "- equipment: equipment being maintained\n"
+    "- description: description of the maintenance task\n"
+    "- scheduled_start_date: when maintenance is scheduled\n"
+    "- date_completed: when maintenance was completed\n"
+    "- trade: trade responsible for the maintenance\n"
+    "- pm_code: code identifying the type of PM",
+    "3. PROCESS MAPS with these fields:\n"
+    "- title: name of the process map\n"
+    "- category: category the process map belongs to\n"
+    "- description: detailed description of what the process map covers\n"
+    "- file_data: the actual PDF content",
+]
+
+SYSTEM_MESSAGE = "You are a helpful maintenance assistant for facilities management. Always explain causes and provide solutions or recommendations, not just direct answers. Do not provide code unless requested."
+
+def ask_gpt(question, context="", stream=False, question_embedding=None):
+    """
+    Answer a chat question from the intent handlers, the response cache or the LLM
+
+    Args:
+        question (str): The user's question
+        context (str or list): Context for the LLM, either text or prompt_budget
+                               sections (memory, FAQs, dictionary, data profile)
+        stream (bool): Return a generator of text chunks when the answer comes from the LLM
+        question_embedding (np.ndarray): The question's normalized embedding, if the caller has it
+
+    Returns:
+        str, dict or generator: The answer; a dict for structured (process map) answers,
+                                a generator of text chunks when streaming from the LLM
+    """
+    question_lower = question.lower()
+    route = route_question(question)
+    response = run_intent_handlers(question, question_lower, route)
+    if response is not None:
+        return response
+
+    needs_code = route["flags"]["needs_code"]
+
+    # Fill the context from whole items of each source, by priority, within the token budget
+    sections = list(context) if isinstance(context, list) else [section("context", (context or "").split("\n"))]
     if needs_code:
-        context = work_orders_context + context
-        # Truncate context if too long
-        if isinstance(context, str) and len(context) > 3000:
-            context = context[:3000] + "\n...[truncated]..."
+        sections.append(section("schema", SCHEMA_ITEMS, header="The system includes these data types:"))
+        context, usage = assemble_context(sections, CODE_CONTEXT_TOKENS, CODE_PRIORITIES, CODE_LIMITS)
     else:
-        # For plain Q&A, keep context minimal
-        if isinstance(context, str) and len(context) > 1000:
-            context = context[:1000] + "\n...[truncated]..."
-        # Do NOT add the large work_orders_context for simple Q&A
+        context, usage = assemble_context(sections, QA_CONTEXT_TOKENS, QA_PRIORITIES, QA_LIMITS)
+    dropped = {name: counts["dropped"] for name, counts in usage["sections"].items() if counts["dropped"]}
+    if dropped:
+        print(f"Context: {usage['tokens']}/{usage['budget']} tokens, dropped {dropped}")
 
     if needs_code:
         prompt = (
@@ -637,15 +668,54 @@ def ask_gpt(question, context=""):
             '- Be clear, conversational, and helpful\n'
             'Answer:'
         )
+    # Reuse the answer to a near-identical question asked with the same context
+    # sections (memory and retrieval hits included) and prompt mode
+    model_name = "gpt-3.5-turbo"
+    cache_key = None
+    if response_cache.ENABLED:
+        try:
+            if question_embedding is None:
+                question_embedding = response_cache.embed_question(question)
+            cache_key = (question_embedding, response_cache.context_key(model_name, needs_code, sections))
+            cached = response_cache.lookup(*cache_key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            print(f"Warning: Response cache unavailable: {str(e)}")
+            cache_key = None
+
     # Force use of gpt-3.5-turbo for speed, set max_tokens and temperature for faster, more focused responses
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful maintenance assistant for facilities management. Always explain causes and provide solutions or recommendations, not just direct answers. Do not provide code unless requested."},
+    request = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": SYSTEM_MESSAGE},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=512,
-        temperature=0.3,
-        response_format={"type": "text"}
-    )
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+        "max_tokens": 512,
+        "temperature": 0.3,
+        "response_format": {"type": "text"}
+    }
+    if stream:
+        return stream_completion(request, question, cache_key)
+
+    response = openai.ChatCompletion.create(**request)
+    answer = response.choices[0].message.content.strip()
+    if cache_key is not None:
+        response_cache.store(cache_key[0], cache_key[1], question, answer)
+    return answer
+
+def stream_completion(request, question, cache_key=None):
+    """
+    Yield the answer text as the completion streams in
+
+    The full answer is stored in the response cache once the stream ends.
+    """
+    chunks = []
+    for chunk in openai.ChatCompletion.create(stream=True, **request):
+        delta = chunk["choices"][0].get("delta", {}).get("content")
+        if delta:
+            chunks.append(delta)
+            yield delta
+    answer = "".join(chunks).strip()
+    if cache_key is not None and answer:
+        response_cache.store(cache_key[0], cache_key[1], question, answer)
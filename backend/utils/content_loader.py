@@ -1,31 +1,62 @@
-
 # 📁 backend/utils/content_loader.py
 import pandas as pd
 import os
 from .knowledge_base import search_learned_qa
+from .substring_index import build_substring_index, find_first
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+
+# The CSVs are read once and kept until their mtime changes, and each loaded
+# FAQ/definitions table gets a substring index (lowercased text plus token
+# postings) the first time search_content sees it, so a search doesn't walk
+# the rows with iterrows and lower() every cell.
+_tables = {}
+_search_indexes = {}
+MAX_SEARCH_INDEXES = 8
+
+def _load_csv(file_name):
+    path = os.path.join(DATA_DIR, file_name)
+    mtime = os.path.getmtime(path)
+    cached = _tables.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, pd.read_csv(path))
+        _tables[path] = cached
+    return cached[1]
 
 def load_faqs():
-    data_path = os.path.join(os.path.dirname(__file__), "..", "data", "faqs.csv")
-    return pd.read_csv(os.path.abspath(data_path))
+    return _load_csv("faqs.csv")
 
 
 def load_definitions():
-    data_path = os.path.join(os.path.dirname(__file__), '..', "data", "definitions.csv")
-    return pd.read_csv(os.path.abspath(data_path))
+    return _load_csv("definitions.csv")
 
 def load_links():
-    data_path = os.path.join(os.path.dirname(__file__), '..', "data", "links.csv")
-    return pd.read_csv(os.path.abspath(data_path))
+    return _load_csv("links.csv")
 
+def _search_index(table, columns):
+    """Substring indexes for a table's columns, built once per table object."""
+    key = (id(table), columns)
+    cached = _search_indexes.get(key)
+    # The table is kept with its index so its id can't be reused while cached
+    if cached is None or cached[0] is not table or cached[1] != len(table):
+        cached = (table, len(table), {column: build_substring_index(table[column].astype(str)) for column in columns})
+        _search_indexes[key] = cached
+        while len(_search_indexes) > MAX_SEARCH_INDEXES:
+            _search_indexes.pop(next(iter(_search_indexes)))
+    return cached[2]
 
 
 def search_content(query, faqs, definitions):
-    for _, row in faqs.iterrows():
-        if query.lower() in row['Question'].lower():
-            return row['Answer']
-    for _, row in definitions.iterrows():
-        if query.lower() in row['Term'].lower() or query.lower() in row['Definition'].lower():
-            return f"{row['Term']}: {row['Definition']}"
+    faq_index = _search_index(faqs, ("Question",))
+    row = find_first(faq_index["Question"], query)
+    if row is not None:
+        return faqs.iloc[row]['Answer']
+    definition_index = _search_index(definitions, ("Term", "Definition"))
+    rows = [find_first(definition_index[column], query) for column in ("Term", "Definition")]
+    rows = [row for row in rows if row is not None]
+    if rows:
+        row = definitions.iloc[min(rows)]
+        return f"{row['Term']}: {row['Definition']}"
     learned_answer = search_learned_qa(query)
     if learned_answer:
         return learned_answer
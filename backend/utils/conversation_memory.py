@@ -0,0 +1,115 @@
+import openai
+from backend.utils.supabase_client import supabase
+from backend.utils.db import get_user_memory, update_user_memory
+from backend.utils.prompt_budget import section, clip_to_tokens
+
+# Bounded per-user chat memory: the last RECENT_TURNS exchanges are kept
+# verbatim as rows of memory_turns, and everything older is folded into a
+# running summary (the user_memory.memory column) of at most
+# SUMMARY_TOKEN_BUDGET tokens. Once COMPACT_BATCH turns have piled up beyond
+# the recent window they're summarized in one call and deleted, so reading or
+# writing memory costs the same whether a user has had ten turns or ten
+# thousand. Budgets are counted with prompt_budget.count_tokens, the same
+# tokenizer ask_gpt's context budget uses. Expects:
+#
+#   create table memory_turns (
+#       id bigint generated always as identity primary key,
+#       user_id text not null,
+#       user_text text,
+#       bot_text text,
+#       created_at timestamptz default now()
+#   );
+#   create index on memory_turns (user_id, id);
+#
+# Memory saved before this existed (one long transcript string) is treated
+# as the summary and trimmed to the budget the next time it's compacted.
+MEMORY_TABLE = "memory_turns"
+RECENT_TURNS = 6
+COMPACT_BATCH = 6
+SUMMARY_TOKEN_BUDGET = 300
+TURN_TOKEN_LIMIT = 375
+SUMMARY_MODEL = "gpt-3.5-turbo"
+
+def format_turns(turns):
+    return "".join(f"\nUser: {turn['user_text']}\nBot: {turn['bot_text']}\n" for turn in turns)
+
+def load_memory(user_id):
+    """
+    Return a user's memory: the running summary and the most recent turns
+
+    Args:
+        user_id (str): The user
+
+    Returns:
+        dict: "summary" (str, at most SUMMARY_TOKEN_BUDGET tokens) and "turns"
+              (up to RECENT_TURNS dicts with user_text and bot_text, oldest first)
+    """
+    summary = clip_to_tokens(get_user_memory(user_id) or "", SUMMARY_TOKEN_BUDGET)
+    res = supabase.table(MEMORY_TABLE).select("user_text, bot_text").eq("user_id", user_id) \
+        .order("id", desc=True).limit(RECENT_TURNS).execute()
+    return {"summary": summary.strip(), "turns": list(reversed(res.data or []))}
+
+def memory_section(memory):
+    """Prompt section for a loaded memory: newest turns get room first, the summary last."""
+    memory = memory or {"summary": "", "turns": []}
+    items = [format_turns([turn]).strip() for turn in memory["turns"]]
+    ranks = list(range(len(items)))[::-1]
+    if memory["summary"]:
+        items.insert(0, "Summary of earlier conversation: " + memory["summary"])
+        ranks.insert(0, len(ranks))
+    return section("memory", items, header="Conversation so far:", ranks=ranks)
+
+def summarize_turns(summary, turns):
+    """Fold turns into the running summary, within SUMMARY_TOKEN_BUDGET."""
+    prompt = (
+        "You keep a running summary of a user's conversation with a facilities maintenance assistant.\n"
+        "Update the summary with the new exchanges below. Keep what helps answer future questions: "
+        "the user's buildings, equipment, PM codes, preferences and open issues. Drop small talk.\n"
+        f"Use at most {int(SUMMARY_TOKEN_BUDGET * 0.75)} words.\n\n"
+        f"Current summary:\n{clip_to_tokens(summary, SUMMARY_TOKEN_BUDGET * 4) or '(none)'}\n\n"
+        f"New exchanges:{format_turns(turns)}\n"
+        "Updated summary:"
+    )
+    try:
+        response = openai.ChatCompletion.create(
+            model=SUMMARY_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=SUMMARY_TOKEN_BUDGET,
+            temperature=0,
+        )
+        new_summary = response.choices[0].message.content.strip()
+    except Exception as e:
+        # Without the LLM keep the latest part of the transcript instead
+        print(f"Warning: Memory summary failed, truncating instead: {str(e)}")
+        new_summary = summary + format_turns(turns)
+    return clip_to_tokens(new_summary, SUMMARY_TOKEN_BUDGET)
+
+def compact_memory(user_id):
+    """Summarize and delete the turns older than the recent window once COMPACT_BATCH of them have built up."""
+    res = supabase.table(MEMORY_TABLE).select("id", count="exact").eq("user_id", user_id).limit(1).execute()
+    stored = res.count or 0
+    if stored < RECENT_TURNS + COMPACT_BATCH:
+        return False
+    old = supabase.table(MEMORY_TABLE).select("id, user_text, bot_text").eq("user_id", user_id) \
+        .order("id").limit(stored - RECENT_TURNS).execute().data or []
+    if not old:
+        return False
+    update_user_memory(user_id, summarize_turns(get_user_memory(user_id) or "", old))
+    supabase.table(MEMORY_TABLE).delete().in_("id", [turn["id"] for turn in old]).execute()
+    return True
+
+def record_turn(user_id, user_text, bot_text):
+    """
+    Store one exchange and compact older turns into the summary when due
+
+    Args:
+        user_id (str): The user
+        user_text (str): The user's message
+        bot_text (str): The bot's answer (text, or a description of structured content)
+    """
+    supabase.table(MEMORY_TABLE).insert({
+        "user_id": user_id,
+        "user_text": clip_to_tokens(str(user_text), TURN_TOKEN_LIMIT, keep="start"),
+        "bot_text": clip_to_tokens(str(bot_text), TURN_TOKEN_LIMIT, keep="start"),
+    }).execute()
+    compact_memory(user_id)
@@ -0,0 +1,97 @@
+import hashlib
+from collections import OrderedDict
+import pandas as pd
+
+# Compact text summary of an uploaded DataFrame for the LLM context, used
+# instead of serializing the whole file on every chat message. Profiles are
+# cached by a hash of the file so each upload is profiled once.
+MAX_COLUMNS = 40
+TOP_VALUES = 3
+SAMPLE_ROWS = 5
+MAX_CHARS = 2500
+CACHE_SIZE = 32
+
+_profiles = OrderedDict()
+
+def file_hash(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()[:16]
+
+def dataframe_hash(df):
+    """Hash a DataFrame's contents, for files that are only available as a DataFrame."""
+    digest = hashlib.sha256("|".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    text = str(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+def describe_column(name, series):
+    filled = series.notna().mean() if len(series) else 0
+    line = f"- {name} ({series.dtype}): {filled:.0%} filled, {series.nunique(dropna=True)} unique"
+    values = series.dropna()
+    if values.empty:
+        return line
+    if pd.api.types.is_bool_dtype(values):
+        line += f"; true {values.mean():.0%}"
+    elif pd.api.types.is_numeric_dtype(values):
+        line += f"; min {_format_value(values.min())}, mean {_format_value(float(values.mean()))}, max {_format_value(values.max())}"
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        line += f"; {values.min():%Y-%m-%d} to {values.max():%Y-%m-%d}"
+    else:
+        top = values.astype(str).value_counts().head(TOP_VALUES)
+        line += "; top: " + ", ".join(f"{_format_value(value)} ({count})" for value, count in top.items())
+    return line
+
+def profile_dataframe(df, sample_rows=SAMPLE_ROWS, max_chars=MAX_CHARS):
+    """
+    Summarize a DataFrame: shape, per-column dtype and stats, top categories and a few sample rows
+
+    Args:
+        df (pd.DataFrame): Uploaded data
+        sample_rows (int): Rows included as a CSV sample
+        max_chars (int): Upper bound on the length of the profile
+
+    Returns:
+        str: The profile text
+    """
+    lines = [f"Uploaded data: {len(df)} rows x {len(df.columns)} columns", "Columns:"]
+    for name in df.columns[:MAX_COLUMNS]:
+        lines.append(describe_column(name, df[name]))
+    if len(df.columns) > MAX_COLUMNS:
+        lines.append(f"- ... {len(df.columns) - MAX_COLUMNS} more columns")
+
+    if len(df) and sample_rows:
+        sample = df.sample(min(sample_rows, len(df)), random_state=0).sort_index()
+        lines.append("Sample rows (CSV):")
+        lines.append(sample.iloc[:, :MAX_COLUMNS].to_csv(index=False).strip())
+
+    profile = "\n".join(lines)
+    if len(profile) > max_chars:
+        profile = profile[:max_chars] + "\n...[profile truncated]..."
+    return profile
+
+def get_data_profile(df, key=None):
+    """
+    Return the profile for an upload, computing it only the first time
+
+    Args:
+        df (pd.DataFrame): Uploaded data
+        key (str): file_hash() of the uploaded bytes; dataframe_hash(df) when omitted
+
+    Returns:
+        str: The profile text
+    """
+    if df is None:
+        return ""
+    key = key or dataframe_hash(df)
+    if key in _profiles:
+        _profiles.move_to_end(key)
+        return _profiles[key]
+    profile = profile_dataframe(df)
+    _profiles[key] = profile
+    while len(_profiles) > CACHE_SIZE:
+        _profiles.popitem(last=False)
+    return profile
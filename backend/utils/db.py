@@ -14,6 +14,9 @@ from io import BytesIO
 import base64
 from typing import Optional, List, Dict
 from backend.utils.supabase_client import supabase
+from backend.utils.spreadsheet import read_excel
+from backend.utils.response_cache import invalidate_response_cache
+from backend.utils.knowledge_retriever import invalidate_source
 # ======================= User =======================
 
 def add_user(username: str, password: str, name: str) -> None:
@@ -77,7 +80,7 @@ def load_uploaded_file(session_id: str, user_id: str) -> Optional[pd.DataFrame]:
     file_bytes = base64.b64decode(encoded_content)
 
     if filename.endswith(('.xlsx', '.xls')):
-        return pd.read_excel(BytesIO(file_bytes))
+        return read_excel(BytesIO(file_bytes))
     elif filename.endswith('.csv'):
         return pd.read_csv(BytesIO(file_bytes))
     else:
@@ -179,9 +182,13 @@ def add_faq(category: str, question: str, answer: str) -> None:
         "question": question,
         "answer": answer
     }).execute()
+    invalidate_response_cache("FAQ added")
+    invalidate_source("faqs")
 
 def delete_faq(faq_id: str) -> None:
     supabase.table("faqs").delete().eq("id", faq_id).execute()
+    invalidate_response_cache("FAQ deleted")
+    invalidate_source("faqs")
 
 # ======================= Security =======================
 
@@ -0,0 +1,77 @@
+import re
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+MIN_SCORE = 0.15
+# PM codes look like "FC-Q-01" or "SAFETY-W-Q-01"
+CODE_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)+")
+
+def dictionary_entry(row):
+    sequence = row.get("sequence") or ""
+    description = row.get("description") or ""
+    return f"{sequence} – {description}"
+
+def build_dictionary_index(rows):
+    """
+    Build the retrieval index for the data dictionary once
+
+    The TF-IDF vectorizer is fit over every entry. Rows are L2-normalized, so a
+    query's cosine scores are a single sparse dot product. pm_code_rows maps
+    each lowercased pm_code to the row ids of its tasks.
+
+    Args:
+        rows (list): Dictionary rows with pm_code, sequence and description
+
+    Returns:
+        dict: corpus, vectorizer, matrix and pm_code_rows
+    """
+    corpus = [dictionary_entry(row) for row in rows]
+    pm_code_rows = {}
+    for i, row in enumerate(rows):
+        if row.get("pm_code"):
+            pm_code_rows.setdefault(str(row["pm_code"]).lower(), []).append(i)
+
+    index = {
+        "corpus": corpus,
+        "vectorizer": None,
+        "matrix": None,
+        "pm_code_rows": {code: np.array(ids) for code, ids in pm_code_rows.items()},
+    }
+    if corpus:
+        try:
+            index["vectorizer"] = TfidfVectorizer(stop_words="english")
+            index["matrix"] = index["vectorizer"].fit_transform(corpus).tocsr()
+        except ValueError:
+            # Every entry was empty or a stop word
+            index["vectorizer"] = None
+    return index
+
+def matching_rows(index, query):
+    """Row ids for the PM codes mentioned in the query, or None if it names none."""
+    ids = [index["pm_code_rows"][token] for token in CODE_TOKEN.findall(query.lower()) if token in index["pm_code_rows"]]
+    if not ids:
+        return None
+    return np.unique(np.concatenate(ids))
+
+def search_dictionary_index(index, query, top_k=3, min_score=MIN_SCORE):
+    """
+    Return the dictionary entries most relevant to a query
+
+    When the query mentions a known PM code only that code's tasks are scored.
+
+    Returns:
+        list: Up to top_k corpus entries scoring above min_score, best first
+    """
+    if index["vectorizer"] is None:
+        return []
+    query_vector = index["vectorizer"].transform([query])
+    row_ids = matching_rows(index, query)
+    matrix = index["matrix"] if row_ids is None else index["matrix"][row_ids]
+    scores = (matrix @ query_vector.T).toarray().ravel()
+    if not len(scores):
+        return []
+    top = np.argsort(scores)[-top_k:][::-1]
+    top = [i for i in top if scores[i] > min_score]
+    if row_ids is not None:
+        top = [row_ids[i] for i in top]
+    return [index["corpus"][i] for i in top]
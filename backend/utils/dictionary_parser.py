@@ -0,0 +1,180 @@
+import io
+import pandas as pd
+import numpy as np
+from backend.utils.spreadsheet import read_excel, open_excel_file
+
+# Marker rows ("Existing task in EAM", optional previous PM name in column B)
+# start sections of tasks that already exist in EAM under another PM
+EAM_MARKER = "existing task in eam"
+# Sheet header: PM name in B1, column headers on row 3
+PM_NAME_CELL = (0, 1)
+HEADER_ROW = 2
+
+SEQUENCE_TYPOS = ["seqience", "sequance", "sequnce", "sequece", "seqnce", "seq", "seqeunce"]
+DESCRIPTION_TYPOS = ["desc", "desciption", "discription", "descripton"]
+KEEP_COLUMNS = ["pm_code", "pm_name", "eam_pm_name", "sequence", "description"]
+
+def process_dataframe(df):
+    """Process a dataframe to clean columns and handle data types."""
+    # Handle NaN values
+    df = df.replace({np.nan: None, np.inf: None, -np.inf: None})
+
+    # Clean column names and fix typos
+    fixed_columns = []
+    for col in df.columns:
+        col_name = str(col).strip().lower().replace(" ", "_")
+        if col_name in SEQUENCE_TYPOS:
+            col_name = "sequence"
+        elif col_name in DESCRIPTION_TYPOS:
+            col_name = "description"
+        fixed_columns.append(col_name)
+    df.columns = fixed_columns
+
+    # Only keep essential columns and skip header rows that might have been ingested
+    if "sequence" in df.columns and "description" in df.columns:
+        df["sequence"] = pd.to_numeric(df["sequence"], errors="coerce")
+        df = df.dropna(subset=["sequence"])
+        df["sequence"] = df["sequence"].astype(int)
+        return df[[col for col in KEEP_COLUMNS if col in df.columns]]
+    return pd.DataFrame()
+
+def find_eam_markers(sheet_data):
+    """
+    Find "Existing task in EAM" rows with one vectorized scan of column A
+
+    Returns:
+        list: (row index, eam_pm_name) for each marker, in sheet order
+    """
+    if sheet_data.shape[1] == 0:
+        return []
+    first_col = sheet_data.iloc[:, 0]
+    is_text = first_col.map(lambda value: isinstance(value, str))
+    hits = is_text & first_col.where(is_text, "").str.lower().str.contains(EAM_MARKER, regex=False)
+    markers = []
+    for i in np.flatnonzero(hits.to_numpy()):
+        eam_pm_name = None
+        if sheet_data.shape[1] > 1 and pd.notnull(sheet_data.iat[i, 1]):
+            eam_pm_name = str(sheet_data.iat[i, 1])
+        markers.append((int(i), eam_pm_name))
+    return markers
+
+def _with_header(raw, header_row, end=None):
+    """Slice rows after header_row (up to end) and name the columns from header_row, like read_excel(header=...)."""
+    names = []
+    seen = {}
+    for i, value in enumerate(raw.iloc[header_row] if header_row < len(raw) else []):
+        name = f"Unnamed: {i}" if pd.isnull(value) else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    df = raw.iloc[header_row + 1:end].reset_index(drop=True)
+    df.columns = names[:df.shape[1]] + [f"Unnamed: {i}" for i in range(len(names), df.shape[1])]
+    return df
+
+def _has_header(row):
+    for col in row:
+        if pd.notnull(col) and isinstance(col, str) and ("sequence" in col.lower() or "seqience" in col.lower() or "desc" in col.lower()):
+            return True
+    return False
+
+def parse_sheet(sheet_name, sheet_data):
+    """
+    Turn one raw sheet (read with header=None) into dictionary rows
+
+    The main task list sits under the header on row 3; each "Existing task in
+    EAM" marker starts another section, which either has its own header row or
+    is read as sequence/description columns. Sections are sliced out of the
+    already-loaded sheet instead of re-reading the workbook.
+
+    Returns:
+        tuple: (list of row dicts, list of warning messages)
+    """
+    rows = []
+    warnings = []
+    pm_name = None
+    if sheet_data.shape[0] > PM_NAME_CELL[0] and sheet_data.shape[1] > PM_NAME_CELL[1]:
+        pm_name = sheet_data.iat[PM_NAME_CELL]
+
+    def add_rows(df, eam_pm_name):
+        df["pm_code"] = sheet_name
+        df["pm_name"] = pm_name
+        df["eam_pm_name"] = eam_pm_name
+        df = process_dataframe(df)
+        if not df.empty:
+            rows.extend(df.to_dict(orient="records"))
+
+    markers = find_eam_markers(sheet_data)
+    if not markers:
+        try:
+            add_rows(_with_header(sheet_data, HEADER_ROW), None)
+        except Exception as e:
+            warnings.append(f"Couldn't process sheet {sheet_name}: {str(e)}")
+        return rows, warnings
+
+    # Main section (before the first marker), needs at least header + one row
+    if markers[0][0] > HEADER_ROW + 1:
+        add_rows(_with_header(sheet_data, HEADER_ROW, markers[0][0]), None)
+
+    for i, (marker_row, eam_pm_name) in enumerate(markers):
+        next_section = markers[i + 1][0] if i < len(markers) - 1 else None
+        try:
+            raw_data = sheet_data.iloc[marker_row + 1:next_section]
+            if raw_data.empty:
+                continue
+            if _has_header(raw_data.iloc[0]):
+                eam_df = _with_header(sheet_data, marker_row + 1, next_section)
+            else:
+                eam_df = raw_data.reset_index(drop=True)
+                if eam_df.shape[1] < 2:
+                    warnings.append(f"Skipping section in {sheet_name}: insufficient columns")
+                    continue
+                eam_df.columns = ["sequence", "description"] + [f"col{j+3}" for j in range(eam_df.shape[1] - 2)]
+
+            if eam_pm_name and "description" in eam_df.columns:
+                eam_df["description"] = eam_df["description"].apply(
+                    lambda x: f"[EAM: {eam_pm_name}] {x}" if pd.notnull(x) else f"[EAM: {eam_pm_name}]"
+                )
+            add_rows(eam_df, eam_pm_name)
+        except Exception as e:
+            warnings.append(f"Couldn't process section in {sheet_name}: {str(e)}")
+    return rows, warnings
+
+def _read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return source.read()
+    with open(source, "rb") as f:
+        return f.read()
+
+def parse_dictionary_workbook(source):
+    """
+    Parse the PM dictionary workbook (one sheet per PM code) into dictionary rows
+
+    The workbook is read once and every sheet is parsed from that read. (Spawned
+    worker processes were slower than this on the bundled workbook, since each
+    one has to import pandas and re-open the file.)
+
+    Args:
+        source: Path, bytes or file-like object of the .xlsx workbook
+
+    Returns:
+        tuple: (list of row dicts in sheet order, list of warning messages)
+    """
+    workbook = open_excel_file(io.BytesIO(_read_bytes(source)))
+    sheets = read_excel(workbook, sheet_name=workbook.sheet_names, header=None)
+
+    rows = []
+    warnings = []
+    for sheet_name in workbook.sheet_names:
+        sheet_rows, sheet_warnings = parse_sheet(sheet_name, sheets[sheet_name])
+        rows.extend(sheet_rows)
+        warnings.extend(sheet_warnings)
+    return rows, warnings
@@ -0,0 +1,184 @@
+import pandas as pd
+
+DICTIONARY_TABLE = "dictionary"
+
+VALUE_FIELDS = ["pm_name", "description"]
+PAGE_SIZE = 1000
+BATCH_SIZE = 100
+
+def _clean(value):
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+def _text(value):
+    value = _clean(value)
+    return None if value is None else str(value)
+
+def _sequence(value):
+    value = _clean(value)
+    return None if value is None else int(value)
+
+def normalize_row(row):
+    """
+    The row as it is written to (and read back from) the dictionary table
+
+    Text columns are stored as text and sequence as an integer, so comparing
+    normalized rows doesn't see NaN vs None or 5 vs "5" as a change.
+    """
+    normalized = {"pm_code": str(row.get("pm_code")), "sequence": _sequence(row.get("sequence"))}
+    for field in VALUE_FIELDS + ["eam_pm_name"]:
+        if field in row:
+            normalized[field] = _text(row.get(field))
+    return normalized
+
+def row_key(row):
+    """Key a dictionary row by pm_code + sequence + eam_pm_name."""
+    return (str(row.get("pm_code")), _sequence(row.get("sequence")), _text(row.get("eam_pm_name")))
+
+def row_values(row):
+    return tuple(_text(row.get(field)) for field in VALUE_FIELDS)
+
+def has_eam_column(client, table=DICTIONARY_TABLE):
+    """Check whether the table has the eam_pm_name column."""
+    try:
+        client.table(table).select("eam_pm_name").limit(1).execute()
+        return True
+    except Exception as e:
+        if "eam_pm_name" in str(e):
+            return False
+        raise
+
+def fetch_dictionary_rows(client, include_eam=True, table=DICTIONARY_TABLE):
+    """Fetch every row of the dictionary table in pages."""
+    columns = "pm_code, pm_name, sequence, description"
+    if include_eam:
+        columns += ", eam_pm_name"
+    rows = []
+    page = 0
+    while True:
+        response = client.table(table).select(columns).range(page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1).execute()
+        batch = response.data or []
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            break
+        page += 1
+    return rows
+
+def _group(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row_key(row), []).append(row)
+    return groups
+
+def diff_dictionary(current_rows, new_rows):
+    """
+    Compare the current dictionary with an uploaded one
+
+    Rows are matched on pm_code + sequence + eam_pm_name. A key present once on
+    both sides with different pm_name/description becomes an update; keys that
+    repeat (e.g. when the table has no eam_pm_name column) are replaced as a group.
+
+    Args:
+        current_rows (list): Rows currently in the dictionary table
+        new_rows (list): Rows extracted from the uploaded workbook
+
+    Returns:
+        dict: "inserts" (rows), "updates" (rows), "deletes" (keys) and "unchanged" (count)
+    """
+    current = _group(current_rows)
+    new = _group(new_rows)
+    diff = {"inserts": [], "updates": [], "deletes": [], "unchanged": 0}
+
+    for key, rows in new.items():
+        old_rows = current.get(key)
+        if not old_rows:
+            diff["inserts"].extend(rows)
+        elif len(rows) == 1 and len(old_rows) == 1:
+            if row_values(rows[0]) != row_values(old_rows[0]):
+                diff["updates"].append(rows[0])
+            else:
+                diff["unchanged"] += 1
+        elif sorted(map(row_values, rows), key=str) == sorted(map(row_values, old_rows), key=str):
+            diff["unchanged"] += len(rows)
+        else:
+            diff["deletes"].append(key)
+            diff["inserts"].extend(rows)
+
+    for key in current:
+        if key not in new:
+            diff["deletes"].append(key)
+
+    return diff
+
+def _filter_eam(query, eam_pm_name, include_eam):
+    if not include_eam:
+        return query
+    if eam_pm_name is None:
+        return query.is_("eam_pm_name", "null")
+    return query.eq("eam_pm_name", eam_pm_name)
+
+def _delete_keys(client, keys, include_eam):
+    """Delete rows by key with one request per pm_code/eam_pm_name group; returns the number deleted."""
+    grouped = {}
+    for pm_code, sequence, eam_pm_name in keys:
+        grouped.setdefault((pm_code, eam_pm_name), set()).add(sequence)
+    deleted = 0
+    for (pm_code, eam_pm_name), sequences in grouped.items():
+        def query():
+            return _filter_eam(client.table(DICTIONARY_TABLE).delete().eq("pm_code", pm_code), eam_pm_name, include_eam)
+        values = sorted(s for s in sequences if s is not None)
+        if values:
+            deleted += len(query().in_("sequence", values).execute().data or [])
+        if None in sequences:
+            deleted += len(query().is_("sequence", "null").execute().data or [])
+    return deleted
+
+def apply_dictionary_diff(client, diff, new_rows, include_eam=True, progress_callback=None):
+    """
+    Apply a diff to the live dictionary table
+
+    PM codes missing from the upload are removed with one delete each; other
+    deletes are grouped per pm_code/eam_pm_name. PostgREST can't update rows
+    to different values in one request, so changed rows are deleted with the
+    grouped deletes and re-inserted with the inserts, in batches.
+
+    Returns:
+        dict: Counts of inserted, updated and deleted rows
+    """
+    counts = {"inserted": 0, "updated": 0, "deleted": 0}
+    uploaded_codes = {str(row.get("pm_code")) for row in new_rows}
+    total_steps = max(1, len(diff["deletes"]) + 2 * len(diff["updates"]) + len(diff["inserts"]))
+    done = 0
+
+    def report(steps):
+        nonlocal done
+        done += steps
+        if progress_callback:
+            progress_callback(min(1.0, done / total_steps))
+
+    # Deletes first so replaced key groups and changed rows can be re-inserted
+    removed_codes = sorted({key[0] for key in diff["deletes"] if key[0] not in uploaded_codes})
+    for pm_code in removed_codes:
+        res = client.table(DICTIONARY_TABLE).delete().eq("pm_code", pm_code).execute()
+        counts["deleted"] += len(res.data or [])
+    keys = [key for key in diff["deletes"] if key[0] not in removed_codes]
+    updated_keys = [row_key(row) for row in diff["updates"]]
+    # Each updated key matches exactly one current row
+    counts["deleted"] += _delete_keys(client, keys + updated_keys, include_eam) - len(updated_keys)
+    report(len(diff["deletes"]) + len(diff["updates"]))
+
+    rows = [(True, row) for row in diff["updates"]] + [(False, row) for row in diff["inserts"]]
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i+BATCH_SIZE]
+        client.table(DICTIONARY_TABLE).insert([normalize_row(row) for _, row in batch]).execute()
+        counts["updated"] += sum(is_update for is_update, _ in batch)
+        counts["inserted"] += sum(not is_update for is_update, _ in batch)
+        report(len(batch))
+
+    return counts
@@ -0,0 +1,119 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import numpy as np
+
+from backend.utils.embedding_models import DEFAULT_MODEL, BACKENDS, encode, get_embedding_model, get_model_stats
+from backend.utils.intent_benchmark import load_questions
+
+# Compares an embedding backend against torch on the retrieval the chatbot
+# does: the logged questions are matched against the learned answers and the
+# candidate must return the same top hits. Also times single-question and
+# batch encoding and reports the resident memory each backend added.
+#
+#   python -m backend.utils.embedding_benchmark --backend onnx-int8
+#   python -m backend.utils.embedding_benchmark --backend onnx --json
+
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+LEARNED_QA_FILE = os.path.join(UTILS_DIR, "learned_qa.csv")
+TOP_K = 5
+MIN_TOP1_AGREEMENT = 0.95
+
+def load_documents(limit=500):
+    """Learned answers to retrieve from (the first `limit` distinct ones)."""
+    documents = []
+    if os.path.exists(LEARNED_QA_FILE):
+        with open(LEARNED_QA_FILE, newline="", encoding="utf-8", errors="replace") as f:
+            for row in csv.reader(f):
+                if len(row) > 1 and row[1].strip() and row[1] not in documents:
+                    documents.append(row[1].strip())
+                if len(documents) >= limit:
+                    break
+    return documents
+
+def time_encode(texts, backend, batch):
+    started = time.perf_counter()
+    if batch:
+        encode(texts, backend=backend)
+    else:
+        for text in texts:
+            encode(text, backend=backend)
+    return (time.perf_counter() - started) / len(texts) * 1000
+
+def top_hits(queries, documents, k):
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+def run_benchmark(backend="onnx-int8", model=DEFAULT_MODEL, queries=200, documents=500):
+    """
+    Check a backend's retrieval parity with torch and time both
+
+    Returns:
+        dict: Top-1 agreement, top-k overlap, mean cosine between the two backends'
+              vectors, ms per text (single and batched), RSS added per backend and
+              parity (None when the backend fell back to torch and wasn't tested)
+    """
+    query_texts = load_questions()[:queries]
+    document_texts = load_documents(documents)
+    results = {"model": model, "backend": backend, "queries": len(query_texts), "documents": len(document_texts)}
+
+    vectors = {}
+    for name in ("torch", backend):
+        get_embedding_model(model, name)
+        encode(query_texts[:8], model, backend=name)  # first-call overhead
+        results[name] = {
+            "ms_per_question": round(time_encode(query_texts[:50], name, batch=False), 2),
+            "ms_per_text_batched": round(time_encode(document_texts, name, batch=True), 2),
+        }
+        vectors[name] = (encode(query_texts, model, backend=name), encode(document_texts, model, backend=name))
+
+    reference = top_hits(*vectors["torch"], TOP_K)
+    candidate = top_hits(*vectors[backend], TOP_K)
+    results["top1_agreement"] = round(float((reference[:, 0] == candidate[:, 0]).mean()), 4)
+    results[f"top{TOP_K}_overlap"] = round(float(np.mean([
+        len(set(a) & set(b)) / TOP_K for a, b in zip(reference, candidate)
+    ])), 4)
+    results["mean_cosine"] = round(float((vectors["torch"][0] * vectors[backend][0]).sum(axis=1).mean()), 4)
+    results["speedup"] = round(results["torch"]["ms_per_question"] / results[backend]["ms_per_question"], 2)
+    results["models"] = get_model_stats()
+    results["fell_back_to_torch"] = "fallback_from" in results["models"].get(f"{model}:{backend}", {})
+    # Torch compared with itself proves nothing, so parity is untested (None) then
+    results["parity"] = None if results["fell_back_to_torch"] else results["top1_agreement"] >= MIN_TOP1_AGREEMENT
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare an embedding backend with torch on retrieval parity and speed")
+    parser.add_argument("--backend", default="onnx-int8", choices=sorted(set(BACKENDS) - {"torch"}))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--queries", type=int, default=200, help="Logged questions used as queries")
+    parser.add_argument("--documents", type=int, default=500, help="Learned answers retrieved from")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.backend, args.model, args.queries, args.documents)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['model']}: {result['queries']} questions against {result['documents']} answers")
+        for name in ("torch", args.backend):
+            stats = result["models"].get(f"{args.model}:{name}", {})
+            print(f"  {name:10} {result[name]['ms_per_question']:.2f} ms/question, "
+                  f"{result[name]['ms_per_text_batched']:.2f} ms/text batched, "
+                  f"+{stats.get('rss_increase_mb')} MB RSS")
+        if result["fell_back_to_torch"]:
+            print(f"  {args.backend} could not be loaded and fell back to torch (is onnxruntime installed?)")
+            print("  parity: NOT TESTED")
+        else:
+            print(f"  speedup: {result['speedup']}x")
+            print(f"  top-1 agreement: {result['top1_agreement']:.1%}, top-{TOP_K} overlap: {result[f'top{TOP_K}_overlap']:.1%}, "
+                  f"mean cosine: {result['mean_cosine']:.4f}")
+            print(f"  parity: {'PASS' if result['parity'] else 'FAIL'} (top-1 agreement >= {MIN_TOP1_AGREEMENT:.0%})")
+    # 1 = parity failed, 2 = the backend couldn't be tested
+    if result["parity"] is None:
+        return 2
+    return 0 if result["parity"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
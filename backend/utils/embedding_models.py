@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+import numpy as np
+
+# One instance of each sentence-embedding model per process, loaded the first
+# time something encodes with it rather than when a module is imported (which
+# pulled torch and the model in before the chat page could render, and loaded
+# MiniLM once per module that imported it).
+# Streamlit runs scripts on several threads, so loading is guarded by a lock
+# per model. warm_up() starts the load on a background thread at startup.
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Inference backend behind the same encode() interface. "onnx" runs the model
+# with ONNX Runtime and "onnx-int8" uses the dynamically quantized int8 export
+# published with the model, which is several times faster on CPU-only hosts.
+# Both need `pip install "sentence-transformers[onnx]"`; without it, or if
+# the export can't be loaded, the model falls back to torch. Check retrieval
+# parity and speed with `python -m backend.utils.embedding_benchmark`.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_qint8_avx2.onnx")
+BACKENDS = {
+    "torch": {},
+    "onnx": {"backend": "onnx"},
+    "onnx-int8": {"backend": "onnx", "model_kwargs": {"file_name": ONNX_INT8_FILE}},
+}
+
+_lock = threading.Lock()
+_models = {}
+_load_locks = {}
+_stats = {}
+_warm_up_thread = None
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _parameter_mb(model):
+    try:
+        return round(sum(p.numel() * p.element_size() for p in model.parameters()) / 1024 ** 2, 1)
+    except Exception:
+        # ONNX Runtime sessions don't expose torch parameters
+        return None
+
+def model_id(name=DEFAULT_MODEL, backend=None):
+    """Identifier of a model and backend, for keying cached embeddings."""
+    return f"{name}:{backend or EMBEDDING_BACKEND}"
+
+def get_embedding_model(name=DEFAULT_MODEL, backend=None):
+    """
+    Return the loaded SentenceTransformer for a model name, loading it on first use
+
+    Args:
+        name (str): Model name, e.g. "all-MiniLM-L6-v2"
+        backend (str): One of BACKENDS; defaults to EMBEDDING_BACKEND
+
+    Returns:
+        SentenceTransformer: The shared model instance
+    """
+    backend = backend or EMBEDDING_BACKEND
+    key = model_id(name, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    with _lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    with load_lock:
+        if key not in _models:
+            from sentence_transformers import SentenceTransformer
+            rss_before = _rss_mb()
+            started = time.perf_counter()
+            try:
+                model = SentenceTransformer(name, **BACKENDS[backend])
+            except Exception as e:
+                if backend == "torch":
+                    raise
+                print(f"Warning: Could not load {name} with the {backend} backend, using torch: {str(e)}")
+                model = get_embedding_model(name, "torch")
+                _models[key] = model
+                _stats[key] = dict(_stats[model_id(name, "torch")], fallback_from=backend)
+                return model
+            seconds = time.perf_counter() - started
+            rss_after = _rss_mb()
+            _stats[key] = {
+                "load_seconds": round(seconds, 3),
+                "parameter_mb": _parameter_mb(model),
+                "rss_increase_mb": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+                "thread": threading.current_thread().name,
+            }
+            print(f"Loaded embedding model {name} ({backend}) in {seconds:.1f}s")
+            _models[key] = model
+    return _models[key]
+
+def encode(texts, name=DEFAULT_MODEL, normalize=True, backend=None):
+    """
+    Embed a text or list of texts with a shared model
+
+    Args:
+        texts (str or list): Text(s) to embed
+        name (str): Model name
+        normalize (bool): Return unit-length vectors (cosine similarity is then a dot product)
+        backend (str): One of BACKENDS; defaults to EMBEDDING_BACKEND
+
+    Returns:
+        np.ndarray: float32 vector for a single text, matrix for a list
+    """
+    model = get_embedding_model(name, backend)
+    return model.encode(texts, normalize_embeddings=normalize, convert_to_numpy=True).astype(np.float32)
+
+def warm_up(names=(DEFAULT_MODEL,)):
+    """Load models on a background thread so the first question doesn't wait for them (once per process)."""
+    global _warm_up_thread
+    with _lock:
+        if _warm_up_thread is not None:
+            return _warm_up_thread
+
+        def load():
+            for name in names:
+                try:
+                    get_embedding_model(name)
+                except Exception as e:
+                    print(f"Warning: Could not warm up embedding model {name}: {str(e)}")
+
+        _warm_up_thread = threading.Thread(target=load, name="embedding-warm-up", daemon=True)
+        _warm_up_thread.start()
+        return _warm_up_thread
+
+def get_model_stats():
+    """Load time, parameter memory and RSS increase of each loaded model and backend."""
+    return {name: dict(stats) for name, stats in _stats.items()}
@@ -1,15 +1,80 @@
-from sentence_transformers import SentenceTransformer, util
+import os
+import hashlib
+import numpy as np
+from backend.utils.embedding_models import DEFAULT_MODEL, encode, model_id
 
-# Load the model once (fast and lightweight)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = DEFAULT_MODEL
 
-def get_faq_match(user_question, faqs_df, threshold=0.7):
-    faq_questions = faqs_df['question'].tolist()
-    faq_embeddings = model.encode(faq_questions, convert_to_tensor=True)
-    user_embedding = model.encode(user_question, convert_to_tensor=True)
-    similarities = util.cos_sim(user_embedding, faq_embeddings)[0]
+# FAQ question embeddings are stored as normalized float32 .npy files named by
+# a hash of the questions, so they're only recomputed when add_faq/delete_faq
+# (or an edit in Supabase) changes the set of questions.
+EMBEDDING_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "faq_embeddings"))
+
+_embeddings = {}
+
+def faq_fingerprint(questions):
+    # Backends give slightly different vectors, so embeddings are saved per backend
+    digest = hashlib.sha256(model_id(MODEL_NAME).encode("utf-8"))
+    for question in questions:
+        digest.update(b"\0" + str(question).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def get_faq_embeddings(questions):
+    """
+    Return the normalized embedding matrix for a list of FAQ questions
+
+    Looks in memory first, then for a saved .npy file (memory-mapped), and only
+    encodes the questions when neither exists for this exact set.
+
+    Args:
+        questions (list): FAQ questions, in the order of the FAQ table
+
+    Returns:
+        np.ndarray: One unit-length row per question
+    """
+    key = faq_fingerprint(questions)
+    if key in _embeddings:
+        return _embeddings[key]
+
+    path = os.path.join(EMBEDDING_DIR, f"faq_{key}.npy")
+    matrix = None
+    if os.path.exists(path):
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.shape[0] != len(questions):
+                matrix = None
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable FAQ embeddings {path}: {str(e)}")
+            matrix = None
+
+    if matrix is None:
+        matrix = encode(questions, MODEL_NAME)
+        try:
+            os.makedirs(EMBEDDING_DIR, exist_ok=True)
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, matrix)
+            os.replace(tmp_path, path)
+            # Embeddings for older versions of the FAQ set are no longer needed
+            for name in os.listdir(EMBEDDING_DIR):
+                if name.startswith("faq_") and name != os.path.basename(path):
+                    os.remove(os.path.join(EMBEDDING_DIR, name))
+        except OSError as e:
+            print(f"Warning: Could not save FAQ embeddings: {str(e)}")
+
+    _embeddings.clear()
+    _embeddings[key] = matrix
+    return matrix
+
+def get_faq_match(user_question, faqs_df, threshold=0.7, user_embedding=None):
+    if faqs_df is None or faqs_df.empty:
+        return None
+    faq_embeddings = get_faq_embeddings(faqs_df['question'].tolist())
+    if user_embedding is None:
+        user_embedding = encode(user_question, MODEL_NAME)
+    # Cosine similarity is a dot product on unit vectors
+    similarities = faq_embeddings @ user_embedding
     best_idx = int(similarities.argmax())
     best_score = float(similarities[best_idx])
     if best_score >= threshold:
         return faqs_df.iloc[best_idx]['answer']
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,151 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+
+from backend.utils.intent_router import (
+    route_question,
+    GUIDANCE_KEYWORDS,
+    BEST_PRACTICE_KEYWORDS,
+    PROCESS_MAP_PHRASES,
+    SUMMARY_PHRASES,
+    DASHBOARD_PHRASES,
+    CUSTOM_DASHBOARD_PHRASES,
+    PM_WORK_ORDER_PHRASES,
+    NEEDS_CODE_PHRASES,
+)
+
+# Benchmarks intent routing for ask_gpt over real questions: the ones logged in
+# learned_qa.csv and unanswered_log.csv, plus examples of every intent. The
+# legacy cascade below reproduces the order of checks ask_gpt used to run on
+# every message, so the router can be checked for the same routing decisions.
+#
+#   python -m backend.utils.intent_benchmark
+#   python -m backend.utils.intent_benchmark --repeat 200 --json
+
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTION_FILES = [
+    (os.path.join(UTILS_DIR, "learned_qa.csv"), 0),
+    (os.path.join(UTILS_DIR, "..", "data", "unanswered_log.csv"), "Question"),
+]
+SAMPLE_QUESTIONS = [
+    "What are the building code regulations for fire alarms?",
+    "Show me the best practice for boiler maintenance",
+    "Where is the OEM manual for the rooftop unit?",
+    "Show me the process map for work order closeout",
+    "How do I create a work order?",
+    "Give me a summary of yesterday's work orders",
+    "Generate dashboard for the latest work orders",
+    "Create a custom dashboard for building 12 plumbing last week",
+    "What is the status of work order 1234567?",
+    "List building work orders for building id 42",
+    "Show critical work orders",
+    "What are the PM codes for emergency generators?",
+    "List the tasks for FC-Q-01",
+    "Show overdue preventive maintenance",
+    "Upcoming PM schedule for zone north",
+    "PM work order metrics for region calgary",
+    "Plot a bar chart of work orders by status",
+    "Why does my boiler keep tripping?",
+]
+
+def load_questions():
+    questions = list(SAMPLE_QUESTIONS)
+    for path, column in QUESTION_FILES:
+        if not os.path.exists(path):
+            continue
+        with open(path, newline="", encoding="utf-8", errors="replace") as f:
+            if isinstance(column, int):
+                rows = (row[column] for row in csv.reader(f) if len(row) > column)
+            else:
+                rows = (row.get(column) for row in csv.DictReader(f))
+            questions.extend(q.strip() for q in rows if q and q.strip())
+    return questions
+
+def legacy_route(question):
+    """The routing decisions of the old if/any() cascade in ask_gpt, without the handlers."""
+    question_lower = question.lower()
+    intents = []
+    if any(kw in question_lower for kw in GUIDANCE_KEYWORDS):
+        intents.append("guidance")
+    if any(kw in question_lower for kw in BEST_PRACTICE_KEYWORDS):
+        intents.append("best_practices")
+    if any(phrase in question_lower for phrase in PROCESS_MAP_PHRASES):
+        intents.append("process_maps")
+    if any(phrase in question_lower for phrase in SUMMARY_PHRASES):
+        intents.append("work_order_summary")
+    if any(phrase in question_lower for phrase in DASHBOARD_PHRASES):
+        intents.append("dashboard")
+    if any(phrase in question_lower for phrase in CUSTOM_DASHBOARD_PHRASES):
+        intents.append("custom_dashboard")
+    if re.search(r"work\s*order\s*(?:number)?\s*[#:]?\s*(\d+)", question_lower):
+        intents.append("work_order")
+    elif any(kw in question_lower for kw in ["building work orders", "work orders for building"]):
+        intents.append("building_work_orders")
+    elif "critical work orders" in question_lower or "high priority work orders" in question_lower:
+        intents.append("critical_work_orders")
+    if (("what" in question_lower or "list" in question_lower or "show" in question_lower) and
+            ("pm code" in question_lower or "pm codes" in question_lower or "task plan" in question_lower)):
+        intents.append("pm_codes")
+    re.search(r"([A-Z]+[-]\w+[-]\d{2})", question)
+    intents.append("pm_tasks")
+    if any(phrase in question_lower for phrase in PM_WORK_ORDER_PHRASES):
+        intents.append("pm_work_orders")
+        re.search(r"building\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
+        re.search(r"zone\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
+        re.search(r"region\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)", question_lower)
+    any(kw in question_lower for kw in NEEDS_CODE_PHRASES)
+    return intents
+
+def time_routes(route, questions, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            route(question)
+    return time.perf_counter() - started
+
+def run_benchmark(repeat=50):
+    """
+    Time the router against the legacy cascade and check they route alike
+
+    Returns:
+        dict: Question count, microseconds per question for each, and mismatches
+    """
+    questions = load_questions()
+    mismatches = [q for q in questions if route_question(q)["intents"] != legacy_route(q)]
+    calls = len(questions) * repeat
+    legacy_seconds = time_routes(legacy_route, questions, repeat)
+    router_seconds = time_routes(route_question, questions, repeat)
+    return {
+        "questions": len(questions),
+        "repeat": repeat,
+        "legacy_us_per_question": round(legacy_seconds / calls * 1e6, 2),
+        "router_us_per_question": round(router_seconds / calls * 1e6, 2),
+        "speedup": round(legacy_seconds / router_seconds, 2) if router_seconds else None,
+        "mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:5],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ask_gpt intent routing over logged questions")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the question corpus")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Intent routing over {result['questions']} questions x {result['repeat']}")
+        print(f"  legacy cascade: {result['legacy_us_per_question']:.2f} us/question")
+        print(f"  router:         {result['router_us_per_question']:.2f} us/question ({result['speedup']}x)")
+        print(f"  routing mismatches: {result['mismatches']}")
+        for question in result["mismatch_examples"]:
+            print(f"    {question!r}")
+    return 1 if result["mismatches"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import re
+
+# ======================= Phrase Matcher =======================
+# All intent phrases are compiled into one regex built from a trie of the
+# phrases, wrapped in a lookahead so every start position is tried once and the
+# longest phrase starting there wins. Phrases that are prefixes of that match
+# also occur at the same position, so they're added from a precomputed table.
+# The result is the same set of hits as `phrase in question_lower` for every
+# phrase, from a single scan of the question.
+
+def _trie_pattern(phrases):
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def pattern(node):
+        terminal = "" in node
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional: the longer phrase is preferred, the shorter still matches
+            return "(?:" + body + ")?"
+        return body
+
+    return pattern(trie)
+
+class PhraseMatcher:
+    """Find which of a fixed set of phrases occur (as substrings) in a text and collect their labels."""
+
+    def __init__(self, phrase_labels):
+        self.phrases = sorted(phrase_labels)
+        self.regex = re.compile("(?=(" + _trie_pattern(self.phrases) + "))")
+        # Labels of a phrase and of every shorter phrase it starts with
+        self.prefix_labels = {
+            phrase: frozenset().union(*(phrase_labels[other] for other in self.phrases if phrase.startswith(other)))
+            for phrase in self.phrases
+        }
+
+    def find(self, text):
+        labels = set()
+        for found in set(self.regex.findall(text)):
+            if found:
+                labels |= self.prefix_labels[found]
+        return labels
+
+# ======================= Intents =======================
+# Checked in this order. "all_of" lists phrase groups that must each have a
+# hit (none means the intent is a candidate for every question) and "pattern"
+# names a slot regex that must match the lowercased question. Only the first
+# matching intent of a "group" is tried, mirroring the old if/elif chain.
+# Handlers return None to fall through.
+
+GUIDANCE_KEYWORDS = ["regulation", "bylaw", "code", "legal requirement"]
+BEST_PRACTICE_KEYWORDS = ["best practice", "oem manual", "manual", "procedure", "recommendation", "standard", "maintenance tip"]
+PROCESS_MAP_PHRASES = [
+    "process map", "workflow", "procedure", "flow chart", "diagram",
+    "process diagram", "work order flow", "steps for", "process for",
+    "how do i", "how to", "procedure for", "what's the process",
+    "show me process", "get process", "find process", "display process",
+    "need the process", "want the process"
+]
+SUMMARY_PHRASES = [
+    "summary of yesterday", "yesterday's work order", "summary of work orders",
+    "yesterday's summary", "work orders from yesterday", "yesterday work order summary"
+]
+DASHBOARD_PHRASES = [
+    "generate dashboard", "create dashboard", "show dashboard", "daily dashboard",
+    "yesterday's dashboard", "work order dashboard"
+]
+CUSTOM_DASHBOARD_PHRASES = ["custom dashboard", "specific dashboard", "filtered dashboard"]
+BUILDING_WORK_ORDER_PHRASES = ["building work orders", "work orders for building"]
+CRITICAL_PHRASES = ["critical work orders", "high priority work orders"]
+PM_CODE_VERBS = ["what", "list", "show"]
+PM_CODE_NOUNS = ["pm code", "pm codes", "task plan"]
+PM_WORK_ORDER_PHRASES = [
+    "preventive maintenance", "pm work order", "pm schedule",
+    "maintenance schedule", "maintenance plan", "maintenance task",
+    "scheduled maintenance", "equipment maintenance", "list maintenance",
+    "show maintenance", "maintenance for", "maintenance at"
+]
+NEEDS_CODE_PHRASES = [
+    "visualize", "chart", "graph", "plot", "draw", "bar chart", "line chart", "heatmap", "generate code"
+]
+
+INTENTS = [
+    {"name": "guidance", "all_of": [GUIDANCE_KEYWORDS]},
+    {"name": "best_practices", "all_of": [BEST_PRACTICE_KEYWORDS]},
+    {"name": "process_maps", "all_of": [PROCESS_MAP_PHRASES]},
+    {"name": "work_order_summary", "all_of": [SUMMARY_PHRASES]},
+    {"name": "dashboard", "all_of": [DASHBOARD_PHRASES]},
+    {"name": "custom_dashboard", "all_of": [CUSTOM_DASHBOARD_PHRASES]},
+    {"name": "work_order", "group": "work_orders", "pattern": "work_order"},
+    {"name": "building_work_orders", "group": "work_orders", "all_of": [BUILDING_WORK_ORDER_PHRASES]},
+    {"name": "critical_work_orders", "group": "work_orders", "all_of": [CRITICAL_PHRASES]},
+    {"name": "pm_codes", "all_of": [PM_CODE_VERBS, PM_CODE_NOUNS]},
+    {"name": "pm_tasks"},
+    {"name": "pm_work_orders", "all_of": [PM_WORK_ORDER_PHRASES]},
+]
+
+# Flags read by the handlers, matched in the same pass as the intent phrases
+FLAG_PHRASES = {
+    "needs_code": NEEDS_CODE_PHRASES,
+    "latest": ["latest", "recent"],
+    "last_week": ["last week"],
+    "last_month": ["last month"],
+    "overdue": ["overdue", "past due"],
+    "upcoming": ["upcoming", "scheduled", "future"],
+    "metrics": ["metrics", "completion rate", "summary"],
+}
+TRADES = ["electric", "plumbing", "mechanical", "hvac", "carpentry"]
+
+# Each phrase is labelled with the (intent, phrase group) pairs, flags and
+# trades it belongs to; an intent matches when all its groups' labels are found
+_phrase_labels = {}
+def _label(phrases, label):
+    for phrase in phrases:
+        _phrase_labels.setdefault(phrase, set()).add(label)
+
+for _intent in INTENTS:
+    _intent["requires"] = frozenset((_intent["name"], i) for i in range(len(_intent.get("all_of", []))))
+    for _i, _phrases in enumerate(_intent.get("all_of", [])):
+        _label(_phrases, (_intent["name"], _i))
+for _flag, _phrases in FLAG_PHRASES.items():
+    _label(_phrases, ("flag", _flag))
+for _trade in TRADES:
+    _label([_trade], ("trade", _trade))
+MATCHER = PhraseMatcher(_phrase_labels)
+_INTENT_TABLE = [(i["name"], i.get("group"), i.get("pattern"), i["requires"]) for i in INTENTS]
+
+# ======================= Slots =======================
+
+PATTERNS = {
+    "work_order": re.compile(r"work\s*order\s*(?:number)?\s*[#:]?\s*(\d+)"),
+    "building_id": re.compile(r"building\s*(?:id|number)?\s*[#:]?\s*(\d+)"),
+    "building_name": re.compile(r"building\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)"),
+    "zone": re.compile(r"zone\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)"),
+    "region": re.compile(r"region\s*(?:name)?\s*[:]?\s*[\"']?([^\"']+?)[\"']?(?:\s|$)"),
+}
+# PM codes are matched on the original question, e.g. "FC-Q-01"
+PM_CODE_PATTERN = re.compile(r"([A-Z]+[-]\w+[-]\d{2})")
+
+def _search(name, text):
+    match = PATTERNS[name].search(text)
+    return match.group(1) if match else None
+
+def route_question(question):
+    """
+    Work out which handlers can answer a question, in the order to try them
+
+    Args:
+        question (str): The user's question
+
+    Returns:
+        dict: "intents" (names in priority order), "flags" (booleans from
+              FLAG_PHRASES) and "slots" (extracted values)
+    """
+    question_lower = question.lower()
+    labels = MATCHER.find(question_lower)
+    slots = {"work_order": _search("work_order", question_lower)}
+
+    intents = []
+    seen_groups = set()
+    for name, group, pattern, requires in _INTENT_TABLE:
+        if group in seen_groups:
+            continue
+        if slots[pattern] is not None if pattern else requires <= labels:
+            intents.append(name)
+            if group:
+                seen_groups.add(group)
+
+    # Only pay for the slot regexes the chosen intents use
+    if "custom_dashboard" in intents or "building_work_orders" in intents or "pm_work_orders" in intents:
+        for name in ("building_id", "building_name", "zone", "region"):
+            slots[name] = _search(name, question_lower)
+    else:
+        slots.update(building_id=None, building_name=None, zone=None, region=None)
+    pm_code_match = PM_CODE_PATTERN.search(question)
+    slots["pm_code"] = pm_code_match.group(1) if pm_code_match else None
+    slots["trade"] = next((trade.upper() for trade in TRADES if ("trade", trade) in labels), None)
+
+    return {
+        "intents": intents,
+        "flags": {flag: ("flag", flag) in labels for flag in FLAG_PHRASES},
+        "slots": slots,
+    }
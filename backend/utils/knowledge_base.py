@@ -1,24 +1,91 @@
 # 📁 backend/utils/knowledge_base.py
 import os
-import pandas as pd
 import csv
+import time
+import threading
+import pandas as pd
+from .substring_index import build_substring_index, add_text, find_first
 
 LEARNED_QA_PATH = os.path.join(os.path.dirname(__file__), "learned_qa.csv")
+COLUMNS = ["Question", "Answer", "Source"]
 
-def load_learned_qa():
+# Learned Q&A is kept in memory with an inverted index from lowercased tokens
+# to rows (see substring_index), so search_learned_qa doesn't read the CSV per
+# query. The file's mtime and size are checked at most every
+# RELOAD_CHECK_SECONDS and the index is rebuilt when another process changed
+# it; save_learned_qa appends to the file and the index together.
+RELOAD_CHECK_SECONDS = 2
+
+_lock = threading.Lock()
+_index = None
+
+def _stat():
+    try:
+        stat = os.stat(LEARNED_QA_PATH)
+        return (stat.st_mtime, stat.st_size)
+    except OSError:
+        return None
+
+def _read_entries():
+    entries = []
     if os.path.exists(LEARNED_QA_PATH):
-        return pd.read_csv(LEARNED_QA_PATH)
-    else:
-        return pd.DataFrame(columns=["Question", "Answer", "Source"])
+        with open(LEARNED_QA_PATH, newline="", encoding="utf-8", errors="replace") as f:
+            for row in csv.reader(f):
+                if len(row) < 2 or row[:2] == COLUMNS[:2]:
+                    continue
+                entries.append((row[0], row[1], row[2] if len(row) > 2 else ""))
+    return entries
+
+def _add_entry(index, question, answer, source):
+    index["entries"].append((question, answer, source))
+    add_text(index["questions"], question)
+
+def _load_index():
+    stat = _stat()
+    index = {"entries": [], "questions": build_substring_index(), "stat": stat, "checked_at": time.time()}
+    for entry in _read_entries():
+        _add_entry(index, *entry)
+    return index
+
+def _get_index():
+    global _index
+    with _lock:
+        now = time.time()
+        if _index is None:
+            _index = _load_index()
+        elif now - _index["checked_at"] >= RELOAD_CHECK_SECONDS:
+            _index["checked_at"] = now
+            if _stat() != _index["stat"]:
+                _index = _load_index()
+        return _index
+
+def load_learned_qa():
+    entries = _get_index()["entries"]
+    return pd.DataFrame(entries, columns=COLUMNS)
+
+def learned_qa_entries():
+    """(question, answer, source) tuples in file order."""
+    return list(_get_index()["entries"])
 
 def save_learned_qa(question, answer, source="AI"):
-    with open(LEARNED_QA_PATH, mode="a", newline='', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([question.strip(), answer.strip(), source])
+    index = _get_index()
+    with _lock:
+        up_to_date = _stat() == index["stat"]
+        with open(LEARNED_QA_PATH, mode="a", newline='', encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([question.strip(), answer.strip(), source])
+        if up_to_date:
+            _add_entry(index, question.strip(), answer.strip(), source)
+            index["stat"] = _stat()
+        else:
+            # Someone else changed the file too; read it again on the next lookup
+            index["stat"] = None
+            index["checked_at"] = 0
+    from .knowledge_retriever import add_documents, learned_qa_document
+    add_documents("learned_qa", [learned_qa_document(question, answer)])
 
 def search_learned_qa(query):
-    df = load_learned_qa()
-    for _, row in df.iterrows():
-        if query.lower() in row["Question"].lower():
-            return row["Answer"]
-    return None
\ No newline at end of file
+    """Answer of the first learned question (in file order) that contains the query, case-insensitively."""
+    index = _get_index()
+    row = find_first(index["questions"], query)
+    return index["entries"][row][1] if row is not None else None
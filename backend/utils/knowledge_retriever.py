@@ -0,0 +1,411 @@
+import os
+import re
+import math
+import time
+import hashlib
+import threading
+from collections import Counter, deque
+import numpy as np
+
+# One retrieval service over every knowledge source the chatbot answers from
+# (FAQs, the data dictionary, process maps, learned Q&A and definitions).
+# Each source gets a BM25 index and a matrix of normalized embeddings; a query
+# is scored lexically and semantically against every source and the ranked
+# lists are merged with reciprocal-rank fusion, so exact terms (PM codes,
+# equipment names) and paraphrases both surface. Indexes are built once per
+# process, by warm_up() or in the background on first search; new documents
+# are appended with add_documents() and a changed source is rebuilt after
+# invalidate_source(), while searches keep using the old index. A published
+# index is never modified (appending builds a new one and swaps it in), so
+# searches score it without holding _lock.
+# Source embeddings are saved under EMBEDDING_DIR so a restart doesn't
+# re-encode the whole dictionary.
+RRF_K = 60
+CANDIDATES = 20
+MIN_DENSE_SCORE = 0.25
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Seconds before retrying the embedding model after it failed to load
+DENSE_RETRY_SECONDS = 300
+EMBEDDING_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "retriever_embeddings"))
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or show "
+    "the this to what when where which who why with you".split()
+)
+
+_lock = threading.RLock()
+_indexes = {}
+_build_locks = {}
+_stale = set()
+_stats = {}
+_dense_enabled = True
+_dense_retry_at = 0.0
+_warm_up_thread = None
+SEARCH_TIMINGS = deque(maxlen=100)
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", str(text).lower()) if token not in STOPWORDS]
+
+# ======================= Sources =======================
+# Each loader returns documents as dicts: "id", "text" (what's indexed) and
+# "content" (what's returned to the prompt or the caller).
+
+def load_faq_documents():
+    from backend.utils.db import load_faqs
+    faqs = load_faqs()
+    return [
+        {"id": str(row.get("id", i)), "text": row["question"], "content": f"Q: {row['question']}\nA: {row['answer']}"}
+        for i, row in enumerate(faqs.to_dict("records"))
+    ]
+
+def load_dictionary_documents():
+    from backend.utils.supabase_client import supabase
+    from backend.utils.dictionary_sync import fetch_dictionary_rows
+    from backend.utils.dictionary_index import dictionary_entry
+    documents = []
+    for i, row in enumerate(fetch_dictionary_rows(supabase, include_eam=False)):
+        entry = dictionary_entry(row)
+        documents.append({
+            "id": str(i),
+            "text": f"{row.get('pm_code') or ''} {row.get('pm_name') or ''} {entry}",
+            "content": entry,
+        })
+    return documents
+
+def load_process_map_documents():
+    from backend.utils.supabase_client import supabase
+    rows = supabase.table("process_maps").select("id, title, category, description").execute().data or []
+    return [
+        {
+            "id": str(row["id"]),
+            "text": " ".join(str(row.get(column) or "") for column in ("title", "category", "description")),
+            "content": f"Process map: {row.get('title')} ({row.get('category')})",
+        }
+        for row in rows
+    ]
+
+def load_learned_qa_documents():
+    from backend.utils.knowledge_base import learned_qa_entries
+    return [
+        learned_qa_document(question, answer, i)
+        for i, (question, answer, _) in enumerate(learned_qa_entries())
+        if question.strip()
+    ]
+
+def learned_qa_document(question, answer, row_number=None):
+    document = {"text": question, "content": f"Q: {question.strip()}\nA: {answer.strip()}"}
+    if row_number is not None:
+        document["id"] = str(row_number)
+    return document
+
+def load_definition_documents():
+    from backend.utils.content_loader import load_definitions
+    definitions = load_definitions()
+    return [
+        {"id": str(i), "text": f"{row['Term']} {row['Definition']}", "content": f"{row['Term']}: {row['Definition']}"}
+        for i, row in enumerate(definitions.to_dict("records"))
+    ]
+
+SOURCES = {
+    "faqs": load_faq_documents,
+    "dictionary": load_dictionary_documents,
+    "process_maps": load_process_map_documents,
+    "learned_qa": load_learned_qa_documents,
+    "definitions": load_definition_documents,
+}
+
+# ======================= Embeddings =======================
+
+def _dense_available():
+    return _dense_enabled and time.monotonic() >= _dense_retry_at
+
+def _encode(texts):
+    """Normalized embeddings, or None when the embedding model isn't available."""
+    global _dense_enabled, _dense_retry_at
+    if not _dense_available():
+        return None
+    try:
+        from backend.utils.embedding_models import get_embedding_model, encode
+    except ImportError as e:
+        print(f"Warning: Dense retrieval disabled, using BM25 only: {str(e)}")
+        _dense_enabled = False
+        return None
+    try:
+        get_embedding_model()
+    except Exception as e:
+        print(f"Warning: Embedding model unavailable, using BM25 only for {DENSE_RETRY_SECONDS}s: {str(e)}")
+        _dense_retry_at = time.monotonic() + DENSE_RETRY_SECONDS
+        return None
+    try:
+        return encode(texts)
+    except Exception as e:
+        # A failed encode (e.g. one bad batch) only affects this call
+        print(f"Warning: Could not embed for retrieval, using BM25 only: {str(e)}")
+        return None
+
+def _fingerprint(name, texts):
+    from backend.utils.embedding_models import model_id
+    digest = hashlib.sha256(f"{name}\0{model_id()}".encode("utf-8"))
+    for text in texts:
+        digest.update(b"\0" + text.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def _source_embeddings(name, texts, known=None):
+    """Embeddings for a source's texts from the saved file, encoding only what's new."""
+    if not texts or not _dense_available():
+        return None
+    try:
+        path = os.path.join(EMBEDDING_DIR, f"{name}_{_fingerprint(name, texts)}.npy")
+    except Exception:
+        return _encode(texts)
+    if os.path.exists(path):
+        try:
+            return np.load(path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable embeddings {path}: {str(e)}")
+    if known is not None and len(known) <= len(texts):
+        new = _encode(texts[len(known):])
+        matrix = None if new is None else np.vstack([known, new]) if len(known) else new
+    else:
+        matrix = _encode(texts)
+    if matrix is not None:
+        try:
+            os.makedirs(EMBEDDING_DIR, exist_ok=True)
+            np.save(path + ".tmp.npy", matrix)
+            os.replace(path + ".tmp.npy", path)
+            for file_name in os.listdir(EMBEDDING_DIR):
+                if file_name.startswith(f"{name}_") and file_name != os.path.basename(path):
+                    os.remove(os.path.join(EMBEDDING_DIR, file_name))
+        except OSError as e:
+            print(f"Warning: Could not save {name} embeddings: {str(e)}")
+    return matrix
+
+# ======================= Index =======================
+
+class SourceIndex:
+    """
+    BM25 postings and an embedding matrix over one source's documents
+
+    Passing `base` builds an index of base's documents plus the new ones,
+    reusing base's postings and embeddings (only the new documents are
+    embedded) and leaving base unchanged for searches already using it.
+    """
+
+    def __init__(self, name, documents, base=None):
+        self.name = name
+        self.documents = list(base.documents) if base else []
+        self.postings = dict(base.postings) if base else {}
+        self.lengths = list(base.lengths) if base else []
+        self.matrix = base.matrix if base else None
+        if not documents:
+            return
+        start = len(self.documents)
+        added = {}
+        for offset, document in enumerate(documents):
+            document.setdefault("id", str(start + offset))
+            counts = Counter(tokenize(document["text"]))
+            for token, count in counts.items():
+                added.setdefault(token, []).append((start + offset, count))
+            self.lengths.append(sum(counts.values()))
+        for token, postings in added.items():
+            # New lists, so base's postings aren't touched
+            self.postings[token] = self.postings.get(token, []) + postings
+        self.documents.extend(documents)
+        texts = [document["text"] for document in self.documents]
+        self.matrix = _source_embeddings(self.name, texts, known=self.matrix)
+
+    def lexical(self, tokens, limit=CANDIDATES):
+        total = len(self.documents)
+        if not total or not tokens:
+            return []
+        average_length = (sum(self.lengths) / total) or 1
+        scores = {}
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, count in postings:
+                norm = count + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / average_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * count * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+    def dense(self, vector, limit=CANDIDATES):
+        if vector is None or self.matrix is None or not len(self.matrix):
+            return []
+        scores = self.matrix @ vector
+        top = np.argpartition(-scores, min(limit, len(scores)) - 1)[:limit]
+        return [(int(doc), float(scores[doc])) for doc in sorted(top, key=lambda doc: -scores[doc])
+                if scores[doc] >= MIN_DENSE_SCORE]
+
+def _get_index(name, block=True):
+    """
+    Return a source's index, building it first if it's missing or stale
+
+    The source is loaded and embedded outside _lock (under a per-source build
+    lock) and swapped in when done, so searches of other sources and of the
+    current index aren't held up by a build.
+
+    Args:
+        name (str): Source name
+        block (bool): Build (or wait for a build) now; when False, start a
+                      background build instead and return the current index
+
+    Returns:
+        SourceIndex or None: None only when not blocking and no index exists yet
+    """
+    with _lock:
+        index = _indexes.get(name)
+        if index is not None and name not in _stale:
+            return index
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+    if not block:
+        if not build_lock.locked():
+            threading.Thread(target=_build_quietly, args=(name,), name=f"retriever-build-{name}", daemon=True).start()
+        return index
+    with build_lock:
+        with _lock:
+            index = _indexes.get(name)
+            if index is not None and name not in _stale:
+                return index
+            # Cleared before loading, so an invalidate_source during the build marks it stale again
+            was_stale = name in _stale
+            _stale.discard(name)
+        started = time.perf_counter()
+        try:
+            built = SourceIndex(name, SOURCES[name]())
+        except Exception:
+            if was_stale:
+                with _lock:
+                    _stale.add(name)
+            raise
+        with _lock:
+            _indexes[name] = built
+            _stats.setdefault(name, {"queries": 0, "total_query_ms": 0.0})
+            _stats[name].update(
+                documents=len(built.documents),
+                build_seconds=round(time.perf_counter() - started, 3),
+                dense=built.matrix is not None,
+            )
+        return built
+
+def _build_quietly(name):
+    try:
+        _get_index(name)
+    except Exception as e:
+        print(f"Warning: Could not index the {name} source: {str(e)}")
+
+def invalidate_source(name):
+    """Rebuild a source's index on its next use (e.g. after FAQs or the dictionary change)."""
+    with _lock:
+        _stale.add(name)
+
+def add_documents(name, documents):
+    """
+    Append documents to a source's index if it's been built
+
+    Only the new documents are embedded, outside _lock; the extended index is
+    then swapped in, so searches carry on with the current one meanwhile.
+    """
+    with _lock:
+        if name not in _indexes or name in _stale:
+            return
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+    if not build_lock.acquire(blocking=False):
+        # The build (or append) in progress may have loaded the source before these were saved
+        with _lock:
+            _stale.add(name)
+        return
+    try:
+        with _lock:
+            index = _indexes.get(name)
+            if index is None or name in _stale:
+                return
+        extended = SourceIndex(name, documents, base=index)
+        with _lock:
+            # An invalidate_source meanwhile means a rebuild, which loads these documents anyway
+            if _indexes.get(name) is index and name not in _stale:
+                _indexes[name] = extended
+                _stats[name]["documents"] = len(extended.documents)
+    finally:
+        build_lock.release()
+
+def embed_query(query):
+    """Normalized embedding of a question, or None when dense retrieval is unavailable."""
+    return _encode(query)
+
+def search(query, top_k=5, sources=None, vector=None):
+    """
+    Find the most relevant documents across knowledge sources
+
+    Sources whose index isn't built yet are skipped (and built in the
+    background); a stale source is searched as it is while it's rebuilt.
+
+    Args:
+        query (str): The user's question
+        top_k (int): Number of results
+        sources (list): Source names to search; defaults to all of SOURCES
+        vector (np.ndarray): The query's embedding from embed_query, if the caller already has it
+
+    Returns:
+        dict: "results" (dicts with source, id, content, score and the BM25 and
+              dense ranks that contributed), "skipped" (sources not ready yet)
+              and "timings_ms" per source and for embedding the query
+    """
+    timings = {}
+    started = time.perf_counter()
+    tokens = tokenize(query)
+    if vector is None:
+        vector = _encode(query)
+    timings["embed"] = round((time.perf_counter() - started) * 1000, 2)
+
+    fused = {}
+    searched = {}
+    skipped = []
+    for name in sources or list(SOURCES):
+        index = _get_index(name, block=False)
+        if index is None:
+            skipped.append(name)
+            continue
+        searched[name] = index
+        source_started = time.perf_counter()
+        for method, ranked in (("lexical", index.lexical(tokens)), ("dense", index.dense(vector))):
+            for rank, (doc, _) in enumerate(ranked):
+                hit = fused.setdefault((name, doc), {"score": 0.0})
+                hit["score"] += 1.0 / (RRF_K + rank + 1)
+                hit[f"{method}_rank"] = rank + 1
+        elapsed = (time.perf_counter() - source_started) * 1000
+        timings[name] = round(elapsed, 2)
+        with _lock:
+            _stats[name]["queries"] += 1
+            _stats[name]["total_query_ms"] += elapsed
+
+    results = []
+    for (name, doc), hit in sorted(fused.items(), key=lambda item: -item[1]["score"])[:top_k]:
+        # Doc ids belong to the index that was searched, even if it has been swapped since
+        document = searched[name].documents[doc]
+        results.append(dict(hit, source=name, id=document["id"], content=document["content"], score=round(hit["score"], 5)))
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+    SEARCH_TIMINGS.append(timings)
+    return {"results": results, "skipped": skipped, "timings_ms": timings}
+
+def warm_up(sources=None):
+    """Build the source indexes on a background thread (once per process)."""
+    global _warm_up_thread
+    with _lock:
+        if _warm_up_thread is None:
+            def build():
+                for name in sources or list(SOURCES):
+                    _build_quietly(name)
+            _warm_up_thread = threading.Thread(target=build, name="retriever-warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+def get_retriever_stats():
+    """Per-source document count, build time, dense availability and average query latency."""
+    stats = {}
+    for name, source_stats in _stats.items():
+        stats[name] = dict(source_stats)
+        queries = source_stats["queries"]
+        stats[name]["avg_query_ms"] = round(source_stats["total_query_ms"] / queries, 3) if queries else None
+    return stats
@@ -0,0 +1,122 @@
+import re
+from functools import lru_cache
+
+# Token-aware assembly of the LLM context. Each source (memory, FAQs,
+# dictionary hits, the uploaded data profile, the database schema) is a
+# section of whole items; sections are filled in priority order (each up to
+# an optional limit, so one source can't crowd out the rest) and an item
+# that doesn't fit in what's left of the budget is dropped whole instead of
+# being cut mid-record. Tokens are counted with the model's tokenizer
+# (tiktoken) when it's available, otherwise estimated at ~4 characters each.
+DEFAULT_MODEL = "gpt-3.5-turbo"
+CHARS_PER_TOKEN = 4
+ELLIPSIS = "..."
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Warning: tiktoken unavailable, estimating token counts: {str(e)}")
+        return None
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """Number of tokens in text for the model (estimated when tiktoken isn't available)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+def clip_to_tokens(text, budget, keep="end", model=DEFAULT_MODEL):
+    """Cut text to at most `budget` tokens, keeping its end (most recent) or start and marking the cut with "..."."""
+    if count_tokens(text, model) <= budget:
+        return text
+    room = max(0, budget - count_tokens(ELLIPSIS, model))
+    encoding = _encoding(model)
+    if encoding is None:
+        cut = room * CHARS_PER_TOKEN
+        kept = text[len(text) - cut:] if keep == "end" else text[:cut]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        kept = encoding.decode(tokens[len(tokens) - room:] if keep == "end" else tokens[:room])
+    return ELLIPSIS + kept if keep == "end" else kept + ELLIPSIS
+
+def section(name, items, header="", ranks=None):
+    """
+    One context source for assemble_context
+
+    Args:
+        name (str): Source name, looked up in the priorities passed to assemble_context
+        items (list): Text items, in the order they should appear in the prompt
+        header (str): Line put before the section's items, e.g. "FAQs:"
+        ranks (list): Selection order of the items (lower first); defaults to their order
+
+    Returns:
+        dict: The section spec
+    """
+    ranks = ranks or list(range(len(items)))
+    kept = [i for i, item in enumerate(items) if item and item.strip()]
+    return {"name": name, "items": [items[i] for i in kept], "header": header, "ranks": [ranks[i] for i in kept]}
+
+def rank_by_overlap(question, items):
+    """Ranks for items by how many of the question's words they contain (most first)."""
+    words = set(re.findall(r"[a-z0-9]{3,}", question.lower()))
+    scores = [len(words & set(re.findall(r"[a-z0-9]{3,}", item.lower()))) for item in items]
+    order = sorted(range(len(items)), key=lambda i: (-scores[i], i))
+    ranks = [0] * len(items)
+    for rank, i in enumerate(order):
+        ranks[i] = rank
+    return ranks
+
+def assemble_context(sections, budget, priorities=None, limits=None, model=DEFAULT_MODEL):
+    """
+    Build the context text from sections within a token budget
+
+    Args:
+        sections (list): section() specs
+        budget (int): Maximum tokens for the whole context
+        priorities (dict): Section name -> priority (lower is filled first); sections
+                           missing from it are filled last, in the order given
+        limits (dict): Section name -> most tokens that section may use
+        model (str): Model whose tokenizer counts the tokens
+
+    Returns:
+        tuple: (context text, usage dict with tokens used and items kept/dropped per section)
+    """
+    priorities = priorities or {}
+    limits = limits or {}
+    order = sorted(range(len(sections)), key=lambda i: (priorities.get(sections[i]["name"], len(priorities)), i))
+    remaining = budget
+    chosen = {}
+    usage = {"budget": budget, "sections": {}}
+    for i in order:
+        spec = sections[i]
+        header_tokens = count_tokens(spec["header"] + "\n", model) if spec["header"] else 0
+        allowance = min(remaining, limits.get(spec["name"], remaining))
+        kept = []
+        for item_index in sorted(range(len(spec["items"])), key=lambda j: spec["ranks"][j]):
+            cost = count_tokens(spec["items"][item_index] + "\n", model) + (0 if kept else header_tokens)
+            if cost <= allowance:
+                kept.append(item_index)
+                allowance -= cost
+                remaining -= cost
+        chosen[i] = sorted(kept)
+        usage["sections"][spec["name"]] = {
+            "kept": len(kept),
+            "dropped": len(spec["items"]) - len(kept),
+        }
+
+    parts = []
+    for i, spec in enumerate(sections):
+        if chosen.get(i):
+            lines = [spec["header"]] if spec["header"] else []
+            lines.extend(spec["items"][j] for j in chosen[i])
+            parts.append("\n".join(lines))
+    usage["tokens"] = budget - remaining
+    return "\n\n".join(parts), usage
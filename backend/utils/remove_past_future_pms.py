@@ -1,18 +1,118 @@
 import os
-from datetime import datetime
-from supabase import create_client
+import time
+import argparse
+from datetime import datetime, date
+
+# Rows are removed in chunks of at most CHUNK_SIZE work orders: each chunk
+# selects the next work_order_id values matching a rule (keyset on
+# work_order_id) and deletes exactly those ids, so no single request has to
+# scan or delete an unbounded number of rows.
+CHUNK_SIZE = 500
 
 def get_supabase_client():
+    from supabase import create_client
     supabase_url = os.environ.get("SUPABASE_URL")
     supabase_key = os.environ.get("SUPABASE_KEY")
     return create_client(supabase_url, supabase_key)
 
-def remove_past_future_pms_with_null_selected():
-    supabase = get_supabase_client()
+# ======================= Retention Rules =======================
+
+def null_selected_rule(since, until):
+    """Future PMs nobody selected (selected=NULL) whose scheduled date has arrived."""
+    def apply(query):
+        return query.is_('selected', 'null') \
+            .gte('scheduled_start_date', since) \
+            .lte('scheduled_start_date', until)
+    return {"name": f"selected=NULL scheduled {since} to {until}", "apply": apply}
+
+def unselected_past_rule(today):
+    """Work orders marked selected=FALSE and scheduled before today."""
+    def apply(query):
+        return query.eq('selected', False).lt('scheduled_start_date', today)
+    return {"name": f"selected=FALSE scheduled before {today}", "apply": apply}
+
+# ======================= Chunked Delete =======================
+
+def delete_in_chunks(supabase, rule, chunk_size=CHUNK_SIZE, table='pm_all'):
+    """
+    Delete every row matching a retention rule, one bounded chunk at a time
+
+    Args:
+        supabase: Supabase client
+        rule (dict): Retention rule with a name and an "apply" function adding its filters
+        chunk_size (int): Maximum number of rows selected and deleted per request
+        table (str): Table to clean up
+
+    Returns:
+        list: Rows removed by each chunk
+    """
+    removed_per_chunk = []
+    last_id = None
+    while True:
+        query = rule["apply"](supabase.table(table).select('work_order_id'))
+        if last_id is not None:
+            query = query.gt('work_order_id', last_id)
+        response = query.order('work_order_id').limit(chunk_size).execute()
+        ids = [row['work_order_id'] for row in (response.data or []) if row.get('work_order_id') is not None]
+        if not ids:
+            break
+
+        # Re-apply the rule so rows changed since the select are left alone
+        deleted = rule["apply"](supabase.table(table).delete().in_('work_order_id', ids)).execute()
+        removed = len(deleted.data) if deleted.data else 0
+        removed_per_chunk.append(removed)
+        print(f"  Chunk {len(removed_per_chunk)}: removed {removed} rows "
+              f"(ids {ids[0]}-{ids[-1]}, {sum(removed_per_chunk)} so far)")
+
+        if len(ids) < chunk_size:
+            break
+        last_id = ids[-1]
+    return removed_per_chunk
+
+def remove_past_future_pms_with_null_selected(since=None, until=None, chunk_size=CHUNK_SIZE):
+    """
+    Retention job for pm_all
+
+    Removes future PMs left with selected=NULL once their scheduled date falls in
+    [since, until], and work orders marked selected=FALSE that are scheduled
+    before today. Both default to today's date, so a normal daily run only looks
+    at today; pass an earlier `since` to catch up on missed days.
+
+    Args:
+        since (str): First scheduled date (YYYY-MM-DD) for the selected=NULL rule
+        until (str): Last scheduled date (YYYY-MM-DD) for the selected=NULL rule
+        chunk_size (int): Maximum rows deleted per request
+
+    Returns:
+        dict: Rows removed per rule, per chunk and in total
+    """
+    start_time = time.time()
     today_str = datetime.now().strftime('%Y-%m-%d')
-    response = supabase.table('pm_all').delete().eq('scheduled_start_date', today_str).is_('selected', None).execute()
-    deleted_count = len(response.data) if hasattr(response, 'data') and response.data else 0
-    print(f"Deleted {deleted_count} PMs scheduled before {today_str} with selected=NULL.")
+    until = until or today_str
+    since = since or until
+    for value in (since, until):
+        date.fromisoformat(value)
+    if since > until:
+        raise ValueError(f"since ({since}) is after until ({until})")
+
+    supabase = get_supabase_client()
+    summary = {"rules": {}, "total_removed": 0}
+    for rule in (null_selected_rule(since, until), unselected_past_rule(today_str)):
+        print(f"Removing pm_all rows with {rule['name']}...")
+        chunks = delete_in_chunks(supabase, rule, chunk_size)
+        removed = sum(chunks)
+        summary["rules"][rule["name"]] = {"removed": removed, "chunks": chunks}
+        summary["total_removed"] += removed
+        print(f"Deleted {removed} rows with {rule['name']} in {len(chunks)} chunks.")
+
+    summary["elapsed_seconds"] = round(time.time() - start_time, 2)
+    print(f"Cleanup removed {summary['total_removed']} rows in {summary['elapsed_seconds']} seconds.")
+    return summary
 
 if __name__ == "__main__":
-    remove_past_future_pms_with_null_selected()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Remove stale rows from pm_all in bounded chunks")
+    parser.add_argument("--since", help="First scheduled date (YYYY-MM-DD) to clean up; defaults to today")
+    parser.add_argument("--until", help="Last scheduled date (YYYY-MM-DD) to clean up; defaults to today")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Maximum rows deleted per request")
+    args = parser.parse_args()
+    remove_past_future_pms_with_null_selected(args.since, args.until, args.chunk_size)
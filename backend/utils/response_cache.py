@@ -0,0 +1,114 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Semantic cache for LLM answers. A stored answer is reused when a new
+# question's embedding is at least SIMILARITY_THRESHOLD cosine-similar to a
+# cached question asked with the same context (same context hash). Entries
+# expire after TTL_SECONDS and the least recently used are evicted beyond
+# MAX_ENTRIES. add_faq/delete_faq and dictionary uploads clear the cache.
+# The cache is shared by every session in the process, so the hash covers
+# every section of the prompt (see context_key), including the user's memory
+# and the retrieved knowledge: an answer is never given to someone whose
+# conversation or retrieved documents differ from the ones it was built from.
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_SIZE", "500"))
+ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # id -> entry, least recently used first
+_next_id = 0
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+def context_hash(*parts):
+    """Hash everything besides the question that shapes the answer (context, prompt mode, model)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(b"\0" + str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+def context_key(model_name, mode, sections):
+    """
+    context_hash() of a prompt's inputs: the model, the prompt mode and the
+    items of every prompt_budget section (memory, retrieved knowledge and
+    dictionary hits, FAQs, data profile, schema, plain-text context).
+    """
+    parts = [(item["name"], item["items"]) for item in sections]
+    return context_hash(model_name, mode, *sorted(parts, key=lambda part: part[0]))
+
+def embed_question(question):
+    # The model is only loaded on the first lookup, so db.py can invalidate the cache cheaply
+    from backend.utils.embedding_models import encode
+    return encode(question)
+
+def _expire(now):
+    expired = [key for key, entry in _entries.items() if now - entry["created_at"] > TTL_SECONDS]
+    for key in expired:
+        del _entries[key]
+    _stats["expirations"] += len(expired)
+
+def lookup(embedding, ctx_hash, threshold=None):
+    """
+    Return a cached answer for a similar question asked with the same context
+
+    Args:
+        embedding (np.ndarray): Normalized embedding of the question
+        ctx_hash (str): context_hash() of the prompt's context
+        threshold (float): Minimum cosine similarity; defaults to SIMILARITY_THRESHOLD
+
+    Returns:
+        str or None: The cached answer on a hit
+    """
+    threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+    with _lock:
+        _expire(time.time())
+        candidates = [(key, entry) for key, entry in _entries.items() if entry["context_hash"] == ctx_hash]
+        if candidates:
+            scores = np.stack([entry["embedding"] for _, entry in candidates]) @ embedding
+            best = int(scores.argmax())
+            if scores[best] >= threshold:
+                key, entry = candidates[best]
+                _entries.move_to_end(key)
+                entry["hits"] += 1
+                _stats["hits"] += 1
+                return entry["answer"]
+        _stats["misses"] += 1
+        return None
+
+def store(embedding, ctx_hash, question, answer):
+    global _next_id
+    with _lock:
+        _entries[_next_id] = {
+            "embedding": embedding,
+            "context_hash": ctx_hash,
+            "question": question,
+            "answer": answer,
+            "created_at": time.time(),
+            "hits": 0,
+        }
+        _next_id += 1
+        _stats["stores"] += 1
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+def invalidate_response_cache(reason=""):
+    """Drop every cached answer, e.g. after the FAQs or the dictionary change."""
+    with _lock:
+        _entries.clear()
+        _stats["invalidations"] += 1
+    if reason:
+        print(f"Response cache cleared: {reason}")
+
+def get_cache_stats():
+    """Hit/miss counters, hit rate and current size of the response cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["size"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
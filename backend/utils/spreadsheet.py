@@ -0,0 +1,112 @@
+import os
+import time
+import importlib.util
+from collections import deque
+import pandas as pd
+
+# Engines tried in order of preference. calamine (python-calamine, Rust) reads
+# xlsx/xlsm/xls several times faster than openpyxl; openpyxl is always there.
+# SPREADSHEET_ENGINE=openpyxl forces the slow path, e.g. to compare results.
+ENGINE_MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl"}
+PREFERRED_ENGINES = ["calamine", "openpyxl"]
+
+# Most recent reads, newest last: source, engine, seconds and whether a fallback was needed
+READ_TIMINGS = deque(maxlen=100)
+
+_engine = None
+
+def get_excel_engine():
+    """Return the fastest installed spreadsheet engine (cached after the first call)."""
+    global _engine
+    if _engine is None:
+        forced = os.environ.get("SPREADSHEET_ENGINE")
+        if forced:
+            _engine = forced
+        else:
+            _engine = next(
+                (engine for engine in PREFERRED_ENGINES if importlib.util.find_spec(ENGINE_MODULES[engine])),
+                "openpyxl"
+            )
+    return _engine
+
+def _source_name(source):
+    if isinstance(source, pd.ExcelFile):
+        source = source.io
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(str(source))
+    return getattr(source, "name", None) or type(source).__name__
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+def _record(source, engine, started, fallback):
+    timing = {
+        "source": _source_name(source),
+        "engine": engine,
+        "seconds": round(time.perf_counter() - started, 4),
+        "fallback": fallback,
+    }
+    READ_TIMINGS.append(timing)
+    print(f"Read {timing['source']} with {engine} in {timing['seconds']:.2f}s")
+    return timing
+
+def read_excel(source, **kwargs):
+    """
+    pd.read_excel with the fastest available engine
+
+    If the preferred engine can't read the file it is read again with pandas'
+    default engine. The timing of every read is kept in READ_TIMINGS.
+
+    Args:
+        source: Path, file-like object or pd.ExcelFile
+        **kwargs: Passed through to pd.read_excel (sheet_name, header, ...)
+
+    Returns:
+        pd.DataFrame or dict: Whatever pd.read_excel returns for the arguments
+    """
+    if isinstance(source, pd.ExcelFile):
+        # The engine was chosen when the ExcelFile was opened
+        started = time.perf_counter()
+        df = pd.read_excel(source, **kwargs)
+        _record(source, source.engine, started, False)
+        return df
+
+    engine = kwargs.pop("engine", None) or get_excel_engine()
+    started = time.perf_counter()
+    try:
+        df = pd.read_excel(source, engine=engine, **kwargs)
+        _record(source, engine, started, False)
+        return df
+    except Exception as e:
+        if engine == "openpyxl":
+            raise
+        print(f"Warning: {engine} could not read {_source_name(source)} ({str(e)}), falling back to the default engine")
+    _rewind(source)
+    started = time.perf_counter()
+    df = pd.read_excel(source, **kwargs)
+    _record(source, "default", started, True)
+    return df
+
+def open_excel_file(source):
+    """
+    pd.ExcelFile with the fastest available engine, for reading several sheets of one workbook
+
+    Returns:
+        pd.ExcelFile: Open workbook
+    """
+    engine = get_excel_engine()
+    started = time.perf_counter()
+    try:
+        workbook = pd.ExcelFile(source, engine=engine)
+        _record(source, engine, started, False)
+        return workbook
+    except Exception as e:
+        if engine == "openpyxl":
+            raise
+        print(f"Warning: {engine} could not open {_source_name(source)} ({str(e)}), falling back to the default engine")
+    _rewind(source)
+    started = time.perf_counter()
+    workbook = pd.ExcelFile(source)
+    _record(source, "default", started, True)
+    return workbook
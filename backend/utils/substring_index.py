@@ -0,0 +1,69 @@
+import re
+
+# Case-insensitive "query in text" lookups over a fixed list of texts without
+# scanning every text. Texts are lowercased once and their tokens posted to
+# the rows they occur in. A query's inner tokens must be whole tokens of a
+# matching text, its first token the end of one and its last token the start
+# of one (a single token can sit anywhere inside one), so the postings give a
+# small set of candidates that a plain substring check then confirms. Results
+# are the same as testing every text in order.
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", text)
+
+def build_substring_index(texts=()):
+    index = {"lowered": [], "postings": {}}
+    for text in texts:
+        add_text(index, text)
+    return index
+
+def add_text(index, text):
+    """Append a text to the index; its row is the next position."""
+    row = len(index["lowered"])
+    lowered = str(text).lower()
+    index["lowered"].append(lowered)
+    for token in set(_tokens(lowered)):
+        index["postings"].setdefault(token, set()).add(row)
+    return row
+
+def candidate_rows(index, query):
+    """Rows that can contain the (lowercased) query, or None when it has no tokens to look up."""
+    tokens = _tokens(query)
+    if not tokens:
+        return None
+    starts_inside = query[0].isalnum()
+    ends_inside = query[-1].isalnum()
+    rows = None
+    for position, token in enumerate(tokens):
+        first = position == 0 and starts_inside
+        last = position == len(tokens) - 1 and ends_inside
+        if not first and not last:
+            matches = index["postings"].get(token, set())
+        else:
+            matches = set()
+            for word, word_rows in index["postings"].items():
+                if (first and last and token in word) or (first and not last and word.endswith(token)) \
+                        or (last and not first and word.startswith(token)):
+                    matches |= word_rows
+        rows = matches if rows is None else rows & matches
+        if not rows:
+            return rows
+    return rows
+
+def find_first(index, query):
+    """
+    Position of the first text containing the query, ignoring case
+
+    Args:
+        index (dict): From build_substring_index
+        query (str): Text to look for
+
+    Returns:
+        int or None: Row of the first match
+    """
+    query = str(query).lower()
+    rows = candidate_rows(index, query)
+    for row in sorted(rows) if rows is not None else range(len(index["lowered"])):
+        if query in index["lowered"][row]:
+            return row
+    return None
@@ -0,0 +1,91 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# Runs the independent fetches of a chat turn (memory, FAQ match, dictionary
+# retrieval, intent handler lookups, ...) on a shared thread pool so a turn
+# waits for the slowest source instead of the sum of them. Every source has a
+# timeout and a default: a source that is too slow or fails is logged and its
+# default used, so one stuck lookup can't hold up the answer. Writes that
+# nothing waits on (saving messages, memory) go through run_in_background.
+TURN_WORKERS = int(os.getenv("TURN_WORKERS", "8"))
+SOURCE_TIMEOUT = float(os.getenv("TURN_SOURCE_TIMEOUT", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=TURN_WORKERS, thread_name_prefix="chat-turn")
+TURN_TIMINGS = deque(maxlen=100)
+
+def source(fn, *args, timeout=None, default=None, raise_errors=False, **kwargs):
+    """
+    Describe one context source for gather_sources
+
+    Args:
+        fn (callable): Function doing the fetch, called with *args and **kwargs
+        timeout (float): Seconds to wait for it; defaults to SOURCE_TIMEOUT
+        default: Value used when it times out (or raises, unless raise_errors)
+        raise_errors (bool): Re-raise the source's exception instead of using the default
+
+    Returns:
+        dict: The source spec
+    """
+    return {"fn": fn, "args": args, "kwargs": kwargs, "timeout": timeout, "default": default, "raise_errors": raise_errors}
+
+def start_sources(sources):
+    """Submit every source to the pool and return the pending turn for collect_sources."""
+    started = time.perf_counter()
+    futures = {name: _executor.submit(spec["fn"], *spec["args"], **spec["kwargs"]) for name, spec in sources.items()}
+    return {"sources": sources, "futures": futures, "started": started}
+
+def collect_source(pending, name):
+    """Wait for one source of a pending turn, up to its timeout counted from when the turn started."""
+    spec = pending["sources"][name]
+    timeout = SOURCE_TIMEOUT if spec["timeout"] is None else spec["timeout"]
+    remaining = max(0.0, pending["started"] + timeout - time.perf_counter())
+    try:
+        return pending["futures"][name].result(timeout=remaining)
+    except TimeoutError:
+        print(f"Warning: {name} took longer than {timeout}s, continuing without it")
+    except Exception as e:
+        if spec["raise_errors"]:
+            raise
+        print(f"Warning: {name} failed: {str(e)}")
+    return spec["default"]
+
+def collect_sources(pending):
+    results = {name: collect_source(pending, name) for name in pending["sources"]}
+    elapsed = time.perf_counter() - pending["started"]
+    TURN_TIMINGS.append({"sources": list(results), "seconds": round(elapsed, 4)})
+    return results
+
+def gather_sources(sources):
+    """
+    Run context sources concurrently and wait for all of them
+
+    Args:
+        sources (dict): Name -> source() spec
+
+    Returns:
+        dict: Name -> result, or the source's default if it timed out or failed
+    """
+    return collect_sources(start_sources(sources))
+
+def after_task(task, fn, *args, **kwargs):
+    """Call fn once a run_in_background task (or None) has finished, so writes land in order."""
+    if task is not None:
+        try:
+            task.result()
+        except Exception:
+            # Already logged by run_in_background
+            pass
+    return fn(*args, **kwargs)
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        print(f"Warning: background task failed: {str(error)}")
+
+def run_in_background(fn, *args, **kwargs):
+    """Submit a fire-and-forget task (e.g. a database write); failures are logged."""
+    future = _executor.submit(fn, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future
@@ -0,0 +1,393 @@
+"""
+Upload throughput benchmark
+
+Generates a synthetic PM or work-order file, uploads it through the upload
+engine into an in-memory stand-in for Supabase with a configurable delay per
+request, and reports rows/sec with a per-stage time breakdown.
+
+Run from the project root:
+    python -m backend.utils.upload_benchmark --target pm --rows 10000 --latency-ms 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import io
+import operator
+import numpy as np
+import pandas as pd
+
+# Allow running as a script as well as with -m
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from backend.utils import upload_engine
+from backend.utils.upload_engine import PM_ALL_SPEC, WORK_ORDERS_HISTORY_SPEC, FUTURE_PM_SPEC
+
+TARGETS = {
+    "pm": PM_ALL_SPEC,
+    "work_orders": WORK_ORDERS_HISTORY_SPEC,
+    "future_pm": FUTURE_PM_SPEC,
+}
+
+# ======================= Fake Backend =======================
+
+COMPARISONS = {
+    "eq": operator.eq, "neq": operator.ne,
+    "lt": operator.lt, "lte": operator.le,
+    "gt": operator.gt, "gte": operator.ge,
+}
+
+def _compare(op, row_value, value):
+    if row_value is None:
+        return False
+    if not isinstance(row_value, str):
+        try:
+            value = type(row_value)(value)
+        except (TypeError, ValueError):
+            row_value = str(row_value)
+    return COMPARISONS[op](row_value, value)
+
+def _split_terms(text):
+    """Split a postgrest logic filter on top-level commas (outside parentheses and quotes)."""
+    terms, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"' and text[i - 1:i] != "\\":
+            quoted = not quoted
+        elif not quoted and char in "()":
+            depth += 1 if char == "(" else -1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return terms
+
+def _logic_filter(term):
+    """Predicate for one term of an or_() filter, e.g. 'a.gt."x"' or 'and(a.eq.1,b.gt.2)'."""
+    for name, combine in (("and(", all), ("or(", any)):
+        if term.startswith(name):
+            predicates = [_logic_filter(t) for t in _split_terms(term[len(name):-1])]
+            return lambda row: combine(p(row) for p in predicates)
+    column, op, value = term.split(".", 2)
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1].replace('\\"', '"')
+    return lambda row: _compare(op, row.get(column), value)
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.error = None
+        self.count = len(data) if count is None else count
+
+class FakeQuery:
+    """Supports the subset of the postgrest query builder the uploaders use."""
+
+    def __init__(self, backend, table):
+        self.backend = backend
+        self.table = table
+        self.operation = "select"
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        self.start = None
+        self.end = None
+        self.row_limit = None
+        self.count_mode = None
+        self.orders = []
+
+    def select(self, *columns, count=None, **kwargs):
+        self.operation = "select"
+        self.count_mode = count
+        return self
+
+    def insert(self, rows):
+        self.operation = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict="", ignore_duplicates=False, **kwargs):
+        self.operation = "upsert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values):
+        self.operation = "update"
+        self.payload = values
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    def _filter(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        return self._filter(lambda row: row.get(column) != value)
+
+    def in_(self, column, values):
+        wanted = {str(v) for v in values}
+        return self._filter(lambda row: str(row.get(column)) in wanted)
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) < value)
+
+    def lte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) <= value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) > value)
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) >= value)
+
+    def is_(self, column, value):
+        return self._filter(lambda row: row.get(column) is None)
+
+    def or_(self, filters):
+        return self._filter(_logic_filter(f"or({filters})"))
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        self.backend.requests += 1
+        if self.backend.latency:
+            time.sleep(self.backend.latency)
+        rows = self.backend.tables.setdefault(self.table, [])
+
+        if self.operation == "insert":
+            column = self.backend.identity.get(self.table)
+            written = [dict(row) for row in self.payload]
+            for row in written:
+                if column:
+                    self.backend.next_id += 1
+                    row[column] = self.backend.next_id
+            rows.extend(written)
+            return FakeResponse([dict(row) for row in written])
+        if self.operation == "upsert":
+            positions = {row.get(self.on_conflict): i for i, row in enumerate(rows)}
+            written = []
+            for row in self.payload:
+                key = row.get(self.on_conflict)
+                if key in positions:
+                    if self.ignore_duplicates:
+                        continue
+                    rows[positions[key]].update(row)
+                else:
+                    positions[key] = len(rows)
+                    rows.append(dict(row))
+                written.append(row)
+            return FakeResponse(written)
+
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.operation == "delete":
+            self.backend.tables[self.table] = [row for row in rows if not all(f(row) for f in self.filters)]
+            return FakeResponse(matched)
+        if self.operation == "update":
+            for row in matched:
+                row.update(self.payload)
+            return FakeResponse(matched)
+        total = len(matched) if self.count_mode else None
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self.start is not None:
+            matched = matched[self.start:self.end + 1]
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        return FakeResponse(matched, total)
+
+class FakeSupabase:
+    """In-memory tables with a fixed delay per request; `identity` maps a table to its generated id column."""
+
+    def __init__(self, latency_ms=0, identity=None):
+        self.latency = latency_ms / 1000.0
+        self.tables = {}
+        self.requests = 0
+        self.identity = identity or {}
+        self.next_id = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+# ======================= Synthetic Data =======================
+
+def generate_upload_file(target, rows, directory, file_format="csv", seed=0):
+    """
+    Write a synthetic upload file shaped like the EAM export for a target
+
+    Returns:
+        tuple: (file path, list of work order ids in the file)
+    """
+    rng = np.random.default_rng(seed)
+    work_orders = np.arange(10_000_000, 10_000_000 + rows)
+    start_dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    statuses = np.array(["Open", "Closed", "In Progress", "Complete"])
+    zones = np.array(["NORTH", "SOUTH", "CENTER"])
+
+    if target == "future_pm":
+        df = pd.DataFrame({
+            "Select": rng.choice(["YES", "NO"], rows),
+            "Work Order": work_orders,
+            "Description": [f"Synthetic PM task {i}" for i in range(rows)],
+            "Status": rng.choice(statuses, rows),
+            "Equipment": rng.integers(1000, 9999, rows).astype(str),
+            "PM": rng.choice(["FC-Q-01", "EG-S-01", "EG-M-01"], rows),
+            "Sequence": rng.integers(1, 20, rows),
+            "Scheduled Start Date": start_dates,
+        })
+    else:
+        df = pd.DataFrame({
+            "Work Order": work_orders,
+            "WO Type": rng.choice(["PM", "CM"], rows),
+            "Status": rng.choice(statuses, rows),
+            "Equipment": rng.integers(1000, 9999, rows).astype(str),
+            "Building Name": [f"Building {i % 700}" for i in range(rows)],
+            "Building ID": rng.integers(1, 700, rows).astype(float),
+            "Description": [f"Synthetic work order {i}" for i in range(rows)],
+            "Trade": rng.choice(["ELECTRIC", "PLUMBING", "HVAC"], rows),
+            "Zone": rng.choice(zones, rows),
+            "Sched. Start Date": start_dates,
+            "Date Completed": start_dates + pd.Timedelta(days=3),
+            "PM Code": rng.choice(["FC-Q-01", "EG-S-01", "EG-M-01"], rows),
+            "Date Created": start_dates - pd.Timedelta(days=30),
+            "Region": rng.choice(["Calgary", "Edmonton"], rows),
+            "Priority Icon": rng.choice(["Critical", "High", "Low"], rows),
+        })
+
+    path = os.path.join(directory, f"benchmark_{target}_{rows}.{file_format}")
+    if file_format == "csv":
+        df.to_csv(path, index=False)
+    elif file_format == "xlsx":
+        df.to_excel(path, index=False)
+    elif file_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif file_format == "arrow":
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Unsupported benchmark file format: {file_format}")
+    return path, [str(wo) for wo in work_orders]
+
+# ======================= Benchmark =======================
+
+def run_benchmark(target="pm", rows=10000, latency_ms=0, file_format="csv", existing_fraction=0.0,
+                  batch_size=upload_engine.BATCH_SIZE, verbose=False):
+    """
+    Upload a synthetic file into the fake backend and time each stage
+
+    Args:
+        target (str): "pm", "work_orders" or "future_pm"
+        rows (int): Number of synthetic rows
+        latency_ms (float): Delay added to every fake Supabase request
+        file_format (str): "csv", "xlsx", "parquet" or "arrow"
+        existing_fraction (float): Share of work orders already in the table, to exercise updates
+        batch_size (int): Records per insert request
+        verbose (bool): Show the uploader's per-batch output
+
+    Returns:
+        dict: Rows/sec, request count and per-stage seconds
+    """
+    spec = TARGETS[target]
+    backend = FakeSupabase(latency_ms)
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path, work_orders = generate_upload_file(target, rows, directory, file_format)
+        existing = work_orders[:int(rows * existing_fraction)]
+        backend.tables[spec["table"]] = [{spec["key_column"]: wo} for wo in existing]
+
+        # Keep benchmark checkpoints out of backend/data
+        checkpoint_dir = upload_engine.CHECKPOINT_DIR
+        upload_engine.CHECKPOINT_DIR = os.path.join(directory, "checkpoints")
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        try:
+            with output:
+                started = time.perf_counter()
+                summary = upload_engine.run_upload(file_path, spec, backend, batch_size=batch_size, resume=False)
+                elapsed = time.perf_counter() - started
+        finally:
+            upload_engine.CHECKPOINT_DIR = checkpoint_dir
+
+    stages = summary["stage_seconds"]
+    return {
+        "target": target,
+        "table": spec["table"],
+        "rows": rows,
+        "file_format": file_format,
+        "latency_ms": latency_ms,
+        "existing_fraction": existing_fraction,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+        "seconds_per_10k_rows": round(elapsed * 10000 / rows, 4) if rows else None,
+        "requests": backend.requests,
+        "inserted_records": summary["inserted_records"],
+        "updated_records": summary["updated_records"],
+        "error_records": summary["error_records"],
+        "stage_seconds": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+        "other_seconds": round(elapsed - sum(stages.values()), 4),
+    }
+
+def print_result(result):
+    print()
+    print(f"Upload benchmark: {result['rows']} {result['target']} rows ({result['file_format']}) -> {result['table']}")
+    print(f"  latency/request: {result['latency_ms']} ms, existing rows: {result['existing_fraction']:.0%}")
+    print(f"  total: {result['elapsed_seconds']:.3f}s, {result['rows_per_second']} rows/sec, "
+          f"{result['seconds_per_10k_rows']:.3f}s per 10k rows, {result['requests']} requests")
+    for stage, seconds in result["stage_seconds"].items():
+        share = seconds / result["elapsed_seconds"] if result["elapsed_seconds"] else 0
+        print(f"  {stage:<16}{seconds:>9.3f}s  {share:>6.1%}")
+    print(f"  {'other':<16}{result['other_seconds']:>9.3f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark upload throughput against a fake Supabase backend")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="pm")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to each fake request")
+    parser.add_argument("--format", dest="file_format", choices=["csv", "xlsx", "parquet", "arrow"], default="csv")
+    parser.add_argument("--existing-fraction", type=float, default=0.0, help="Share of rows already in the table (0-1)")
+    parser.add_argument("--batch-size", type=int, default=upload_engine.BATCH_SIZE)
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the uploader's per-batch output")
+    parser.add_argument("--min-rows-per-sec", type=float, default=None, help="Exit with status 1 if throughput is below this")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        target=args.target,
+        rows=args.rows,
+        latency_ms=args.latency_ms,
+        file_format=args.file_format,
+        existing_fraction=args.existing_fraction,
+        batch_size=args.batch_size,
+        verbose=args.verbose,
+    )
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_result(result)
+
+    if args.min_rows_per_sec is not None and result["rows_per_second"] < args.min_rows_per_sec:
+        print(f"Throughput {result['rows_per_second']} rows/sec is below the {args.min_rows_per_sec} rows/sec threshold")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
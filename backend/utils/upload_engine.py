@@ -0,0 +1,608 @@
+import os
+import math
+import json
+import hashlib
+from datetime import datetime
+import time
+import pandas as pd
+import numpy as np
+from backend.utils.spreadsheet import read_excel
+
+# Completed-batch checkpoints live next to the other backend data files
+CHECKPOINT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "upload_checkpoints")
+CHECKPOINT_DIR = os.path.abspath(CHECKPOINT_DIR)
+
+BATCH_SIZE = 100
+CHECK_BATCH_SIZE = 50
+KEY_PAGE_SIZE = 1000
+# Tables with more keys than this are tracked in a Bloom filter instead of a set
+BLOOM_THRESHOLD = 500_000
+
+# Custom JSON serializer to handle pandas Timestamp objects
+class JSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (pd.Timestamp, datetime)):
+            return obj.isoformat()
+        return super().default(obj)
+
+# ======================= Table Specs =======================
+# Each spec describes how an upload file maps onto a Supabase table:
+#   table           - target table name
+#   key_column      - column identifying a work order (used for replace-on-upload)
+#   required_columns - columns an upload cannot proceed without
+#   expected_columns - table columns reported as missing when absent from the file
+#   column_aliases  - cleaned file column -> table column
+#   drop_columns    - columns removed before upload
+#   date_columns    - columns parsed as dates and sent as ISO strings
+#   id_columns      - columns normalized to strings ("123.0" -> "123")
+#   yes_no_columns  - columns converted from YES/NO to booleans
+#   dedupe          - keep only the last row for each key_column value
+
+PM_ALL_SPEC = {
+    "table": "pm_all",
+    "key_column": "work_order_id",
+    "required_columns": ['work_order_id'],
+    "expected_columns": [
+        'work_order_id', 'wo_type', 'status', 'equipment', 'building_name', 'building_id',
+        'description', 'assigned_to', 'trade', 'zone', 'organization', 'scheduled_start_date',
+        'date_completed', 'pm_code', 'last_updated_by', 'service_category', 'service_code',
+        'date_created', 'region'
+    ],
+    "column_aliases": {
+        'work_order': 'work_order_id',
+        'sched_start_date': 'scheduled_start_date',
+        'start_date': 'scheduled_start_date',
+        'completion_date': 'date_completed',
+        'created_date': 'date_created',
+        'complete_date': 'date_completed'
+    },
+    # The upload page used to rename priority_icon to priority before it was dropped
+    "drop_columns": ['priority', 'priority_icon'],
+    "date_columns": ['scheduled_start_date', 'date_completed', 'date_created'],
+    "id_columns": ['work_order_id', 'building_id'],
+    "yes_no_columns": [],
+    "dedupe": False,
+}
+
+WORK_ORDERS_HISTORY_SPEC = {
+    "table": "work_orders_history",
+    "key_column": "work_order",
+    "required_columns": ['work_order'],
+    "expected_columns": [
+        'work_order', 'wo_type', 'status', 'equipment', 'building_name', 'building_id',
+        'description', 'assigned_to', 'trade', 'zone', 'organization', 'scheduled_start_date',
+        'date_completed', 'pm_code', 'last_updated_by', 'service_category', 'service_code',
+        'date_created', 'region', 'priority'
+    ],
+    "column_aliases": {
+        'priority_icon': 'priority',
+        'sched_start_date': 'scheduled_start_date',
+        'start_date': 'scheduled_start_date',
+        'completion_date': 'date_completed',
+        'created_date': 'date_created',
+        'complete_date': 'date_completed'
+    },
+    # Left over only when the file has both priority and priority_icon
+    "drop_columns": ['priority_icon'],
+    "date_columns": ['scheduled_start_date', 'date_completed', 'date_created'],
+    "id_columns": ['work_order', 'building_id'],
+    "yes_no_columns": [],
+    "dedupe": True,
+}
+
+FUTURE_PM_SPEC = {
+    "table": "future_pm",
+    "key_column": "work_order_id",
+    "required_columns": ['work_order_id'],
+    "expected_columns": [
+        'selected', 'work_order_id', 'description', 'status', 'equipment', 'equipment_description',
+        'equipment_org', 'pm_code', 'pm_type', 'maintenance_pattern', 'sequence',
+        'scheduled_start_date', 'work_package', 'wo_type', 'error_message'
+    ],
+    "column_aliases": {
+        'select': 'selected',
+        'work_order': 'work_order_id',
+        'pm': 'pm_code',
+    },
+    "drop_columns": [],
+    "date_columns": ['scheduled_start_date'],
+    "id_columns": ['work_order_id'],
+    "yes_no_columns": ['selected'],
+    "dedupe": True,
+}
+
+# ======================= Preparation =======================
+
+# File types the uploaders accept, for st.file_uploader(type=...)
+UPLOAD_FILE_TYPES = ["xlsx", "xls", "csv", "parquet", "arrow", "feather", "ipc"]
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+def read_arrow_ipc(source):
+    """Read an Arrow IPC file (or stream) without going through Excel or CSV parsing."""
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    if isinstance(source, str):
+        # Memory-map the file so Arrow reads the columns in place
+        source = pa.memory_map(source, 'r')
+    try:
+        table = pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        # Not the random-access file format; fall back to the streaming format
+        source.seek(0)
+        table = pa.ipc.open_stream(source).read_all()
+    return table.to_pandas()
+
+def read_upload_file(source, filename=None):
+    """
+    Read an upload file into a DataFrame based on its extension
+
+    Args:
+        source: File path, or a file-like object such as a Streamlit upload
+        filename (str): Name used to pick the format when source is file-like
+
+    Returns:
+        pd.DataFrame: File contents
+    """
+    name = (filename or (source if isinstance(source, str) else getattr(source, "name", ""))).lower()
+    if name.endswith('.csv'):
+        return pd.read_csv(source)
+    if name.endswith('.parquet'):
+        return pd.read_parquet(source, engine='pyarrow')
+    if name.endswith(ARROW_EXTENSIONS):
+        return read_arrow_ipc(source)
+    return read_excel(source)
+
+def clean_column_name(col):
+    """Lowercase a column name and replace spaces with underscores."""
+    return str(col).lower().replace(' ', '_').replace('.', '').replace('__', '_')
+
+def normalize_id(value):
+    """Convert integer-like ids (123, 123.0, "123.0") to plain strings."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        if pd.isna(value):
+            return None
+        if float(value).is_integer():
+            return str(int(value))
+        return str(value)
+    if isinstance(value, str) and value.endswith('.0'):
+        try:
+            return str(int(float(value)))
+        except (ValueError, TypeError):
+            return value
+    return value
+
+def apply_column_aliases(df, spec):
+    """
+    Clean column names and rename known variations to the table's column names
+
+    Returns:
+        tuple: (DataFrame with renamed columns, dict of old -> new names applied)
+    """
+    df = df.copy()
+    df.columns = [clean_column_name(col) for col in df.columns]
+
+    # Rename column variations without clobbering columns that already exist
+    renamed = {}
+    for old_name, new_name in spec["column_aliases"].items():
+        if old_name != new_name and old_name in df.columns and new_name not in df.columns:
+            df = df.rename(columns={old_name: new_name})
+            renamed[old_name] = new_name
+    return df, renamed
+
+def prepare_dataframe(df, spec):
+    """
+    Apply a table spec to a raw upload DataFrame
+
+    Args:
+        df (pd.DataFrame): Data as read from the upload file
+        spec (dict): Table spec describing the target table
+
+    Returns:
+        pd.DataFrame: Cleaned data ready to be converted to records
+    """
+    df, _ = apply_column_aliases(df, spec)
+
+    drop = [col for col in spec["drop_columns"] if col in df.columns]
+    if drop:
+        df = df.drop(columns=drop)
+
+    for col in spec["yes_no_columns"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.upper().eq('YES')
+
+    key_column = spec["key_column"]
+    if key_column in df.columns:
+        # Rows without a work order id can't be matched or inserted
+        missing_key = df[key_column].isna()
+        if missing_key.any():
+            print(f"Skipping {int(missing_key.sum())} rows with no '{key_column}'.")
+            df = df[~missing_key]
+
+    if spec["dedupe"] and key_column in df.columns:
+        duplicate_count = df.duplicated(key_column, keep=False).sum()
+        if duplicate_count > 0:
+            print(f"Found {duplicate_count} duplicate rows for '{key_column}' in the input file.")
+            print("Keeping only the last occurrence of each duplicate work order.")
+            df = df.drop_duplicates(key_column, keep='last')
+
+    # Replace NaN values with None for proper JSON serialization
+    df = df.replace({np.nan: None})
+
+    for col in spec["id_columns"]:
+        if col in df.columns:
+            df[col] = df[col].map(normalize_id)
+
+    for col in spec["date_columns"]:
+        if col in df.columns:
+            print(f"Processing date column: {col}")
+            parsed = pd.to_datetime(df[col], errors='coerce')
+            df[col] = parsed.apply(lambda x: x.isoformat() if pd.notna(x) else None)
+
+    return df
+
+def clean_record(record):
+    """Convert leftover Timestamps and NaN floats in a record for JSON."""
+    for key, value in list(record.items()):
+        if isinstance(value, (pd.Timestamp, datetime)):
+            record[key] = value.isoformat()
+        elif isinstance(value, float) and np.isnan(value):
+            record[key] = None
+    return record
+
+# ======================= Checkpoints =======================
+
+def upload_fingerprint(df, spec, batch_size=BATCH_SIZE):
+    """
+    Hash the prepared data so a re-run of the same upload finds its checkpoint,
+    regardless of the temp file name or file format it came from.
+    """
+    digest = hashlib.sha256()
+    digest.update(spec["table"].encode("utf-8"))
+    digest.update(str(batch_size).encode("utf-8"))
+    digest.update("|".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def checkpoint_path(spec, fingerprint):
+    return os.path.join(CHECKPOINT_DIR, f"{spec['table']}_{fingerprint}.json")
+
+def load_checkpoint(path):
+    """Return the saved checkpoint for an upload, or None if there isn't one."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable checkpoint {path}: {str(e)}")
+        return None
+
+def save_checkpoint(path, checkpoint):
+    """Write a checkpoint atomically so an interrupted write can't corrupt it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def clear_checkpoint(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+# ======================= Known Keys =======================
+
+class BloomFilter:
+    """Fixed-size set membership with a small false positive rate and no false negatives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= np.uint8(1 << (position & 7))
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+def load_known_keys(client, spec, bloom_threshold=BLOOM_THRESHOLD, max_pages=None):
+    """
+    Stream every key_column value of the spec's table into memory once
+
+    Keys are fetched a page at a time and kept as strings. If the table reports
+    more than bloom_threshold rows they go into a BloomFilter instead, which can
+    report a new key as existing but never misses an existing one; the upload
+    counts updates from the rows actually deleted, so the counts stay exact.
+
+    Args:
+        client: Supabase client
+        spec (dict): Table spec describing the target table
+        bloom_threshold (int): Row count above which a Bloom filter is used
+        max_pages (int): Give up (return None) when the table needs more key pages than this
+
+    Returns:
+        set or BloomFilter: Existing keys, supporting `in` and add(), or None
+    """
+    table = spec["table"]
+    key_column = spec["key_column"]
+    keys = None
+    page = 0
+    while True:
+        query = client.table(table).select(key_column, count="exact" if page == 0 else None)
+        response = query.order(key_column) \
+            .range(page * KEY_PAGE_SIZE, (page + 1) * KEY_PAGE_SIZE - 1) \
+            .execute()
+        batch = response.data or []
+        if keys is None:
+            total = getattr(response, "count", None) or 0
+            pages = (total + KEY_PAGE_SIZE - 1) // KEY_PAGE_SIZE
+            if max_pages is not None and pages > max_pages:
+                print(f"{table} has {total} rows; checking the upload's {key_column} values per batch instead")
+                return None
+            keys = BloomFilter(total) if total > bloom_threshold else set()
+        for item in batch:
+            if item.get(key_column) is not None:
+                keys.add(str(normalize_id(item[key_column])))
+        if len(batch) < KEY_PAGE_SIZE:
+            break
+        page += 1
+    kind = "Bloom filter" if isinstance(keys, BloomFilter) else "set"
+    print(f"Loaded {len(keys)} existing {key_column} values from {table} ({kind})")
+    return keys
+
+# ======================= Upload =======================
+
+def add_stage_time(stages, stage, started):
+    """Add the time since `started` (a perf_counter value) to a stage total."""
+    stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - started
+
+def upload_dataframe(df, spec, client, progress_callback=None, batch_size=BATCH_SIZE, resume=True, known_keys=None):
+    """
+    Replace-upload prepared records into the spec's table in batches
+
+    Existing rows for each work order in a batch are deleted and the batch is
+    inserted. Which work orders already exist is decided locally against the
+    table's keys, loaded once up front when the upload is large relative to
+    the table; otherwise, or if they can't be loaded, each batch is checked
+    with in_() queries instead. Every completed batch is recorded in a
+    checkpoint file, so running the same upload again after an interruption
+    skips batches already done.
+
+    Args:
+        df (pd.DataFrame): Data already passed through prepare_dataframe
+        spec (dict): Table spec describing the target table
+        client: Supabase client
+        progress_callback (callable): Function to call with progress updates (0-1)
+        batch_size (int): Records per insert request
+        resume (bool): Continue from a previous checkpoint if one exists
+        known_keys (set): Existing keys to classify against; loaded from the table when None
+
+    Returns:
+        dict: Summary of the upload process
+    """
+    table = spec["table"]
+    key_column = spec["key_column"]
+    records = df.to_dict('records')
+    total_records = len(records)
+    total_batches = (total_records + batch_size - 1) // batch_size
+
+    path = checkpoint_path(spec, upload_fingerprint(df, spec, batch_size))
+    checkpoint = load_checkpoint(path) if resume else None
+    if checkpoint is None:
+        checkpoint = {
+            "table": table,
+            "total_batches": total_batches,
+            "completed_batches": [],
+            "inserted_records": 0,
+            "updated_records": 0,
+            "processed_records": 0,
+        }
+    elif checkpoint["completed_batches"]:
+        print(f"Resuming upload to {table}: {len(checkpoint['completed_batches'])}/{total_batches} batches already done")
+    completed = set(checkpoint["completed_batches"])
+
+    summary = {
+        "total_records": total_records,
+        "processed_records": checkpoint["processed_records"],
+        "inserted_records": checkpoint["inserted_records"],
+        "updated_records": checkpoint["updated_records"],
+        "error_records": 0,
+        "resumed_batches": len(completed),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # Seconds spent per stage, for the upload benchmark and slow-upload debugging
+        "stage_seconds": {"existence_check": 0.0, "delete": 0.0, "insert": 0.0, "checkpoint": 0.0}
+    }
+    stages = summary["stage_seconds"]
+
+    if known_keys is None and len(completed) < total_batches:
+        # Preloading pays off only when it takes no more requests than the
+        # in_() checks it replaces (one per CHECK_BATCH_SIZE records left)
+        remaining = sum(min(batch_size, total_records - (n - 1) * batch_size)
+                        for n in range(1, total_batches + 1) if n not in completed)
+        started = time.perf_counter()
+        try:
+            known_keys = load_known_keys(client, spec, max_pages=math.ceil(remaining / CHECK_BATCH_SIZE))
+        except Exception as e:
+            print(f"Warning: Could not load existing {key_column} values: {str(e)}. Checking each batch instead.")
+        add_stage_time(stages, "existence_check", started)
+
+    print(f"Processing {total_records} records in {total_batches} batches (batch size: {batch_size})")
+
+    for i in range(0, total_records, batch_size):
+        batch_num = i // batch_size + 1
+        batch_end = min(i + batch_size, total_records)
+        if batch_num in completed:
+            continue
+        batch = [clean_record(record) for record in records[i:batch_end]]
+
+        print(f"Processing batch {batch_num}/{total_batches} (records {i+1}-{batch_end})...")
+
+        try:
+            # Get work order IDs from this batch
+            work_orders_to_process = [r[key_column] for r in batch if r.get(key_column) is not None]
+            # Check which work orders already exist in the database
+            existing_work_orders = set()
+            started = time.perf_counter()
+            if known_keys is not None:
+                existing_work_orders = {str(wo) for wo in work_orders_to_process if str(wo) in known_keys}
+            elif work_orders_to_process:
+                try:
+                    # Query in smaller sub-batches to avoid query length limits
+                    for j in range(0, len(work_orders_to_process), CHECK_BATCH_SIZE):
+                        check_batch = work_orders_to_process[j:j+CHECK_BATCH_SIZE]
+                        query_result = client.table(table).select(key_column).in_(key_column, check_batch).execute()
+                        if hasattr(query_result, 'data'):
+                            for item in query_result.data:
+                                existing_work_orders.add(str(item[key_column]))
+                except Exception as e:
+                    print(f"Warning: Error checking existing work orders: {str(e)}. Will assume all are new.")
+            add_stage_time(stages, "existence_check", started)
+            # Delete existing records for these work orders; the deleted rows
+            # tell us how many were really updates
+            updated = 0
+            started = time.perf_counter()
+            if existing_work_orders:
+                try:
+                    existing_list = list(existing_work_orders)
+                    for j in range(0, len(existing_list), CHECK_BATCH_SIZE):
+                        delete_batch = existing_list[j:j+CHECK_BATCH_SIZE]
+                        deleted = client.table(table).delete().in_(key_column, delete_batch).execute()
+                        if getattr(deleted, 'data', None) is not None:
+                            updated += len({str(row.get(key_column)) for row in deleted.data})
+                        else:
+                            updated += len(delete_batch)
+                except Exception as e:
+                    print(f"Warning: Error deleting existing records: {str(e)}. Will attempt to insert anyway.")
+            add_stage_time(stages, "delete", started)
+            # Insert all records in this batch
+            started = time.perf_counter()
+            response = client.table(table).insert(
+                json.loads(json.dumps(batch, cls=JSONEncoder))
+            ).execute()
+            add_stage_time(stages, "insert", started)
+            if hasattr(response, 'error') and response.error:
+                print(f"Error in batch {batch_num}: {response.error}")
+                summary["error_records"] += len(batch)
+                continue
+
+            # Count inserts (new records) vs updates (deleted then inserted)
+            summary["updated_records"] += updated
+            summary["inserted_records"] += len(batch) - updated
+            summary["processed_records"] += len(batch)
+            if known_keys is not None:
+                for wo in work_orders_to_process:
+                    known_keys.add(str(wo))
+            print(f"Successfully processed batch {batch_num}: {len(batch)} records")
+
+            completed.add(batch_num)
+            started = time.perf_counter()
+            checkpoint.update({
+                "completed_batches": sorted(completed),
+                "inserted_records": summary["inserted_records"],
+                "updated_records": summary["updated_records"],
+                "processed_records": summary["processed_records"],
+            })
+            save_checkpoint(path, checkpoint)
+            add_stage_time(stages, "checkpoint", started)
+
+            if progress_callback:
+                progress_callback(min(1.0, batch_end / total_records))
+
+        except Exception as e:
+            summary["error_records"] += len(batch)
+            print(f"Exception in batch {batch_num}: {str(e)}")
+
+            # Debug information when an exception occurs
+            print(f"Debugging batch {batch_num}:")
+            for idx, record in enumerate(batch[:5]):  # Show just first 5 records for debugging
+                if key_column in record:
+                    print(f"Record {idx}, {key_column}: {record[key_column]}, type: {type(record[key_column])}")
+
+    if len(completed) == total_batches:
+        clear_checkpoint(path)
+    else:
+        print(f"{total_batches - len(completed)} batches did not complete; re-run the upload to resume from the checkpoint.")
+
+    return summary
+
+def load_upload_file(file_path, spec):
+    """
+    Read and validate an upload file, then prepare it for the spec's table
+
+    Validation runs before any network I/O, so a file that can't be uploaded
+    fails here with the report's errors.
+
+    Args:
+        file_path (str): Path to the Excel, CSV, Parquet or Arrow IPC file
+        spec (dict): Table spec describing the target table
+
+    Returns:
+        tuple: (prepared DataFrame, validation report)
+    """
+    from backend.utils.upload_validation import validate_upload
+
+    stages = {}
+    print(f"Reading data from file: {file_path}")
+    started = time.perf_counter()
+    df = read_upload_file(file_path)
+    add_stage_time(stages, "parse", started)
+    print(f"Loaded {len(df)} records from file")
+
+    started = time.perf_counter()
+    report = validate_upload(df, spec)
+    add_stage_time(stages, "validate", started)
+    report["stage_seconds"] = stages
+    for warning in report["warnings"]:
+        print(f"Warning: {warning}")
+    if not report["ok"]:
+        raise ValueError("Upload file failed validation: " + "; ".join(report["errors"]))
+
+    started = time.perf_counter()
+    df = prepare_dataframe(df, spec)
+    add_stage_time(stages, "prepare", started)
+    return df, report
+
+def run_upload(file_path, spec, client, progress_callback=None, batch_size=BATCH_SIZE, resume=True):
+    """
+    Read, validate, prepare and upload a file using a table spec
+
+    Args:
+        file_path (str): Path to the Excel, CSV, Parquet or Arrow IPC file
+        spec (dict): Table spec describing the target table
+        client: Supabase client
+        progress_callback (callable): Function to call with progress updates (0-1)
+        batch_size (int): Records per insert request
+        resume (bool): Continue from a previous checkpoint if one exists
+
+    Returns:
+        dict: Summary of the upload process
+    """
+    start_time = time.time()
+
+    df, report = load_upload_file(file_path, spec)
+    summary = upload_dataframe(df, spec, client, progress_callback, batch_size, resume)
+    summary["stage_seconds"] = {**report["stage_seconds"], **summary["stage_seconds"]}
+
+    elapsed_time = time.time() - start_time
+    print(f"Upload to {spec['table']} complete in {elapsed_time:.2f} seconds!")
+    print(f"  - {summary['inserted_records']} new records inserted")
+    print(f"  - {summary['updated_records']} existing records updated")
+    print(f"  - {summary['error_records']} records with errors")
+
+    return summary
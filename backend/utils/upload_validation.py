@@ -0,0 +1,112 @@
+import time
+import warnings
+import pandas as pd
+from backend.utils.upload_engine import apply_column_aliases, normalize_id
+
+# Id values are expected to look like integers ("123" or "123.0")
+ID_PATTERN = r"\d+(?:\.0+)?"
+MAX_SAMPLE_VALUES = 20
+
+def _id_mismatches(series):
+    values = series.dropna()
+    if values.empty:
+        return 0
+    if pd.api.types.is_numeric_dtype(values):
+        return int((values % 1 != 0).sum())
+    return int((~values.astype(str).str.strip().str.fullmatch(ID_PATTERN)).sum())
+
+def _unparseable_dates(series):
+    present = series.notna()
+    if not present.any():
+        return 0
+    with warnings.catch_warnings():
+        # Mixed formats fall back to per-value parsing; the count is still correct
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(series, errors='coerce')
+    return int((present & parsed.isna()).sum())
+
+def validate_upload(df, spec):
+    """
+    Check an upload file against a table spec before anything is sent to Supabase
+
+    Every check is a whole-column operation, so a 100k row file validates in a
+    fraction of a second.
+
+    Args:
+        df (pd.DataFrame): Data as read from the upload file
+        spec (dict): Table spec describing the target table
+
+    Returns:
+        dict: Validation report. "ok" is False when the file can't be uploaded,
+              with the reasons in "errors"; "warnings" lists everything else worth showing.
+    """
+    start_time = time.time()
+    df, renamed = apply_column_aliases(df, spec)
+    key_column = spec["key_column"]
+
+    report = {
+        "table": spec["table"],
+        "total_rows": len(df),
+        "columns": list(df.columns),
+        "renamed_columns": renamed,
+        "missing_required": [col for col in spec["required_columns"] if col not in df.columns],
+        "missing_columns": [col for col in spec["expected_columns"] if col not in df.columns],
+        "duplicate_rows": 0,
+        "duplicate_keys": [],
+        "skipped_rows": 0,
+        "unparseable_dates": {},
+        "type_mismatches": {},
+        "null_rates": df.isna().mean().round(4).to_dict() if len(df) else {},
+        "errors": [],
+        "warnings": [],
+    }
+
+    if key_column in df.columns:
+        keys = df[key_column]
+        missing_key = keys.isna()
+        duplicated = keys.duplicated(keep=False) & ~missing_key
+        report["duplicate_rows"] = int(duplicated.sum())
+        report["duplicate_keys"] = [str(normalize_id(v)) for v in keys[duplicated].unique()[:MAX_SAMPLE_VALUES]]
+        report["skipped_rows"] = int(missing_key.sum())
+        if spec["dedupe"]:
+            report["skipped_rows"] += int((keys.duplicated(keep='last') & ~missing_key).sum())
+
+    for col in spec["date_columns"]:
+        if col in df.columns:
+            count = _unparseable_dates(df[col])
+            if count:
+                report["unparseable_dates"][col] = count
+
+    for col in spec["id_columns"]:
+        if col in df.columns:
+            count = _id_mismatches(df[col])
+            if count:
+                report["type_mismatches"][col] = count
+
+    for col in spec["yes_no_columns"]:
+        if col in df.columns:
+            values = df[col].dropna().astype(str).str.strip().str.upper()
+            count = int((~values.isin(["YES", "NO"])).sum())
+            if count:
+                report["type_mismatches"][col] = count
+
+    if report["missing_required"]:
+        report["errors"].append(f"Missing required columns: {', '.join(report['missing_required'])}")
+    elif report["total_rows"] - report["skipped_rows"] <= 0:
+        report["errors"].append("No rows left to upload after skipping rows without a work order id.")
+
+    if report["missing_columns"]:
+        report["warnings"].append(f"Missing columns that may be required by the database: {', '.join(report['missing_columns'])}")
+    if report["duplicate_rows"]:
+        action = "only the last of each will be kept" if spec["dedupe"] else "they may conflict when inserted"
+        report["warnings"].append(f"{report['duplicate_rows']} rows share a {key_column} with another row; {action}.")
+    if key_column in df.columns and df[key_column].isna().any():
+        report["warnings"].append(f"{int(df[key_column].isna().sum())} rows have no {key_column} and will be skipped.")
+    for col, count in report["unparseable_dates"].items():
+        report["warnings"].append(f"{count} values in {col} are not valid dates and will be left empty.")
+    for col, count in report["type_mismatches"].items():
+        report["warnings"].append(f"{count} values in {col} don't match the expected type.")
+
+    report["ok"] = not report["errors"]
+    report["elapsed_seconds"] = round(time.time() - start_time, 4)
+    return report
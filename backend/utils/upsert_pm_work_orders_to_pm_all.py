@@ -1,79 +1,195 @@
 import os
-from supabase import create_client
+import argparse
+
+# Incremental runs only fetch pm_work_orders rows whose WATERMARK_COLUMN is at or
+# after the value stored by the last successful run. The watermark is kept in
+# the database because the nightly workflow starts from a fresh checkout every
+# time. Expects:
+#
+#   create table sync_state (
+#       job text primary key,
+#       watermark text
+#   );
+#
+# With no stored watermark (the first run) the sync is a full one. Changed rows
+# are read with keyset paging on (WATERMARK_COLUMN, TIEBREAK_COLUMN), so rows
+# sharing a timestamp across a page boundary are neither skipped nor read twice;
+# rows at exactly the stored watermark are read again and upserted as no-op
+# updates.
+SYNC_JOB_NAME = "pm_work_orders_to_pm_all"
+WATERMARK_COLUMN = os.environ.get("PM_SYNC_WATERMARK_COLUMN", "updated_at")
+TIEBREAK_COLUMN = os.environ.get("PM_SYNC_TIEBREAK_COLUMN", "work_order")
+PAGE_SIZE = 1000
 
 def get_supabase_client():
+    from supabase import create_client
     supabase_url = os.environ.get("SUPABASE_URL")
     supabase_key = os.environ.get("SUPABASE_KEY")
     return create_client(supabase_url, supabase_key)
 
-def upsert_pm_work_orders_to_pm_all():
-    supabase = get_supabase_client()
+def get_watermark(supabase):
+    """Return the watermark stored by the last successful sync, or None if there isn't one yet."""
+    try:
+        response = supabase.table('sync_state').select('watermark').eq('job', SYNC_JOB_NAME).limit(1).execute()
+    except Exception as e:
+        # A missing sync_state table would otherwise turn every run into a full sync
+        raise RuntimeError(f"Could not read the sync watermark from sync_state: {str(e)}") from e
+    if response.data:
+        return response.data[0].get('watermark')
+    return None
+
+def save_watermark(supabase, watermark):
+    try:
+        supabase.table('sync_state').upsert(
+            [{"job": SYNC_JOB_NAME, "watermark": watermark}], on_conflict="job"
+        ).execute()
+    except Exception as e:
+        raise RuntimeError(f"Could not save the sync watermark to sync_state: {str(e)}") from e
+    print(f"Saved sync watermark: {watermark}")
 
-    # Fetch all work orders in batches
+def fetch_pm_work_orders(supabase, since=None):
+    """
+    Fetch pm_work_orders rows in pages, optionally only those changed since `since`
+
+    Args:
+        supabase: Supabase client
+        since (str): Watermark value; rows with WATERMARK_COLUMN at or after it are returned
+
+    Returns:
+        list: Work order rows
+    """
+    if since is not None:
+        return fetch_changed_work_orders(supabase, since)
     work_orders = []
-    page_size = 1000
     page = 0
     while True:
-        response = supabase.table('pm_work_orders').select('*').range(page * page_size, (page + 1) * page_size - 1).execute()
+        query = supabase.table('pm_work_orders').select('*')
+        response = query.range(page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1).execute()
         batch = response.data if response.data else []
         if not batch:
             break
         work_orders.extend(batch)
-        if len(batch) < page_size:
+        if len(batch) < PAGE_SIZE:
             break
         page += 1
+    return work_orders
 
-    # Fetch existing work_order_ids from pm_all
-    existing_ids = set()
-    page = 0
+def fetch_changed_work_orders(supabase, since):
+    """Rows with WATERMARK_COLUMN >= since, paged by (WATERMARK_COLUMN, TIEBREAK_COLUMN) keys."""
+    work_orders = []
+    last = None
     while True:
-        existing_response = supabase.table('pm_all').select('work_order_id').range(page * page_size, (page + 1) * page_size - 1).execute()
-        batch = existing_response.data if existing_response.data else []
-        if not batch:
-            break
-        existing_ids.update(row['work_order_id'] for row in batch if row.get('work_order_id'))
-        if len(batch) < page_size:
+        query = supabase.table('pm_work_orders').select('*')
+        if last is None:
+            query = query.gte(WATERMARK_COLUMN, since)
+        else:
+            # Strictly after the last row read: a later timestamp, or the same one with a larger tiebreak
+            watermark, tiebreak = (str(value).replace('"', '\\"') for value in last)
+            query = query.or_(
+                f'{WATERMARK_COLUMN}.gt."{watermark}",'
+                f'and({WATERMARK_COLUMN}.eq."{watermark}",{TIEBREAK_COLUMN}.gt."{tiebreak}")'
+            )
+        response = query.order(WATERMARK_COLUMN).order(TIEBREAK_COLUMN).limit(PAGE_SIZE).execute()
+        batch = response.data if response.data else []
+        work_orders.extend(batch)
+        if len(batch) < PAGE_SIZE:
             break
-        page += 1
+        last = (batch[-1].get(WATERMARK_COLUMN), batch[-1].get(TIEBREAK_COLUMN))
+    return work_orders
+
+def to_pm_all_row(wo):
+    return {
+        "selected": True,
+        "work_order_id": wo.get("work_order"),
+        "wo_type": wo.get("wo_type"),
+        "status": wo.get("status"),
+        "equipment": wo.get("equipment"),
+        "building_name": wo.get("building_name"),
+        "building_id": wo.get("building_id"),
+        "description": wo.get("description"),
+        "assigned_to": wo.get("assigned_to"),
+        "trade": wo.get("trade"),
+        "zone": wo.get("zone"),
+        "organization": wo.get("organization"),
+        "scheduled_start_date": wo.get("scheduled_start_date"),
+        "date_completed": wo.get("date_completed"),
+        "pm_code": wo.get("pm_code"),
+        "last_updated_by": wo.get("last_updated_by"),
+        "service_category": wo.get("service_category"),
+        "service_code": wo.get("service_code"),
+        "date_created": wo.get("date_created"),
+        "region": wo.get("region")
+    }
+
+def upsert_pm_work_orders_to_pm_all(full=False):
+    """
+    Sync pm_work_orders into pm_all
+
+    Args:
+        full (bool): Sync every row instead of only rows changed since the stored watermark
+
+    Returns:
+        dict: Counts of processed, new and updated rows
+    """
+    supabase = get_supabase_client()
+
+    since = None if full else get_watermark(supabase)
+    try:
+        work_orders = fetch_pm_work_orders(supabase, since)
+    except Exception as e:
+        if since is None:
+            raise
+        # Don't quietly fall back to a full sync every night; make the job fail
+        raise RuntimeError(
+            f"Incremental fetch of pm_work_orders failed: {str(e)}. Check that the "
+            f"'{WATERMARK_COLUMN}' and '{TIEBREAK_COLUMN}' columns exist, or run with --full."
+        ) from e
+
+    if full:
+        print(f"Full sync: {len(work_orders)} work orders")
+    elif since is None:
+        print(f"Full sync (no watermark): {len(work_orders)} work orders")
+    else:
+        print(f"Incremental sync since {since}: {len(work_orders)} changed work orders")
 
     new_count = 0
     update_count = 0
 
-    # Upsert in batches for efficiency
-    for i in range(0, len(work_orders), page_size):
-        batch = work_orders[i:i+page_size]
-        print(f"Processing batch {i // page_size + 1} ({len(batch)} records)...")
-        for wo in batch:
-            wo_id = wo.get("work_order")
-            if wo_id not in existing_ids:
-                new_count += 1
-            else:
-                update_count += 1
-        supabase.table('pm_all').upsert([
-            {
-                "selected": True,
-                "work_order_id": wo.get("work_order"),
-                "wo_type": wo.get("wo_type"),
-                "status": wo.get("status"),
-                "equipment": wo.get("equipment"),
-                "building_name": wo.get("building_name"),
-                "building_id": wo.get("building_id"),
-                "description": wo.get("description"),
-                "assigned_to": wo.get("assigned_to"),
-                "trade": wo.get("trade"),
-                "zone": wo.get("zone"),
-                "organization": wo.get("organization"),
-                "scheduled_start_date": wo.get("scheduled_start_date"),
-                "date_completed": wo.get("date_completed"),
-                "pm_code": wo.get("pm_code"),
-                "last_updated_by": wo.get("last_updated_by"),
-                "service_category": wo.get("service_category"),
-                "service_code": wo.get("service_code"),
-                "date_created": wo.get("date_created"),
-                "region": wo.get("region")
-            } for wo in batch
-        ], on_conflict="work_order_id").execute()
+    # Upsert in batches. Inserting with ignore_duplicates first returns only the
+    # rows that were new; the rest are then upserted as updates.
+    for i in range(0, len(work_orders), PAGE_SIZE):
+        batch = [to_pm_all_row(wo) for wo in work_orders[i:i+PAGE_SIZE]]
+        print(f"Processing batch {i // PAGE_SIZE + 1} ({len(batch)} records)...")
+        inserted = supabase.table('pm_all').upsert(
+            batch, on_conflict="work_order_id", ignore_duplicates=True
+        ).execute()
+        inserted_ids = {row.get("work_order_id") for row in (inserted.data or [])}
+        new_count += len(inserted_ids)
+
+        to_update = [row for row in batch if row["work_order_id"] not in inserted_ids]
+        if to_update:
+            updated = supabase.table('pm_all').upsert(to_update, on_conflict="work_order_id").execute()
+            update_count += len(updated.data) if updated.data else 0
+
+    watermarks = [wo.get(WATERMARK_COLUMN) for wo in work_orders if wo.get(WATERMARK_COLUMN)]
+    if watermarks:
+        save_watermark(supabase, max(watermarks))
+    elif work_orders:
+        print(f"ERROR: pm_work_orders rows have no '{WATERMARK_COLUMN}' values, so no sync watermark was saved "
+              "and the next run will be a full sync again. Add the column or set PM_SYNC_WATERMARK_COLUMN.")
 
     print(f"Total work orders processed: {len(work_orders)}")
     print(f"New rows added: {new_count}")
-    print(f"Rows updated: {update_count}")
\ No newline at end of file
+    print(f"Rows updated: {update_count}")
+
+    return {
+        "processed_records": len(work_orders),
+        "inserted_records": new_count,
+        "updated_records": update_count
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync pm_work_orders into pm_all")
+    parser.add_argument("--full", action="store_true", help="Sync every row instead of only rows changed since the last run")
+    args = parser.parse_args()
+    upsert_pm_work_orders_to_pm_all(full=args.full)
@@ -11,7 +11,7 @@ import json
 from styles import inject_styles
 from auth import auth_sidebar
 from sidebar import chat_sessions_sidebar, full_sidebar
-from chat import chat_interface, load_dictionary_corpus
+from chat import chat_interface, load_dictionary_index
 from sidebar_sections import show_faqs, show_definitions, show_user_feedback, show_session_analytics, show_dictionary_lookup, show_dashboard
 from manual_lookup import show_manual_lookup
 from frontend.dashboard_viewer import display_dashboard_page
@@ -26,6 +26,13 @@ from frontend.process_maps import process_maps_page
 from frontend.guidance_section import show_guidance_section
 
 from pm_data_page import show_pm_data_page, show_pm_data_upload
+from upload_report import show_validation_report
+from backend.utils.upload_engine import WORK_ORDERS_HISTORY_SPEC, UPLOAD_FILE_TYPES, read_upload_file
+from backend.utils.spreadsheet import read_excel
+from backend.utils.data_profile import file_hash, get_data_profile
+from backend.utils.embedding_models import warm_up
+from backend.utils import knowledge_retriever
+from backend.utils.upload_validation import validate_upload
 # Initialize session state for page navigation
 if "current_page" not in st.session_state:
     st.session_state["current_page"] = "main"
@@ -44,15 +51,20 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from backend.utils.db import save_uploaded_file, load_uploaded_file, load_faqs
 links = pd.read_csv("backend/data/links.csv")
 faqs_df = load_faqs()
-faqs_context = ""
+# One context item per FAQ, so the prompt budget can keep the relevant ones whole
+faqs_context = []
 if faqs_df is not None and not faqs_df.empty:
-    faqs_context = "\n".join(
+    faqs_context = [
         f"Q: {row['question']}\nA: {row['answer']}"
         for _, row in faqs_df.iterrows()
-    )
+    ]
+
+# Load the dictionary retrieval index (built once, cached across reruns)
+dictionary_index = load_dictionary_index()
 
-# Load the dictionary corpus from Supabase
-dictionary_corpus = load_dictionary_corpus()
+# Start loading the embedding model and indexing knowledge sources in the background (once per process)
+warm_up()
+knowledge_retriever.warm_up()
 
 # Apply styles
 inject_styles()
@@ -119,12 +131,19 @@ if st.session_state.get("token") and st.session_state.get("user_id"):
                 try:
                     with st.spinner("Reading uploaded file..."):
                         bytes_data = uploaded_file.read()
-                        save_uploaded_file(selected_session, uploaded_file.name, bytes_data, user_id=user_id)
-                        if uploaded_file.name.endswith(".csv"):
-                            df = pd.read_csv(BytesIO(bytes_data))
-                        else:
-                            df = pd.read_excel(BytesIO(bytes_data))
-                        st.session_state.uploaded_df = df
+                        upload_hash = file_hash(bytes_data)
+                        # The uploader keeps the file across reruns; only save and parse it once
+                        upload_key = f"{selected_session}:{upload_hash}"
+                        if st.session_state.get("uploaded_file_key") != upload_key or st.session_state.get("uploaded_df") is None:
+                            save_uploaded_file(selected_session, uploaded_file.name, bytes_data, user_id=user_id)
+                            if uploaded_file.name.endswith(".csv"):
+                                df = pd.read_csv(BytesIO(bytes_data))
+                            else:
+                                df = read_excel(BytesIO(bytes_data))
+                            st.session_state.uploaded_df = df
+                            st.session_state.uploaded_file_key = upload_key
+                            st.session_state.uploaded_profile = get_data_profile(df, upload_hash)
+                        df = st.session_state.uploaded_df
                         st.success("✅ File uploaded and saved for this session.")
                         st.dataframe(df.head())
                 except Exception as e:
@@ -135,16 +154,20 @@ if st.session_state.get("token") and st.session_state.get("user_id"):
                         df_from_db = load_uploaded_file(selected_session, user_id=user_id)
                         if df_from_db is not None:
                             st.session_state.uploaded_df = df_from_db
+                            st.session_state.uploaded_file_key = None
+                            st.session_state.uploaded_profile = get_data_profile(df_from_db)
                             st.info("📁 Loaded previously uploaded file for this session.")
                             st.dataframe(df_from_db.head())
                         else:
                             st.session_state.uploaded_df = None
+                            st.session_state.uploaded_profile = None
                             st.info("ℹ️ No uploaded file found. Please upload a file to start.")
             chat_interface(
                 st.session_state.get("uploaded_df"),
                 faqs_context=faqs_context,
                 faqs_df=faqs_df,
-                dictionary_corpus=dictionary_corpus
+                dictionary_index=dictionary_index,
+                data_profile=st.session_state.get("uploaded_profile")
             )
             
     elif current_page == "faqs":
@@ -427,77 +450,17 @@ if st.session_state.get("token") and st.session_state.get("user_id"):
                 st.title("Upload Work Orders")
                 
             # Improved work order upload functionality
-            st.info("Upload work order data in CSV or Excel format.")
+            st.info("Upload work order data in CSV, Excel, Parquet or Arrow format.")
             
-            uploaded_file = st.file_uploader("Upload Work Order File", type=["xlsx", "xls", "csv"])
+            uploaded_file = st.file_uploader("Upload Work Order File", type=UPLOAD_FILE_TYPES)
             if uploaded_file is not None:
                 try:
                     with st.spinner("Reading file..."):
-                        if uploaded_file.name.endswith(".csv"):
-                            df = pd.read_csv(uploaded_file)
-                        else:
-                            df = pd.read_excel(uploaded_file)
-                        
-                        # Clean column names - convert to lowercase and replace spaces with underscores
-                        df.columns = [col.lower().replace(' ', '_').replace('.', '').replace('__', '_') for col in df.columns]
-                        
-                        # Define expected columns based on the work_orders_history schema
-                        expected_columns = [
-                            'work_order', 'wo_type', 'status', 'equipment', 'building_name', 'building_id',
-                            'description', 'assigned_to', 'trade', 'zone', 'organization', 'scheduled_start_date',
-                            'date_completed', 'pm_code', 'last_updated_by', 'service_category', 'service_code',
-                            'date_created', 'region', 'priority'
-                        ]
-                        
-                        # Rename columns to match database schema exactly
-                        column_mapping = {
-                            'sched_start_date': 'scheduled_start_date',  # Fix sched_start_date to match schema
-                            'start_date': 'scheduled_start_date',        # Also handle possible start_date variation
-                            'completion_date': 'date_completed',         # Handle any possible date_completed variation  
-                            'created_date': 'date_created',              # Handle any possible date_created variation
-                            'complete_date': 'date_completed'            # Another possible variation
-                        }
+                        df = read_upload_file(uploaded_file, uploaded_file.name)
                         
-                        # Apply the mapping to rename columns that need it
-                        for old_name, new_name in column_mapping.items():
-                            if old_name in df.columns and new_name not in df.columns:
-                                df = df.rename(columns={old_name: new_name})
-                                st.info(f"Renamed '{old_name}' column to '{new_name}' to match database schema.")
-                        
-                        # Show a warning for any expected columns that are still missing
-                        missing_columns = [col for col in expected_columns if col not in df.columns]
-                        if missing_columns:
-                            st.warning(f"Missing columns that may be required by the database: {', '.join(missing_columns)}")
-                        
-                        # Handle the priority_icon to priority translation
-                        if 'priority_icon' in df.columns:
-                            if 'priority' in df.columns:
-                                # If both exist, use priority and drop priority_icon
-                                df = df.drop(columns=['priority_icon'])
-                                st.info("Found both 'priority' and 'priority_icon' columns. Using 'priority' column.")
-                            else:
-                                # Rename priority_icon to priority
-                                df = df.rename(columns={'priority_icon': 'priority'})
-                                st.info("Renamed 'priority_icon' column to 'priority' for database compatibility.")
-                        
-                        # Check for duplicates in the work_order column
-                        if 'work_order' in df.columns:
-                            duplicate_mask = df.duplicated('work_order', keep=False)
-                            duplicate_count = duplicate_mask.sum()
-                            
-                            if duplicate_count > 0:
-                                st.warning(f"Found {duplicate_count} duplicate work order numbers in your upload file.")
-                                duplicate_wo = df[duplicate_mask]['work_order'].unique()
-                                
-                                with st.expander(f"View {len(duplicate_wo)} duplicate work order numbers"):
-                                    st.write(", ".join(str(wo) for wo in duplicate_wo[:20]))
-                                    if len(duplicate_wo) > 20:
-                                        st.write(f"... and {len(duplicate_wo) - 20} more")
-                                
-                                # Keep only the last instance of each duplicate work order
-                                st.info("Removing duplicates by keeping the most recent entry for each work order...")
-                                df = df.drop_duplicates('work_order', keep='last')
-                                st.success(f"Removed {duplicate_count - len(duplicate_wo)} duplicate entries.")
+                        # Check columns, duplicates, dates and ids in one pass before uploading
+                        report = validate_upload(df, WORK_ORDERS_HISTORY_SPEC)
+                        can_upload = show_validation_report(report)
                         
                         # Show preview
                         st.write("Data Preview:")
@@ -510,15 +473,16 @@ if st.session_state.get("token") and st.session_state.get("user_id"):
                         st.info(f"File contains {num_rows} rows and {num_cols} columns.")
                         
                         # Process button with actual database upload
-                        if st.button("Process and Upload Data", use_container_width=True):
+                        if st.button("Process and Upload Data", use_container_width=True, disabled=not can_upload):
                             try:
                                 with st.spinner("Processing data and uploading to database, this may take a moment..."):
                                     # Import the backend utility function to handle the upload
                                     from backend.utils.work_order_upload_supabase import upload_work_orders_to_supabase
                                     
-                                    # Save the dataframe to a temporary Excel file
-                                    temp_file = "temp_work_orders.xlsx"
-                                    df.to_excel(temp_file, index=False)
+                                    # Save the uploaded file as-is so the uploader reads it in its original format
+                                    temp_file = "temp_work_orders" + os.path.splitext(uploaded_file.name)[1].lower()
+                                    with open(temp_file, "wb") as f:
+                                        f.write(uploaded_file.getvalue())
                                     
                                     # Create a progress bar
                                     progress_bar = st.progress(0)
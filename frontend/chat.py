@@ -1,31 +1,34 @@
 import streamlit as st
 import re
 import json
+import inspect
 from backend.utils.ai_chat import ask_gpt
-from backend.utils.db import save_message, get_user_memory, update_user_memory
+from backend.utils.db import save_message
+from backend.utils.conversation_memory import load_memory, record_turn, memory_section
+from backend.utils.prompt_budget import section, rank_by_overlap
+from backend.utils import knowledge_retriever
 from backend.utils.faq_semantics import get_faq_match
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 from backend.utils.supabase_client import supabase
+from backend.utils.dictionary_sync import fetch_dictionary_rows
+from backend.utils.dictionary_index import build_dictionary_index, search_dictionary_index
+from backend.utils.data_profile import get_data_profile
+from backend.utils.turn_pipeline import (
+    source as context_source, start_sources, collect_source, collect_sources, gather_sources,
+    run_in_background, after_task
+)
 from frontend.process_maps import display_pdf_from_data, display_pdf_from_url
 
+@st.cache_resource(show_spinner=False)
+def load_dictionary_index():
+    """Retrieval index over the dictionary table; cleared when the dictionary is re-uploaded."""
+    try:
+        rows = fetch_dictionary_rows(supabase, include_eam=False)
+    except Exception:
+        rows = []
+    return build_dictionary_index(rows)
+
 def load_dictionary_corpus():
-    response = supabase.table("dictionary").select("sequence, description").execute()
-    # Safely check for an error attribute; if not present then assume no error
-    error = getattr(response, "error", None)
-    if error:
-        return []
-    # Alternatively, if response is a dict-like object, you can do:
-    # if response.get("error"):
-    #    return []
-    data = getattr(response, "data", [])
-    corpus = []
-    for row in data:
-        sequence = row.get("sequence") or ""
-        description = row.get("description") or ""
-        corpus.append(f"{sequence} – {description}")
-    return corpus
+    return load_dictionary_index()["corpus"]
 
 def run_ai_response(code: str, context_vars: dict):
     local_vars = {}
@@ -44,35 +47,30 @@ def run_ai_response(code: str, context_vars: dict):
         st.code(code, language="python")
     return output
 
-# Modified retrieve_relevant_dictionary with flexible sheet-code filtering
-def retrieve_relevant_dictionary(query, corpus, top_k=3):
-    query_lower = query.lower()
-    # List of known sheet codes (add any new ones here)
-    sheet_codes = ["fc-q-01", "fa-a-01f", "eg-s-01", "eg-m-01", "eg-a-01", "safety-w-q-01"]
-    matched_code = None
-    for code in sheet_codes:
-        if code in query_lower:
-            matched_code = code
-            break
-    if matched_code:
-        filtered_corpus = [entry for entry in corpus if matched_code in entry.lower()]
-        # Optional debug:
-        # st.write(f"Matched code: {matched_code}")
-        # st.write("Filtered Corpus:", filtered_corpus)
-        if not filtered_corpus:
-            filtered_corpus = corpus
-    else:
-        filtered_corpus = corpus
-
-    vectorizer = TfidfVectorizer(stop_words="english")
-    corpus_vectors = vectorizer.fit_transform(filtered_corpus)
-    query_vector = vectorizer.transform([query])
-    scores = cosine_similarity(query_vector, corpus_vectors).flatten()
-    top_indices = [i for i in np.argsort(scores)[-top_k:][::-1] if scores[i] > 0.15]
-    relevant_rows = [filtered_corpus[i] for i in top_indices]
-    return "\n".join(relevant_rows)
-
-def chat_interface(uploaded_df=None, faqs_context="", faqs_df=None, dictionary_corpus=None):
+def retrieve_relevant_dictionary(query, dictionary_index, top_k=3):
+    # Accept a plain list of entries too, indexing it on the spot
+    if isinstance(dictionary_index, list):
+        dictionary_index = build_dictionary_index([{"description": entry} for entry in dictionary_index])
+    return "\n".join(search_dictionary_index(dictionary_index, query, top_k=top_k))
+
+def render_streaming_answer(prompt, chunks):
+    """Show the answer as it streams in and return the full text once it's done."""
+    st.markdown(f"<div class='user-msg'>🧑‍💼 You:<br>{prompt}</div>", unsafe_allow_html=True)
+    placeholder = st.empty()
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(f"<div class='bot-msg'>🤖 PM Bot:<br>{text}▌</div>", unsafe_allow_html=True)
+    text = text.strip()
+    placeholder.markdown(f"<div class='bot-msg'>🤖 PM Bot:<br>{text}</div>", unsafe_allow_html=True)
+    return text
+
+def save_turn(session_id, response, user_id=None, prompt=None, memory_text=None):
+    save_message(session_id, "assistant", response)
+    if memory_text is not None:
+        record_turn(user_id, prompt, memory_text)
+
+def chat_interface(uploaded_df=None, faqs_context="", faqs_df=None, dictionary_index=None, data_profile=None):
     # Display previous chat messages
     for msg in st.session_state.messages:
         if msg["role"] == "user":
@@ -159,51 +157,74 @@ def chat_interface(uploaded_df=None, faqs_context="", faqs_df=None, dictionary_c
             prompt = f"{prompt} for {st.session_state['last_subject']}"
 
         st.session_state.messages.append({"role": "user", "content": prompt})
-        save_message(session_id, "user", prompt)
 
-        memory = ""
+        # Independent lookups for this turn run concurrently. Saving the question and
+        # reading memory wait for the previous turn's background write, so the stored
+        # history keeps its order and memory includes the last answer.
+        previous_write = st.session_state.get("pending_turn_write")
+        sources = {"save_user_message": context_source(after_task, previous_write, save_message, session_id, "user", prompt)}
         if memory_enabled and user_id:
-            memory = get_user_memory(user_id)
-
-        faq_answer = None
+            sources["memory"] = context_source(after_task, previous_write, load_memory, user_id)
+        # The question is embedded once, for the FAQ match, retrieval and the response cache
+        sources["embedding"] = context_source(knowledge_retriever.embed_query, prompt)
+        pending = start_sources(sources)
+        question_embedding = collect_source(pending, "embedding")
+        sources = {}
         if faqs_df is not None:
-            faq_answer = get_faq_match(prompt, faqs_df)
+            sources["faq_answer"] = context_source(get_faq_match, prompt, faqs_df, user_embedding=question_embedding)
+        # FAQs have their own section, the other knowledge sources come from the retriever
+        sources["knowledge"] = context_source(
+            knowledge_retriever.search, prompt, top_k=5,
+            sources=[name for name in knowledge_retriever.SOURCES if name != "faqs"], vector=question_embedding
+        )
+        results = {**collect_sources(pending), **gather_sources(sources)}
+        faq_answer = results.get("faq_answer")
 
         if faq_answer:
             response = faq_answer
         else:
-            # Build context from uploaded data, FAQs, and dictionary corpus (RAG)
-            context = ""
+            # Context sources from memory, uploaded data, FAQs, and retrieved knowledge (RAG);
+            # ask_gpt keeps the highest priority items that fit its token budget
+            context = [memory_section(results.get("memory"))]
             if uploaded_df is not None:
-                context += uploaded_df.to_csv(index=False) + "\n"
+                # A cached summary of the file rather than the whole file as CSV
+                profile = data_profile or get_data_profile(uploaded_df)
+                context.append(section("data_profile", profile.split("\n")))
             if faqs_context:
-                context += "\nFAQs:\n" + faqs_context
-            if dictionary_corpus is not None and len(dictionary_corpus) > 0:
-                relevant_dictionary_context = retrieve_relevant_dictionary(prompt, dictionary_corpus, top_k=3)
-                if relevant_dictionary_context:
-                    context += "\nData Dictionary (relevant):\n" + relevant_dictionary_context
+                faq_items = faqs_context if isinstance(faqs_context, list) else [faqs_context]
+                context.append(section("faqs", faq_items, header="FAQs:", ranks=rank_by_overlap(prompt, faq_items)))
+            knowledge = results.get("knowledge")
+            if knowledge is not None:
+                hits = knowledge["results"]
+                context.append(section("knowledge", [hit["content"] for hit in hits], header="Relevant knowledge:"))
+            if (knowledge is None or "dictionary" in knowledge["skipped"]) \
+                    and dictionary_index is not None and dictionary_index["corpus"]:
+                # The retriever timed out or its dictionary index is still building; this one is always ready
+                dictionary_hits = search_dictionary_index(dictionary_index, prompt, top_k=3)
+                context.append(section("dictionary", dictionary_hits, header="Data Dictionary (relevant):"))
 
-            full_prompt = memory + f"\nUser: {prompt}\nBot:"
-            response = ask_gpt(prompt, context=context)
+            response = ask_gpt(prompt, context=context, stream=True, question_embedding=question_embedding)
+            if inspect.isgenerator(response):
+                response = render_streaming_answer(prompt, response)
 
         # Save to session state and database (handle both string and dict responses)
         st.session_state.messages.append({"role": "assistant", "content": response})
         
         # For database storage, convert dict to JSON string if needed
-        if isinstance(response, dict):
-            save_message(session_id, "assistant", json.dumps(response))
-        else:
-            save_message(session_id, "assistant", response)
+        stored_response = json.dumps(response) if isinstance(response, dict) else response
 
+        memory_text = None
         if memory_enabled and user_id:
             # For memory, only store the message text or a summary of structured content
             if isinstance(response, dict) and response.get("type") == "process_maps":
                 memory_text = f"I found {len(response.get('results', []))} process maps related to your query."
             else:
                 memory_text = response
-            
-            updated_memory = memory + f"\nUser: {prompt}\nBot: {memory_text}\n"
-            update_user_memory(user_id, updated_memory)
+
+        # The writes don't hold up the rerun; the next turn's memory read waits for them
+        st.session_state["pending_turn_write"] = run_in_background(
+            save_turn, session_id, stored_response, user_id, prompt, memory_text
+        )
 
         st.rerun()
 
@@ -3,19 +3,31 @@ import pandas as pd
 import os
 import requests
 from dotenv import load_dotenv
+from functools import lru_cache
 from urllib.parse import urlparse
+from backend.utils.spreadsheet import read_excel
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 SEARCH_ENGINE_ID = os.getenv("SEARCH_ENGINE_ID")
+BEST_PRACTICES_TIMEOUT = 5
+REGULATIONS_FILE = "backend/data/Dictionary Format 2024_Jun 20.xlsm"
+
+@lru_cache(maxsize=1)
+def _read_regulations(path, mtime):
+    df = read_excel(path, sheet_name="Summary")
+    df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
+    return df
+
+def load_regulations_summary():
+    """Summary sheet of the regulations dictionary, re-read only when the file changes."""
+    return _read_regulations(REGULATIONS_FILE, os.path.getmtime(REGULATIONS_FILE))
 
 def show_guidance_section():
     st.subheader("📘 Regulations & Bylaws Guidance")
 
     try:
-        xls = pd.ExcelFile("backend/data/Dictionary Format 2024_Jun 20.xlsm")
-        df = pd.read_excel(xls, sheet_name="Summary")
-        df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
+        df = load_regulations_summary()
     except Exception as e:
         st.error(f"Could not load regulations dictionary: {e}")
         return
@@ -74,9 +86,7 @@ def show_best_practices_section():
 
     # (Optional) Load regulations dictionary if you want to use it elsewhere
     try:
-        reg_xls = pd.ExcelFile("backend/data/Dictionary Format 2024_Jun 20.xlsm")
-        reg_df = pd.read_excel(reg_xls, sheet_name="Summary")
-        reg_df.columns = [col.strip().lower().replace(' ', '_') for col in reg_df.columns]
+        reg_df = load_regulations_summary()
     except Exception as e:
         st.error(f"Could not load regulations dictionary: {e}")
         return
@@ -95,7 +105,7 @@ def show_best_practices_section():
     }
     with st.spinner("Searching online for best practices..."):
         try:
-            response = requests.get("https://www.googleapis.com/customsearch/v1", params=params)
+            response = requests.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=BEST_PRACTICES_TIMEOUT)
             data = response.json()
             items = data.get("items", [])
         except Exception as e:
@@ -137,9 +147,7 @@ def show_best_practices_section():
 
 def get_guidance_results(search, limit=3):
     try:
-        xls = pd.ExcelFile("backend/data/Dictionary Format 2024_Jun 20.xlsm")
-        df = pd.read_excel(xls, sheet_name="Summary")
-        df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
+        df = load_regulations_summary()
         filtered = df[
             df['equipment_description'].str.contains(search, case=False, na=False) |
             df['code_/_regulatory_body'].str.contains(search, case=False, na=False) |
@@ -164,7 +172,7 @@ def get_best_practices_results(search, limit=3):
         "num": limit
     }
     try:
-        response = requests.get("https://www.googleapis.com/customsearch/v1", params=params)
+        response = requests.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=BEST_PRACTICES_TIMEOUT)
         data = response.json()
         items = data.get("items", [])
         results = []
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from backend.utils.manual_fetcher import add_manual_links_to_df
+from backend.utils.spreadsheet import read_excel
 
 def show_manual_lookup():
     st.subheader("🔍 Manual Lookup by Manufacturer & Model")
@@ -12,7 +13,7 @@ def show_manual_lookup():
             if uploaded_file.name.endswith(".csv"):
                 df = pd.read_csv(uploaded_file)
             else:
-                df = pd.read_excel(uploaded_file)
+                df = read_excel(uploaded_file)
 
             st.write("### Preview of Uploaded Data")
             st.dataframe(df.head())
@@ -8,6 +8,9 @@ from backend.utils.pm_wo_retrieval import get_pm_data, get_pm_metrics
 from frontend.pm_schedule_viewer import display_scheduling_recommendations, display_pm_schedule_planner
 from frontend.pm_schedule_viewer import display_pm_calendar_view, display_status_distribution
 from frontend.pm_schedule_viewer import organize_pm_data_in_tabs
+from frontend.upload_report import show_validation_report
+from backend.utils.upload_engine import PM_ALL_SPEC, UPLOAD_FILE_TYPES, read_upload_file
+from backend.utils.upload_validation import validate_upload
 
 # Add caching functions to prevent redundant database queries
 def get_cached_zones():
@@ -604,48 +607,17 @@ def show_pm_data_upload():
             st.title("Upload PM Data")
             
         # PM data upload functionality
-        st.info("Upload preventive maintenance data in CSV or Excel format.")
+        st.info("Upload preventive maintenance data in CSV, Excel, Parquet or Arrow format.")
         
-        uploaded_file = st.file_uploader("Upload PM Data File", type=["xlsx", "xls", "csv"], key="pm_upload")
+        uploaded_file = st.file_uploader("Upload PM Data File", type=UPLOAD_FILE_TYPES, key="pm_upload")
         if uploaded_file is not None:
             try:
                 with st.spinner("Reading file..."):
-                    if uploaded_file.name.endswith(".csv"):
-                        df = pd.read_csv(uploaded_file)
-                    else:
-                        df = pd.read_excel(uploaded_file)
-                    
-                    # Clean column names - convert to lowercase and replace spaces with underscores
-                    df.columns = [col.lower().replace(' ', '_').replace('.', '').replace('__', '_') for col in df.columns]
-                    
-                    # Define expected columns for PM data
-                    expected_columns = [
-                        'work_order', 'wo_type', 'status', 'equipment', 'building_name', 'building_id',
-                        'description', 'assigned_to', 'trade', 'zone', 'organization', 'scheduled_start_date',
-                        'date_completed', 'pm_code', 'last_updated_by', 'service_category', 'service_code',
-                        'date_created', 'region', 'priority'
-                    ]
-                    
-                    # Rename columns to match database schema exactly
-                    column_mapping = {
-                        'priority_icon': 'priority',
-                        'sched_start_date': 'scheduled_start_date',
-                        'start_date': 'scheduled_start_date',
-                        'completion_date': 'date_completed',
-                        'created_date': 'date_created',
-                        'complete_date': 'date_completed'
-                    }
-                    
-                    # Apply the mapping to rename columns that need it
-                    for old_name, new_name in column_mapping.items():
-                        if old_name in df.columns and new_name not in df.columns:
-                            df = df.rename(columns={old_name: new_name})
-                            st.info(f"Renamed '{old_name}' column to '{new_name}' to match database schema.")
+                    df = read_upload_file(uploaded_file, uploaded_file.name)
                     
-                    # Show a warning for any expected columns that are still missing
-                    missing_columns = [col for col in expected_columns if col not in df.columns]
-                    if missing_columns:
-                        st.warning(f"Missing columns that may be required by the database: {', '.join(missing_columns)}")
+                    # Check columns, duplicates, dates and ids in one pass before uploading
+                    report = validate_upload(df, PM_ALL_SPEC)
+                    can_upload = show_validation_report(report)
                     
                     # Show preview
                     st.write("Data Preview:")
@@ -658,15 +630,16 @@ def show_pm_data_upload():
                     st.info(f"File contains {num_rows} rows and {num_cols} columns.")
                     
                     # Process button
-                    if st.button("Process and Upload PM Data", key="process_pm_btn", use_container_width=True):
+                    if st.button("Process and Upload PM Data", key="process_pm_btn", use_container_width=True, disabled=not can_upload):
                         try:
                             with st.spinner("Processing and uploading PM data..."):
                                 import os
                                 from backend.utils.pm_work_order_upload_supabase import upload_pm_data_to_supabase
                                 
-                                # Save the dataframe to a temporary Excel file
-                                temp_file = "temp_pm_data.xlsx"
-                                df.to_excel(temp_file, index=False)
+                                # Save the uploaded file as-is so the uploader reads it in its original format
+                                temp_file = "temp_pm_data" + os.path.splitext(uploaded_file.name)[1].lower()
+                                with open(temp_file, "wb") as f:
+                                    f.write(uploaded_file.getvalue())
                                 
                                 # Create a progress bar
                                 progress_bar = st.progress(0)
@@ -1,5 +1,6 @@
 import streamlit as st
 from backend.utils.supabase_client import supabase
+from backend.utils.knowledge_retriever import invalidate_source
 import pandas as pd
 import base64
 import io
@@ -287,6 +288,7 @@ def upload_process_map():
                         try:
                             insert_data["pdf_data"] = pdf_data
                             result = supabase.table("process_maps").insert(insert_data).execute()
+                            invalidate_source("process_maps")
                             st.success(f"Process map '{title}' uploaded successfully!")
                             st.rerun()
                         except Exception as column_error:
@@ -297,6 +299,7 @@ def upload_process_map():
                     else:
                         # Just insert the record with the file URL
                         result = supabase.table("process_maps").insert(insert_data).execute()
+                        invalidate_source("process_maps")
                         st.success(f"Process map '{title}' uploaded successfully!")
                         st.rerun()
                 
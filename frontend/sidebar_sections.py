@@ -170,6 +170,24 @@ def show_session_analytics():
         return
 
     st.subheader("📊 Session Analytics (All Users)")
+    from backend.utils.response_cache import get_cache_stats
+    cache_stats = get_cache_stats()
+    st.write(
+        f"Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+        f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size']} cached answers)"
+    )
+    from backend.utils.embedding_models import get_model_stats
+    for name, stats in get_model_stats().items():
+        st.write(
+            f"Embedding model {name}: loaded in {stats['load_seconds']}s, "
+            f"+{stats['rss_increase_mb']} MB resident memory"
+        )
+    from backend.utils.knowledge_retriever import get_retriever_stats
+    for name, stats in get_retriever_stats().items():
+        st.write(
+            f"Knowledge source {name}: {stats['documents']} documents, built in {stats['build_seconds']}s, "
+            f"{stats['avg_query_ms']} ms per query"
+        )
     from backend.utils.db import get_all_sessions_analytics
     analytics = get_all_sessions_analytics()
     if not analytics:
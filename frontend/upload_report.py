@@ -0,0 +1,36 @@
+import streamlit as st
+import pandas as pd
+
+def show_validation_report(report):
+    """
+    Display an upload validation report from backend.utils.upload_validation
+
+    Returns:
+        bool: True if the file can be uploaded
+    """
+    for old_name, new_name in report["renamed_columns"].items():
+        st.info(f"Renamed '{old_name}' column to '{new_name}' to match database schema.")
+
+    for error in report["errors"]:
+        st.error(f"❌ {error}")
+    for warning in report["warnings"]:
+        st.warning(warning)
+
+    if report["duplicate_keys"]:
+        with st.expander("View duplicate work order numbers"):
+            st.write(", ".join(report["duplicate_keys"]))
+            if report["duplicate_rows"] > len(report["duplicate_keys"]):
+                st.write("... and possibly more")
+
+    with st.expander("Validation details"):
+        st.write(
+            f"Checked {report['total_rows']} rows for the **{report['table']}** table "
+            f"in {report['elapsed_seconds']:.3f} seconds; {report['skipped_rows']} rows would be skipped."
+        )
+        if report["null_rates"]:
+            null_df = pd.DataFrame(
+                {"column": list(report["null_rates"].keys()), "empty (%)": [round(v * 100, 1) for v in report["null_rates"].values()]}
+            )
+            st.dataframe(null_df, hide_index=True)
+
+    return report["ok"]
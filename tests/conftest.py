@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Make `backend` importable when pytest is run from any directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.utils.upload_benchmark import FakeSupabase
+
+@pytest.fixture
+def fake_supabase():
+    """In-memory stand-in for the Supabase client (see upload_benchmark.FakeSupabase)."""
+    return FakeSupabase()
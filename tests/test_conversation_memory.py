@@ -0,0 +1,76 @@
+import pytest
+
+from backend.utils.prompt_budget import count_tokens
+from backend.utils.upload_benchmark import FakeSupabase
+
+cm = pytest.importorskip("backend.utils.conversation_memory")
+from backend.utils import db
+
+class Completion:
+    """Records summary requests and answers with a fixed summary."""
+    requests = []
+    summary = "User manages Building 12 chillers."
+
+    @classmethod
+    def create(cls, **request):
+        cls.requests.append(request)
+        message = type("Message", (), {"content": cls.summary})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeSupabase(identity={cm.MEMORY_TABLE: "id"})
+    monkeypatch.setattr(cm, "supabase", client)
+    monkeypatch.setattr(db, "supabase", client)
+    monkeypatch.setattr(cm.openai, "ChatCompletion", Completion)
+    monkeypatch.setattr(Completion, "requests", [])
+    return client
+
+def record(turns, start=0):
+    for n in range(start, start + turns):
+        cm.record_turn("u1", f"question {n}", f"answer {n}")
+
+def test_turns_are_compacted_into_the_summary_once_a_batch_has_built_up(client):
+    record(cm.RECENT_TURNS + cm.COMPACT_BATCH - 1)
+    assert Completion.requests == []
+
+    record(1, start=cm.RECENT_TURNS + cm.COMPACT_BATCH - 1)
+    assert len(Completion.requests) == 1
+    prompt = Completion.requests[0]["messages"][0]["content"]
+    assert "question 0" in prompt and f"question {cm.COMPACT_BATCH - 1}" in prompt
+    assert f"question {cm.COMPACT_BATCH}" not in prompt
+    assert len(client.tables[cm.MEMORY_TABLE]) == cm.RECENT_TURNS
+
+    memory = cm.load_memory("u1")
+    assert memory["summary"] == Completion.summary
+    assert [turn["user_text"] for turn in memory["turns"]] == [
+        f"question {n}" for n in range(cm.COMPACT_BATCH, cm.COMPACT_BATCH + cm.RECENT_TURNS)
+    ]
+
+def test_memory_stays_bounded_however_long_the_conversation(client):
+    record(100)
+    assert len(client.tables[cm.MEMORY_TABLE]) < cm.RECENT_TURNS + cm.COMPACT_BATCH
+    assert len(cm.load_memory("u1")["turns"]) == cm.RECENT_TURNS
+
+def test_users_do_not_share_memory(client):
+    record(3)
+    cm.record_turn("u2", "other question", "other answer")
+    assert [turn["user_text"] for turn in cm.load_memory("u2")["turns"]] == ["other question"]
+
+def test_summary_and_turns_are_clipped_with_the_prompt_token_counter(client, monkeypatch):
+    monkeypatch.setattr(Completion, "summary", "chiller " * 1000)
+    long_answer = "word " * 2000
+    cm.record_turn("u1", "question", long_answer)
+    assert count_tokens(client.tables[cm.MEMORY_TABLE][0]["bot_text"]) <= cm.TURN_TOKEN_LIMIT
+
+    record(cm.RECENT_TURNS + cm.COMPACT_BATCH)
+    assert count_tokens(cm.load_memory("u1")["summary"]) <= cm.SUMMARY_TOKEN_BUDGET
+
+def test_failed_summary_keeps_the_latest_transcript(client, monkeypatch):
+    def fail(**request):
+        raise RuntimeError("rate limited")
+    monkeypatch.setattr(Completion, "create", staticmethod(fail))
+    record(cm.RECENT_TURNS + cm.COMPACT_BATCH)
+    summary = cm.load_memory("u1")["summary"]
+    assert f"answer {cm.COMPACT_BATCH - 1}" in summary
+    assert count_tokens(summary) <= cm.SUMMARY_TOKEN_BUDGET
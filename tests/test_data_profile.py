@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+from backend.utils import data_profile
+from backend.utils.data_profile import dataframe_hash, get_data_profile, profile_dataframe
+
+@pytest.fixture(autouse=True)
+def profiles(monkeypatch):
+    monkeypatch.setattr(data_profile, "_profiles", OrderedDict())
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "work_order": range(1000),
+        "status": ["Open", "Closed", "Open", "In Progress"] * 250,
+        "cost": [float(i % 50) for i in range(1000)],
+        "scheduled": pd.date_range("2024-01-01", periods=1000, freq="h"),
+    })
+
+def test_profile_is_bounded_and_much_smaller_than_the_csv(df):
+    profile = profile_dataframe(df)
+    assert profile.startswith("Uploaded data: 1000 rows x 4 columns")
+    assert "top: Open (500)" in profile and "2024-01-01 to 2024-02-11" in profile
+    assert len(profile) <= data_profile.MAX_CHARS < len(df.to_csv())
+
+def test_profile_is_computed_once_per_upload(df, monkeypatch):
+    calls = []
+    monkeypatch.setattr(data_profile, "profile_dataframe", lambda frame: calls.append(frame) or f"profile {len(calls)}")
+
+    assert get_data_profile(df, "upload-a") == "profile 1"
+    assert get_data_profile(df.copy(), "upload-a") == "profile 1"
+    assert get_data_profile(df) == "profile 2"
+    assert get_data_profile(df.copy()) == "profile 2"
+    assert len(calls) == 2
+
+def test_changed_data_gets_a_new_profile(df):
+    edited = df.copy()
+    edited.loc[0, "status"] = "Cancelled"
+    assert dataframe_hash(edited) != dataframe_hash(df)
+    assert dataframe_hash(df.rename(columns={"cost": "price"})) != dataframe_hash(df)
+    assert "Cancelled" in get_data_profile(edited.head(3)) and "Cancelled" not in get_data_profile(df.head(3))
+
+def test_cache_keeps_the_most_recently_used_profiles(df, monkeypatch):
+    monkeypatch.setattr(data_profile, "CACHE_SIZE", 2)
+    for key in ("a", "b"):
+        get_data_profile(df, key)
+    get_data_profile(df, "a")
+    get_data_profile(df, "c")
+    assert list(data_profile._profiles) == ["a", "c"]
+
+def test_no_upload_has_no_profile():
+    assert get_data_profile(None) == ""
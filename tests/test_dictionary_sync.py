@@ -0,0 +1,77 @@
+import random
+
+from backend.utils.dictionary_sync import (
+    DICTIONARY_TABLE, BATCH_SIZE, diff_dictionary, apply_dictionary_diff, normalize_row, row_key, row_values
+)
+from backend.utils.upload_benchmark import FakeSupabase
+
+def make_rows(rng, codes, eam_share=0.2):
+    rows = []
+    for code in codes:
+        eam = f"OLD-{code}" if rng.random() < eam_share else None
+        for sequence in range(1, rng.randint(2, 6)):
+            rows.append({"pm_code": code, "pm_name": f"{code} name", "eam_pm_name": eam,
+                         "sequence": sequence, "description": f"{code} task {sequence}"})
+    return rows
+
+def edit(rng, rows):
+    """An uploaded workbook: some rows changed, removed, added, and one PM code dropped."""
+    new_rows = [dict(row) for row in rows if row["pm_code"] != rows[0]["pm_code"] and rng.random() > 0.1]
+    for row in new_rows:
+        if rng.random() < 0.15:
+            row["description"] += " (revised)"
+    new_rows += make_rows(rng, ["NEW-Q-01", "NEW-Q-02"])
+    new_rows.append(dict(new_rows[1], sequence=99, description="appended task"))
+    return new_rows
+
+def table_state(rows):
+    return sorted((row_key(row), row_values(row)) for row in rows)
+
+def test_applying_the_diff_gives_the_same_table_as_delete_all_and_reinsert():
+    for seed in range(20):
+        rng = random.Random(seed)
+        current = make_rows(rng, [f"FC-Q-{i:02d}" for i in range(15)])
+        new_rows = edit(rng, current)
+        client = FakeSupabase()
+        client.tables[DICTIONARY_TABLE] = [dict(row) for row in current]
+
+        diff = diff_dictionary(current, new_rows)
+        counts = apply_dictionary_diff(client, diff, new_rows)
+
+        assert table_state(client.tables[DICTIONARY_TABLE]) == table_state(new_rows)
+        assert counts["inserted"] == len(diff["inserts"])
+        assert counts["updated"] == len(diff["updates"])
+
+def test_unchanged_upload_is_a_no_op():
+    rows = make_rows(random.Random(0), ["FC-Q-01", "FC-Q-02"])
+    diff = diff_dictionary(rows, [dict(row) for row in rows])
+    assert diff == {"inserts": [], "updates": [], "deletes": [], "unchanged": len(rows)}
+
+def test_repeated_keys_are_replaced_as_a_group():
+    # Without an eam_pm_name column, main and EAM sections can share pm_code + sequence
+    current = [{"pm_code": "A", "sequence": 1, "pm_name": "A", "description": "main"},
+               {"pm_code": "A", "sequence": 1, "pm_name": "A", "description": "eam"}]
+    new_rows = [dict(current[0]), dict(current[1], description="eam (revised)")]
+    diff = diff_dictionary(current, new_rows)
+    assert diff["deletes"] == [("A", 1, None)]
+    assert diff["inserts"] == new_rows
+
+def test_cells_that_read_back_the_same_are_unchanged():
+    # What the table returns vs what pandas reads from the workbook
+    current = [{"pm_code": "A", "sequence": 1, "pm_name": "5", "description": None, "eam_pm_name": None}]
+    uploaded = [{"pm_code": "A", "sequence": 1.0, "pm_name": 5, "description": float("nan"), "eam_pm_name": float("nan")}]
+    assert diff_dictionary(current, uploaded)["unchanged"] == 1
+    assert normalize_row(uploaded[0]) == current[0]
+
+def test_updates_are_batched(fake_supabase):
+    current = [{"pm_code": f"C{i % 5}", "sequence": i, "pm_name": "n", "description": "old", "eam_pm_name": None}
+               for i in range(250)]
+    new_rows = [dict(row, description="new") for row in current]
+    fake_supabase.tables[DICTIONARY_TABLE] = [dict(row) for row in current]
+
+    counts = apply_dictionary_diff(fake_supabase, diff_dictionary(current, new_rows), new_rows)
+
+    assert counts == {"inserted": 0, "updated": 250, "deleted": 0}
+    assert table_state(fake_supabase.tables[DICTIONARY_TABLE]) == table_state(new_rows)
+    # One grouped delete per PM code, then the re-inserts in batches
+    assert fake_supabase.requests == 5 + -(-250 // BATCH_SIZE)
@@ -0,0 +1,13 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+from backend.utils.embedding_benchmark import MIN_TOP1_AGREEMENT, run_benchmark
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_backend_retrieves_like_torch(backend):
+    result = run_benchmark(backend, queries=100, documents=300)
+    assert not result["fell_back_to_torch"], f"{backend} fell back to torch, so parity wasn't tested"
+    assert result["top1_agreement"] >= MIN_TOP1_AGREEMENT
+    assert result["parity"] is True
@@ -0,0 +1,68 @@
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.utils import faq_semantics
+
+QUESTIONS = ["How often are filters changed?", "Who closes a work order?", "What is a PM?"]
+
+def fake_vector(text):
+    vector = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).normal(size=8).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+@pytest.fixture
+def encoded(monkeypatch, tmp_path):
+    """Texts passed to the embedding model, which is replaced by a deterministic encoder."""
+    calls = []
+
+    def encode(texts, name=None):
+        calls.append(texts)
+        if isinstance(texts, str):
+            return fake_vector(texts)
+        return np.stack([fake_vector(text) for text in texts])
+
+    monkeypatch.setattr(faq_semantics, "encode", encode)
+    monkeypatch.setattr(faq_semantics, "EMBEDDING_DIR", str(tmp_path))
+    monkeypatch.setattr(faq_semantics, "_embeddings", {})
+    return calls
+
+def saved_files(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path) if name.startswith("faq_"))
+
+def test_embeddings_are_encoded_once_and_reloaded_from_disk(encoded, tmp_path):
+    first = faq_semantics.get_faq_embeddings(QUESTIONS)
+    assert faq_semantics.get_faq_embeddings(QUESTIONS) is first
+    faq_semantics._embeddings.clear()
+    reloaded = faq_semantics.get_faq_embeddings(QUESTIONS)
+
+    assert encoded == [QUESTIONS]
+    np.testing.assert_allclose(reloaded, first)
+    assert saved_files(tmp_path) == [f"faq_{faq_semantics.faq_fingerprint(QUESTIONS)}.npy"]
+
+def test_changing_the_questions_re_encodes_and_removes_the_old_file(encoded, tmp_path):
+    faq_semantics.get_faq_embeddings(QUESTIONS)
+    edited = QUESTIONS[:2] + ["What is a PM code?"]
+    matrix = faq_semantics.get_faq_embeddings(edited)
+
+    assert encoded == [QUESTIONS, edited]
+    np.testing.assert_allclose(matrix[2], fake_vector("What is a PM code?"))
+    assert saved_files(tmp_path) == [f"faq_{faq_semantics.faq_fingerprint(edited)}.npy"]
+
+def test_unreadable_or_mismatched_files_are_re_encoded(encoded, tmp_path):
+    path = tmp_path / f"faq_{faq_semantics.faq_fingerprint(QUESTIONS)}.npy"
+    np.save(path, np.zeros((2, 8), dtype=np.float32))
+    assert faq_semantics.get_faq_embeddings(QUESTIONS).shape == (3, 8)
+
+    faq_semantics._embeddings.clear()
+    path.write_bytes(b"not an array")
+    assert faq_semantics.get_faq_embeddings(QUESTIONS).shape == (3, 8)
+    assert encoded == [QUESTIONS, QUESTIONS]
+
+def test_get_faq_match_returns_the_closest_answer_above_the_threshold(encoded):
+    faqs = pd.DataFrame({"question": QUESTIONS, "answer": ["Quarterly.", "The trade.", "Preventive maintenance."]})
+    assert faq_semantics.get_faq_match("Who closes a work order?", faqs) == "The trade."
+    assert faq_semantics.get_faq_match("x", faqs, user_embedding=fake_vector(QUESTIONS[2])) == "Preventive maintenance."
+    assert faq_semantics.get_faq_match("x", faqs, threshold=1.01, user_embedding=fake_vector(QUESTIONS[2])) is None
@@ -0,0 +1,23 @@
+import random
+
+from backend.utils.intent_benchmark import load_questions, legacy_route
+from backend.utils.intent_router import PhraseMatcher, route_question
+
+def test_router_picks_the_same_intents_as_the_legacy_cascade():
+    mismatches = [q for q in load_questions() if route_question(q)["intents"] != legacy_route(q)]
+    assert mismatches == []
+
+def test_phrase_matcher_finds_every_contained_phrase():
+    phrases = ["code", "pm code", "pm codes", "work order", "work orders for building", "manual", "oem manual", "or"]
+    matcher = PhraseMatcher({phrase: frozenset([phrase]) for phrase in phrases})
+    rng = random.Random(0)
+    words = ["pm", "codes", "code", "work", "orders", "order", "for", "building", "oem", "manual", "the", "or"]
+    for _ in range(2000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        assert matcher.find(text) == {phrase for phrase in phrases if phrase in text}, text
+
+def test_route_extracts_slots():
+    route = route_question("Show work order #12345 for building 200")
+    assert route["intents"][0] == "work_order"
+    assert route["slots"]["work_order"] == "12345"
+    assert route_question("What are the tasks for FC-Q-01?")["slots"]["pm_code"] == "FC-Q-01"
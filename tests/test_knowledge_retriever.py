@@ -0,0 +1,162 @@
+import math
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from backend.utils import knowledge_retriever
+from backend.utils.knowledge_retriever import SourceIndex, tokenize
+
+DOCS = {
+    "faqs": ["How often is the FC-Q-01 filter changed?", "Who closes a work order?", "Pump seal leaks after service"],
+    "definitions": ["PM preventive maintenance", "EAM enterprise asset management", "filter media rating MERV"],
+}
+
+@pytest.fixture(autouse=True)
+def sources(monkeypatch, tmp_path):
+    """Small in-memory sources, BM25 only (no embedding model), and fresh module state."""
+    monkeypatch.setattr(knowledge_retriever, "SOURCES", {
+        name: (lambda texts=texts: [{"text": text, "content": text} for text in texts]) for name, texts in DOCS.items()
+    })
+    monkeypatch.setattr(knowledge_retriever, "_dense_enabled", False)
+    monkeypatch.setattr(knowledge_retriever, "_dense_retry_at", 0.0)
+    monkeypatch.setattr(knowledge_retriever, "EMBEDDING_DIR", str(tmp_path))
+    for name, value in (("_indexes", {}), ("_stale", set()), ("_stats", {}), ("_build_locks", {})):
+        monkeypatch.setattr(knowledge_retriever, name, value)
+
+def build(*names):
+    for name in names:
+        knowledge_retriever._get_index(name)
+
+def bm25(query, texts, k1=knowledge_retriever.BM25_K1, b=knowledge_retriever.BM25_B):
+    docs = [tokenize(text) for text in texts]
+    average = sum(map(len, docs)) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for token in set(tokenize(query)):
+            df = sum(token in other for other in docs)
+            if not df or token not in doc:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = doc.count(token)
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / average))
+        scores.append(score)
+    return scores
+
+def test_lexical_scores_are_bm25():
+    texts = DOCS["faqs"] + DOCS["definitions"]
+    index = SourceIndex("faqs", [{"text": text, "content": text} for text in texts])
+    expected = bm25("filter change service", texts)
+    for doc, score in index.lexical(tokenize("filter change service")):
+        assert score == pytest.approx(expected[doc])
+    assert {doc for doc, _ in index.lexical(tokenize("filter change service"))} == {i for i, s in enumerate(expected) if s > 0}
+
+def test_pm_codes_stay_one_token():
+    assert "fc-q-01" in tokenize("Is FC-Q-01 due?")
+
+def test_search_fuses_sources_by_rank():
+    build("faqs", "definitions")
+    result = knowledge_retriever.search("filter", top_k=3)
+    assert result["skipped"] == []
+    # The top hit of each source ties on 1/(RRF_K + 1) and comes before any second-ranked hit
+    assert {hit["source"] for hit in result["results"][:2]} == {"faqs", "definitions"}
+    assert all(hit["lexical_rank"] == 1 for hit in result["results"][:2])
+
+def test_dense_rank_lifts_a_document_found_both_ways():
+    index = SourceIndex("faqs", [{"text": text, "content": text} for text in DOCS["faqs"]])
+    index.matrix = np.eye(3, dtype=np.float32)
+    knowledge_retriever._indexes["faqs"] = index
+    knowledge_retriever._stats["faqs"] = {"queries": 0, "total_query_ms": 0.0}
+    # "filter" matches only doc 0 lexically; the vector points at doc 2
+    result = knowledge_retriever.search("filter", sources=["faqs"], vector=np.array([0, 0, 1], dtype=np.float32))
+    assert [hit["id"] for hit in result["results"]] == ["0", "2"]
+    result = knowledge_retriever.search("pump filter", sources=["faqs"], vector=np.array([0, 0, 1], dtype=np.float32))
+    assert result["results"][0]["id"] == "2"
+    assert result["results"][0]["score"] == pytest.approx(2 / (knowledge_retriever.RRF_K + 1), abs=1e-3)
+
+def test_unbuilt_sources_are_skipped_and_stale_ones_still_searched():
+    build("faqs")
+    knowledge_retriever.invalidate_source("faqs")
+    result = knowledge_retriever.search("filter", sources=["faqs"])
+    assert result["results"][0]["content"] == DOCS["faqs"][0]
+
+    gate = knowledge_retriever._build_locks.setdefault("definitions", knowledge_retriever.threading.Lock())
+    with gate:  # a build is in progress
+        result = knowledge_retriever.search("filter", sources=["definitions"])
+    assert result["skipped"] == ["definitions"] and result["results"] == []
+
+def test_added_documents_are_searchable():
+    build("faqs")
+    knowledge_retriever.add_documents("faqs", [{"text": "Boiler inspection checklist", "content": "boiler"}])
+    assert knowledge_retriever.search("boiler", sources=["faqs"])["results"][0]["content"] == "boiler"
+
+def test_added_documents_are_embedded_outside_the_lock_and_swapped_in(monkeypatch):
+    build("faqs")
+    searched = knowledge_retriever._indexes["faqs"]
+    lock_free = []
+
+    def search_meanwhile():
+        acquired = knowledge_retriever._lock.acquire(timeout=1)
+        if acquired:
+            knowledge_retriever._lock.release()
+        lock_free.append(acquired)
+
+    def encode(texts):
+        # A search on another thread must be able to take the lock while this runs
+        probe = threading.Thread(target=search_meanwhile)
+        probe.start()
+        probe.join()
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(knowledge_retriever, "_dense_enabled", True)
+    monkeypatch.setattr(knowledge_retriever, "_encode", encode)
+    knowledge_retriever.add_documents("faqs", [{"text": "Boiler inspection checklist", "content": "boiler"}])
+
+    assert lock_free == [True]
+    assert len(searched.documents) == len(DOCS["faqs"]) and "boiler" not in searched.postings
+    assert len(knowledge_retriever._indexes["faqs"].documents) == len(DOCS["faqs"]) + 1
+
+def test_documents_added_during_a_build_mark_the_source_stale():
+    build("faqs")
+    with knowledge_retriever._build_locks["faqs"]:
+        knowledge_retriever.add_documents("faqs", [{"text": "Boiler inspection checklist", "content": "boiler"}])
+    assert "faqs" in knowledge_retriever._stale
+
+class Models:
+    def __init__(self, load_error=None, encode_error=None):
+        self.load_error, self.encode_error = load_error, encode_error
+
+    def get_embedding_model(self):
+        if self.load_error:
+            raise self.load_error
+
+    def encode(self, texts):
+        if self.encode_error:
+            raise self.encode_error
+        return np.ones(4, dtype=np.float32)
+
+def use_models(monkeypatch, models):
+    monkeypatch.setattr(knowledge_retriever, "_dense_enabled", True)
+    monkeypatch.setitem(sys.modules, "backend.utils.embedding_models", models)
+
+def test_a_failed_encode_does_not_disable_dense_retrieval(monkeypatch):
+    models = Models(encode_error=RuntimeError("CUDA out of memory"))
+    use_models(monkeypatch, models)
+    assert knowledge_retriever.embed_query("filter") is None
+    models.encode_error = None
+    assert knowledge_retriever.embed_query("filter") is not None
+
+def test_a_model_that_fails_to_load_is_retried_after_a_backoff(monkeypatch):
+    use_models(monkeypatch, Models(load_error=OSError("connection reset")))
+    assert knowledge_retriever.embed_query("filter") is None
+    assert knowledge_retriever._dense_enabled and not knowledge_retriever._dense_available()
+    monkeypatch.setattr(knowledge_retriever, "_dense_retry_at", 0.0)
+    use_models(monkeypatch, Models())
+    assert knowledge_retriever.embed_query("filter") is not None
+
+def test_missing_embedding_package_disables_dense_retrieval(monkeypatch):
+    use_models(monkeypatch, None)
+    assert knowledge_retriever.embed_query("filter") is None
+    assert not knowledge_retriever._dense_enabled
@@ -0,0 +1,42 @@
+from backend.utils.prompt_budget import section, assemble_context, clip_to_tokens, count_tokens, rank_by_overlap
+
+def test_whole_items_are_dropped_to_fit_the_budget():
+    items = [f"Entry {i}: " + "word " * 20 for i in range(10)]
+    context, usage = assemble_context([section("knowledge", items, header="Relevant knowledge:")], budget=60)
+    kept = [item for item in items if item in context]
+    assert usage["tokens"] <= 60
+    assert count_tokens(context) <= 60
+    assert 0 < len(kept) < len(items)
+    assert usage["sections"]["knowledge"] == {"kept": len(kept), "dropped": len(items) - len(kept)}
+    # Kept items are whole, never cut mid-record
+    assert context == "\n".join(["Relevant knowledge:"] + kept)
+
+def test_priorities_and_limits():
+    memory = section("memory", ["User: hi " * 10, "Bot: hello " * 10])
+    faqs = section("faqs", ["Q: a " * 10, "Q: b " * 10])
+    one_faq = count_tokens("Q: a " * 10 + "\n")
+    context, usage = assemble_context([faqs, memory], budget=1000, priorities={"memory": 0, "faqs": 1}, limits={"faqs": one_faq})
+    assert usage["sections"]["memory"]["dropped"] == 0
+    assert usage["sections"]["faqs"] == {"kept": 1, "dropped": 1}
+    # Output keeps the order the sections were given in
+    assert context.index("Q: a") < context.index("User: hi")
+
+def test_ranks_choose_items_but_not_their_order():
+    items = ["alpha filter", "", "beta pump", "gamma belt"]
+    spec = section("faqs", items, ranks=[2, 0, 1, 0])
+    assert spec["items"] == ["alpha filter", "beta pump", "gamma belt"]
+    assert spec["ranks"] == [2, 1, 0]
+    budget = count_tokens("beta pump\n") + count_tokens("gamma belt\n")
+    context, _ = assemble_context([spec], budget=budget)
+    assert context == "beta pump\ngamma belt"
+
+def test_rank_by_overlap():
+    assert rank_by_overlap("replace the pump belt", ["filter change", "pump belt check", "pump noise"]) == [2, 0, 1]
+
+def test_clip_to_tokens_keeps_the_end_or_start_within_the_budget():
+    text = " ".join(f"turn{i}" for i in range(500))
+    assert clip_to_tokens(text, count_tokens(text)) == text
+    end = clip_to_tokens(text, 50)
+    start = clip_to_tokens(text, 50, keep="start")
+    assert end.startswith("...") and end.endswith("turn499") and count_tokens(end) <= 50
+    assert start.endswith("...") and start.startswith("turn0") and count_tokens(start) <= 50
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+import pytest
+
+from backend.utils import remove_past_future_pms as cleanup
+
+TODAY = date.today()
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    monkeypatch.setattr(cleanup, "get_supabase_client", lambda: fake_supabase)
+    rows = []
+    for n in range(40):
+        selected = (None, False, True)[n % 3]
+        rows.append({"work_order_id": f"WO{n:04d}", "selected": selected, "scheduled_start_date": day(n % 8 - 4)})
+    fake_supabase.tables["pm_all"] = rows
+    return fake_supabase
+
+def expected_survivors(rows, since, until):
+    def removed(row):
+        scheduled = row["scheduled_start_date"]
+        if row["selected"] is None:
+            return since <= scheduled <= until
+        return row["selected"] is False and scheduled < TODAY.isoformat()
+    return sorted(row["work_order_id"] for row in rows if not removed(row))
+
+def ids(client):
+    return sorted(row["work_order_id"] for row in client.tables["pm_all"])
+
+def test_rules_remove_exactly_the_stale_rows_in_bounded_chunks(client):
+    expected = expected_survivors(client.tables["pm_all"], day(-3), day(0))
+    summary = cleanup.remove_past_future_pms_with_null_selected(since=day(-3), chunk_size=3)
+
+    assert ids(client) == expected
+    assert summary["total_removed"] == 40 - len(expected)
+    for rule in summary["rules"].values():
+        assert all(removed <= 3 for removed in rule["chunks"])
+        assert sum(rule["chunks"]) == rule["removed"]
+
+def test_default_run_only_looks_at_today_for_unselected_future_pms(client):
+    expected = expected_survivors(client.tables["pm_all"], day(0), day(0))
+    cleanup.remove_past_future_pms_with_null_selected()
+    assert ids(client) == expected
+
+def test_since_after_until_is_rejected(client):
+    with pytest.raises(ValueError):
+        cleanup.remove_past_future_pms_with_null_selected(since=day(0), until=day(-1))
+
+class SelectedDuringCleanup:
+    """Marks a work order selected between the chunk's select and its delete."""
+
+    def __init__(self, client, work_order_id):
+        self.client, self.work_order_id = client, work_order_id
+
+    def table(self, name):
+        query = self.client.table(name)
+        delete = query.delete
+
+        def delete_after_change():
+            for row in self.client.tables[name]:
+                if row["work_order_id"] == self.work_order_id:
+                    row["selected"] = True
+            return delete()
+
+        query.delete = delete_after_change
+        return query
+
+def test_rows_changed_since_the_select_are_not_deleted(client):
+    target = next(row for row in client.tables["pm_all"] if row["selected"] is None and row["scheduled_start_date"] == day(0))
+    chunks = cleanup.delete_in_chunks(SelectedDuringCleanup(client, target["work_order_id"]),
+                                      cleanup.null_selected_rule(day(0), day(0)), chunk_size=2)
+    assert target in client.tables["pm_all"]
+    assert not any(row["selected"] is None and row["scheduled_start_date"] == day(0) for row in client.tables["pm_all"])
+    assert sum(chunks) == sum(1 for n in range(40) if n % 3 == 0 and n % 8 == 4) - 1
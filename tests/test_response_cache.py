@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from backend.utils import response_cache
+from backend.utils.prompt_budget import section
+
+FAQS = ["Q: How often are PMs scheduled?\nA: Quarterly.", "Q: Who closes work orders?\nA: The assigned trade."]
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    response_cache.invalidate_response_cache()
+    yield
+    response_cache.invalidate_response_cache()
+
+def unit(seed):
+    vector = np.random.default_rng(seed).normal(size=384).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def turn_sections(memory, knowledge, profile="rows: 10"):
+    return [
+        section("memory", memory),
+        section("data_profile", [profile]),
+        section("faqs", FAQS, header="FAQs:"),
+        section("knowledge", knowledge, header="Relevant knowledge:"),
+    ]
+
+def test_repeated_question_with_the_same_context_hits():
+    question = unit(1)
+    first = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], ["FC-Q-01: Inspect filters"]))
+    response_cache.store(question, first, "When are PMs due?", "Quarterly.")
+
+    # Another session asking with the same (empty) memory and the same retrieval hits
+    second = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], ["FC-Q-01: Inspect filters"]))
+    assert second == first
+    assert response_cache.lookup(question, second) == "Quarterly."
+    assert response_cache.get_cache_stats()["hits"] == 1
+
+def test_users_with_different_memory_do_not_share_answers():
+    question = unit(6)
+    knowledge = ["FC-Q-01: Inspect filters"]
+    user_a = response_cache.context_key("gpt-3.5-turbo", False, turn_sections(["User: I manage Building 12"], knowledge))
+    response_cache.store(question, user_a, "Which PMs are due in my building?", "Building 12: FC-Q-01.")
+
+    user_b = response_cache.context_key("gpt-3.5-turbo", False, turn_sections(["User: I manage Building 40"], knowledge))
+    assert response_cache.lookup(question, user_b) is None
+
+def test_different_retrieval_hits_miss():
+    question = unit(7)
+    key = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], ["FC-Q-01: Inspect filters"]))
+    response_cache.store(question, key, "What does this PM cover?", "Filters.")
+    other = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], ["Process map: HVAC"]))
+    assert response_cache.lookup(question, other) is None
+
+def test_different_data_profile_or_mode_misses():
+    question = unit(2)
+    key = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], []))
+    response_cache.store(question, key, "How many rows?", "Ten.")
+    other_profile = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], [], profile="rows: 20"))
+    code_mode = response_cache.context_key("gpt-3.5-turbo", True, turn_sections([], []))
+    assert response_cache.lookup(question, other_profile) is None
+    assert response_cache.lookup(question, code_mode) is None
+
+def test_dissimilar_question_misses():
+    key = response_cache.context_key("gpt-3.5-turbo", False, turn_sections([], []))
+    response_cache.store(unit(3), key, "When are PMs due?", "Quarterly.")
+    assert response_cache.lookup(unit(4), key) is None
+
+def test_ask_gpt_answers_a_repeated_question_from_the_cache(monkeypatch):
+    ai_chat = pytest.importorskip("backend.utils.ai_chat")
+    calls = []
+
+    class Completion:
+        @staticmethod
+        def create(**request):
+            calls.append(request)
+            message = type("Message", (), {"content": "Quarterly."})
+            return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+    monkeypatch.setattr(ai_chat, "run_intent_handlers", lambda *args: None)
+    monkeypatch.setattr(ai_chat.openai, "ChatCompletion", Completion)
+    monkeypatch.setattr(response_cache, "embed_question", lambda question: unit(5))
+    monkeypatch.setattr(response_cache, "ENABLED", True)
+
+    first = ai_chat.ask_gpt("When are PMs due?", context=turn_sections([], ["FC-Q-01: Inspect filters"]))
+    second = ai_chat.ask_gpt("When are PMs due?", context=turn_sections([], ["FC-Q-01: Inspect filters"]))
+    other_user = ai_chat.ask_gpt("When are PMs due?", context=turn_sections(["User: Building 40"], ["FC-Q-01: Inspect filters"]))
+    assert first == second == other_user == "Quarterly."
+    assert len(calls) == 2
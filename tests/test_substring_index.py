@@ -0,0 +1,76 @@
+import csv
+import random
+
+import pandas as pd
+import pytest
+
+from backend.utils import knowledge_base
+from backend.utils.content_loader import search_content
+from backend.utils.substring_index import build_substring_index, add_text, find_first
+
+def learned_questions():
+    with open(knowledge_base.LEARNED_QA_PATH, newline="", encoding="utf-8", errors="replace") as f:
+        return [row[0] for row in csv.reader(f) if len(row) >= 2]
+
+def sample_queries(texts, count, seed=0):
+    """Substrings of the texts (cut anywhere, so partial words and punctuation), in mixed case, plus misses."""
+    rng = random.Random(seed)
+    queries = ["", " ", "?", "zzqx not there", "work order 99999999"]
+    for _ in range(count):
+        text = rng.choice(texts)
+        start = rng.randrange(len(text) + 1)
+        query = text[start:start + rng.randint(1, 30)]
+        queries.append(query.upper() if rng.random() < 0.3 else query)
+    return queries
+
+def linear_find_first(texts, query):
+    return next((i for i, text in enumerate(texts) if query.lower() in str(text).lower()), None)
+
+def test_find_first_matches_a_linear_scan():
+    texts = learned_questions()
+    index = build_substring_index(texts)
+    mismatches = [q for q in sample_queries(texts, 3000) if find_first(index, q) != linear_find_first(texts, q)]
+    assert mismatches == []
+
+def test_texts_added_later_are_found():
+    index = build_substring_index(["Replace the filter"])
+    add_text(index, "Inspect FC-Q-01 belts")
+    assert find_first(index, "q-01 belt") == 1
+    assert find_first(index, "THE FILTER") == 0
+    assert find_first(index, "pump") is None
+
+def test_search_learned_qa_matches_a_scan_of_the_csv():
+    with open(knowledge_base.LEARNED_QA_PATH, newline="", encoding="utf-8", errors="replace") as f:
+        rows = [row for row in csv.reader(f) if len(row) >= 2]
+    questions = [row[0] for row in rows]
+    for query in sample_queries(questions, 1000, seed=1):
+        row = linear_find_first(questions, query)
+        assert knowledge_base.search_learned_qa(query) == (rows[row][1] if row is not None else None)
+
+def baseline_search_content(query, faqs, definitions):
+    """content_loader.search_content before the substring index (iterrows over both tables)."""
+    for _, row in faqs.iterrows():
+        if query.lower() in row['Question'].lower():
+            return row['Answer']
+    for _, row in definitions.iterrows():
+        if query.lower() in row['Term'].lower() or query.lower() in row['Definition'].lower():
+            return f"{row['Term']}: {row['Definition']}"
+    return knowledge_base.search_learned_qa(query)
+
+@pytest.fixture
+def tables():
+    faqs = pd.DataFrame({
+        "Question": ["How often are PMs scheduled?", "Who closes a work order?", "What is FC-Q-01?"],
+        "Answer": ["Quarterly.", "The assigned trade.", "Quarterly filter change."],
+    })
+    definitions = pd.DataFrame({
+        "Term": ["PM", "EAM", "Work order"],
+        "Definition": ["Preventive maintenance.", "Enterprise asset management system.", "A request for maintenance work."],
+    })
+    return faqs, definitions
+
+def test_search_content_matches_the_iterrows_version(tables):
+    faqs, definitions = tables
+    texts = list(faqs["Question"]) + list(definitions["Term"]) + list(definitions["Definition"]) + learned_questions()[:200]
+    for query in sample_queries(texts, 1000, seed=2):
+        assert search_content(query, faqs, definitions) == baseline_search_content(query, faqs, definitions)
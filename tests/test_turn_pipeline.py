@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from backend.utils.turn_pipeline import source, start_sources, collect_source, gather_sources, run_in_background, after_task
+
+def fail():
+    raise ValueError("lookup failed")
+
+def test_failed_and_slow_sources_use_their_defaults():
+    results = gather_sources({
+        "fast": source(lambda: "answer"),
+        "broken": source(fail, default="fallback"),
+        "slow": source(time.sleep, 1, timeout=0.05, default="late"),
+    })
+    assert results == {"fast": "answer", "broken": "fallback", "slow": "late"}
+
+def test_raise_errors_surfaces_the_exception():
+    pending = start_sources({"handler": source(fail, raise_errors=True)})
+    with pytest.raises(ValueError, match="lookup failed"):
+        collect_source(pending, "handler")
+
+def test_after_task_waits_for_the_previous_write():
+    order = []
+    write = run_in_background(lambda: (time.sleep(0.05), order.append("assistant reply")))
+    pending = start_sources({"save": source(after_task, write, order.append, "next question")})
+    collect_source(pending, "save")
+    assert order == ["assistant reply", "next question"]
+
+def test_after_task_runs_even_if_the_previous_write_failed():
+    assert after_task(run_in_background(fail), lambda: "saved") == "saved"
+    assert after_task(None, lambda: "saved") == "saved"
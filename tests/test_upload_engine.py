@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from backend.utils.upload_engine import PM_ALL_SPEC, BloomFilter, prepare_dataframe, upload_dataframe
+
+def baseline_pm_all_columns(df):
+    """Columns the PM upload page and pm_work_order_upload_supabase sent to pm_all before the upload engine."""
+    # Page: clean names, rename priority_icon -> priority (and the date variations)
+    df = df.copy()
+    df.columns = [col.lower().replace(' ', '_').replace('.', '').replace('__', '_') for col in df.columns]
+    page_mapping = {
+        'priority_icon': 'priority',
+        'sched_start_date': 'scheduled_start_date',
+        'start_date': 'scheduled_start_date',
+        'completion_date': 'date_completed',
+        'created_date': 'date_created',
+        'complete_date': 'date_completed'
+    }
+    for old_name, new_name in page_mapping.items():
+        if old_name in df.columns and new_name not in df.columns:
+            df = df.rename(columns={old_name: new_name})
+    # Uploader: rename work_order and drop priority
+    if 'work_order' in df.columns and 'work_order_id' not in df.columns:
+        df = df.rename(columns={'work_order': 'work_order_id'})
+    if 'priority' in df.columns:
+        df = df.drop(columns=['priority'])
+    return list(df.columns)
+
+def test_pm_all_drops_priority_icon_like_the_old_upload_page():
+    df = pd.DataFrame({
+        "Work Order": [101, 102],
+        "Priority Icon": ["High", "Low"],
+        "Sched. Start Date": ["2024-01-01", "2024-02-01"],
+    })
+    prepared = prepare_dataframe(df, PM_ALL_SPEC)
+    assert list(prepared.columns) == baseline_pm_all_columns(df) == ['work_order_id', 'scheduled_start_date']
+
+def test_pm_all_drops_priority():
+    df = pd.DataFrame({"Work Order": [101.0, np.nan], "Priority": ["High", "Low"], "Status": ["Open", "Closed"]})
+    prepared = prepare_dataframe(df, PM_ALL_SPEC)
+    assert list(prepared.columns) == baseline_pm_all_columns(df) == ['work_order_id', 'status']
+    assert prepared["work_order_id"].tolist() == ["101"]
+
+def _upload(existing, new):
+    from backend.utils.upload_benchmark import FakeSupabase
+    client = FakeSupabase()
+    client.tables["pm_all"] = [{"work_order_id": str(i)} for i in range(existing)]
+    df = pd.DataFrame({"work_order_id": [str(i) for i in range(existing - new // 2, existing - new // 2 + new)]})
+    summary = upload_dataframe(df, PM_ALL_SPEC, client, resume=False)
+    return client, summary
+
+def test_small_upload_into_large_table_checks_keys_per_batch():
+    client, summary = _upload(existing=20000, new=40)
+    assert (summary["inserted_records"], summary["updated_records"]) == (20, 20)
+    # count request + one in_() probe + one delete + one insert, not 20 key pages
+    assert client.requests == 4
+
+def test_large_upload_preloads_keys():
+    client, summary = _upload(existing=2500, new=400)
+    assert (summary["inserted_records"], summary["updated_records"]) == (200, 200)
+    # 3 key pages; the two batches of existing rows delete in two chunks and
+    # insert, the two new ones only insert; no in_() probes
+    assert client.requests == 3 + 2 * (2 + 1) + 2
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    keys = [f"WO{i:07d}" for i in range(20000)]
+    bloom = BloomFilter(len(keys), error_rate=0.01)
+    for key in keys:
+        bloom.add(key)
+    assert len(bloom) == len(keys)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"NEW{i:07d}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
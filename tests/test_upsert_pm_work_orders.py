@@ -0,0 +1,70 @@
+import pytest
+
+from backend.utils import upsert_pm_work_orders_to_pm_all as sync
+
+def work_order(number, updated_at, status="Open"):
+    return {"work_order": f"WO{number:04d}", "status": status, "updated_at": updated_at}
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    monkeypatch.setattr(sync, "get_supabase_client", lambda: fake_supabase)
+    monkeypatch.setattr(sync, "PAGE_SIZE", 3)
+    # Seven rows share a timestamp, so they straddle page boundaries
+    fake_supabase.tables["pm_work_orders"] = (
+        [work_order(n, "2024-05-01T00:00:00") for n in range(7)]
+        + [work_order(n, f"2024-05-0{n - 5}T00:00:00") for n in range(7, 10)]
+    )
+    return fake_supabase
+
+def pm_all(client):
+    return {row["work_order_id"]: row["status"] for row in client.tables["pm_all"]}
+
+def test_first_run_is_a_full_sync_and_saves_the_watermark(client, capsys):
+    result = sync.upsert_pm_work_orders_to_pm_all()
+    assert "Full sync (no watermark): 10 work orders" in capsys.readouterr().out
+    assert result == {"processed_records": 10, "inserted_records": 10, "updated_records": 0}
+    assert client.tables["sync_state"] == [{"job": sync.SYNC_JOB_NAME, "watermark": "2024-05-04T00:00:00"}]
+
+def test_incremental_run_reads_each_changed_row_once_across_page_boundaries(client):
+    client.tables["sync_state"] = [{"job": sync.SYNC_JOB_NAME, "watermark": "2024-05-01T00:00:00"}]
+    fetched = sync.fetch_pm_work_orders(client, "2024-05-01T00:00:00")
+    assert [row["work_order"] for row in fetched] == [f"WO{n:04d}" for n in range(10)]
+
+    fetched = sync.fetch_pm_work_orders(client, "2024-05-03T00:00:00")
+    assert [row["work_order"] for row in fetched] == ["WO0008", "WO0009"]
+
+def test_changed_rows_are_upserted_and_the_watermark_advances(client):
+    sync.upsert_pm_work_orders_to_pm_all()
+    client.tables["pm_work_orders"][2].update(status="Closed", updated_at="2024-06-01T00:00:00")
+    client.tables["pm_work_orders"].append(work_order(10, "2024-06-01T00:00:00"))
+
+    result = sync.upsert_pm_work_orders_to_pm_all()
+    # The row at the old watermark is read again as a no-op update
+    assert result == {"processed_records": 3, "inserted_records": 1, "updated_records": 2}
+    assert pm_all(client)["WO0002"] == "Closed" and "WO0010" in pm_all(client)
+    assert client.tables["sync_state"][0]["watermark"] == "2024-06-01T00:00:00"
+
+class FailingTable:
+    def __init__(self, client, table):
+        self.client, self.table_name = client, table
+
+    def table(self, name):
+        if name == self.table_name:
+            raise RuntimeError(f'relation "{name}" does not exist')
+        return self.client.table(name)
+
+def test_missing_sync_state_table_fails_instead_of_running_a_full_sync(client, monkeypatch):
+    monkeypatch.setattr(sync, "get_supabase_client", lambda: FailingTable(client, "sync_state"))
+    with pytest.raises(RuntimeError, match="sync watermark"):
+        sync.upsert_pm_work_orders_to_pm_all()
+    assert "pm_all" not in client.tables
+
+def test_failed_watermark_save_fails_the_run(client):
+    with pytest.raises(RuntimeError, match="save the sync watermark"):
+        sync.save_watermark(FailingTable(client, "sync_state"), "2024-05-04T00:00:00")
+
+def test_failed_incremental_fetch_does_not_fall_back_to_a_full_sync(client, monkeypatch):
+    client.tables["sync_state"] = [{"job": sync.SYNC_JOB_NAME, "watermark": "2024-05-01T00:00:00"}]
+    monkeypatch.setattr(sync, "get_supabase_client", lambda: FailingTable(client, "pm_work_orders"))
+    with pytest.raises(RuntimeError, match="--full"):
+        sync.upsert_pm_work_orders_to_pm_all()